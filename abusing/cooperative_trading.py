@@ -15,16 +15,24 @@ Author: Singapore Fintech Hackathon Team
 - 네트워크 분석
 """
 
+import numpy as np
 import pandas as pd
 import duckdb as dd
 import json
 from dataclasses import dataclass, field, asdict
 from typing import Dict, List, Optional, Set, Tuple
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from enum import Enum
 import logging
-from collections import defaultdict, Counter
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from common.materialized import ensure_positions
+from common.incremental import IncrementalState
+from common.results_store import ResultsStore
+from common.scoring import apply_scores, feature_frame
+from common.sanction_registry import SanctionRegistry
+from common.ip_index import IPIndex
 # Detectors read model tables directly from the persistent DuckDB file
 
 # ============================================================================
@@ -74,6 +82,10 @@ class DetectionConfig:
     min_group_size: int = 2                        # 최소 그룹 크기
     min_shared_ips: int = 1                        # 제재 최소 공유 IP 수
     
+    # ===== Execution Settings =====
+    incremental_mode: bool = False                 # 이전 실행 이후 변경된 포지션만 후보 재계산
+    band_join_workers: int = 4                     # 후보 쌍 band join 심볼별 병렬 스레드 수
+    
     # ===== Output Settings =====
     output_dir: str = "output/cooperative"
     enable_detailed_logging: bool = True
@@ -289,82 +301,214 @@ class DetectionLogger:
 # 4. CANDIDATE EXTRACTOR
 # ============================================================================
 
+class BandJoinEngine:
+    """
+    포지션 자기 조인 (심볼별 sort-merge band join)
+    
+    심볼별로 open_ts 정렬 후 각 포지션(t1)에 대해 open_ts가 (t1.open_ts, t1.open_ts + 최대 오픈 시간차]
+    구간인 포지션(t2)만 슬라이딩 윈도우(searchsorted)로 짝짓고, 나머지 조건
+    (클로즈 시간차, 보유 구간 겹침, 다른 계정, 같은 방향)은 벡터 연산으로 검사.
+    심볼 단위로 스레드 풀에서 병렬 실행하며, (account_id, position_id)가 유일하므로 중복 쌍이 없음
+    """
+    
+    # 한 번에 펼치는 최대 후보 쌍 수 (메모리 상한)
+    CHUNK_PAIRS = 2_000_000
+    
+    POSITION_COLUMNS = ['account_id', 'position_id', 'leverage', 'open_ts', 'closing_ts', 'symbol', 'side', 'amount', 'rpnl']
+    
+    def __init__(self, config: DetectionConfig):
+        self.config = config
+        self.max_open_diff_ns = int(config.max_open_time_diff_min * 60 * 1e9)
+        self.max_close_diff_ns = int(config.max_close_time_diff_min * 60 * 1e9)
+    
+    def join(self, positions: pd.DataFrame, changed_after: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        후보 거래 쌍 생성 (symbol, open_ts1 순)
+        
+        Args:
+            positions: POSITION_COLUMNS 컬럼의 포지션 DataFrame
+            changed_after: 지정 시 둘 중 하나라도 closing_ts가 이 시각 이후인 쌍만 반환 (증분 모드)
+        """
+        positions = positions.sort_values(['symbol', 'open_ts'], kind='stable').reset_index(drop=True)
+        
+        open_ns = self._ns(positions['open_ts'])
+        close_ns = self._ns(positions['closing_ts'])
+        account = pd.factorize(positions['account_id'].astype(object).to_numpy())[0]
+        side = pd.factorize(positions['side'].astype(object).to_numpy())[0]
+        changed = None
+        if changed_after is not None:
+            changed = close_ns > pd.Timestamp(changed_after).value
+        
+        # 심볼 경계 (정렬되어 있으므로 연속 구간)
+        symbols = positions['symbol'].astype(object).to_numpy()
+        bounds = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1 if len(symbols) else np.array([], dtype=np.int64)
+        slices = list(zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(symbols)]]))) if len(symbols) else []
+        
+        arrays = (open_ns, close_ns, account, side, changed)
+        with ThreadPoolExecutor(max_workers=max(1, self.config.band_join_workers)) as pool:
+            parts = list(pool.map(lambda bound: self._join_symbol(*bound, *arrays), slices))
+        
+        left = np.concatenate([p[0] for p in parts]) if parts else np.array([], dtype=np.int64)
+        right = np.concatenate([p[1] for p in parts]) if parts else np.array([], dtype=np.int64)
+        return self._build_pairs(positions, left, right, open_ns, close_ns)
+    
+    @staticmethod
+    def _ns(series: pd.Series) -> np.ndarray:
+        return pd.to_datetime(series).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    
+    def _join_symbol(self, lo: int, hi: int, open_ns, close_ns, account, side, changed) -> Tuple[np.ndarray, np.ndarray]:
+        """심볼 구간 [lo, hi)의 후보 쌍 (전역 행 번호)"""
+        opens = open_ns[lo:hi]
+        # t2 범위: open_ts가 t1보다 크고 t1 + 최대 오픈 시간차 이하
+        start = np.searchsorted(opens, opens, side='right')
+        stop = np.searchsorted(opens, opens + self.max_open_diff_ns, side='right')
+        counts = stop - start
+        
+        # 후보 쌍이 CHUNK_PAIRS를 넘지 않도록 t1 구간을 나눠 펼침
+        cumulative = np.cumsum(counts)
+        lefts, rights = [], []
+        begin = 0
+        while begin < len(opens):
+            offset = cumulative[begin - 1] if begin else 0
+            end = max(int(np.searchsorted(cumulative, offset + self.CHUNK_PAIRS, side='right')), begin + 1)
+            c = counts[begin:end]
+            i = np.repeat(np.arange(begin, end), c)
+            j = np.repeat(start[begin:end], c) + (np.arange(int(c.sum())) - np.repeat(np.cumsum(c) - c, c))
+            i, j = i + lo, j + lo
+            
+            keep = (
+                (np.abs(close_ns[i] - close_ns[j]) <= self.max_close_diff_ns)
+                & (open_ns[j] < np.minimum(close_ns[i], close_ns[j]))
+                & (account[i] != account[j]) & (account[i] >= 0) & (account[j] >= 0)
+                & (side[i] == side[j]) & (side[i] >= 0)
+            )
+            if changed is not None:
+                keep &= changed[i] | changed[j]
+            lefts.append(i[keep])
+            rights.append(j[keep])
+            begin = end
+        
+        if not lefts:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        return np.concatenate(lefts), np.concatenate(rights)
+    
+    @staticmethod
+    def _build_pairs(positions: pd.DataFrame, left: np.ndarray, right: np.ndarray, open_ns, close_ns) -> pd.DataFrame:
+        t1 = positions.iloc[left].reset_index(drop=True)
+        t2 = positions.iloc[right].reset_index(drop=True)
+        return pd.DataFrame({
+            'account_id1': t1['account_id'],
+            'account_id2': t2['account_id'],
+            'symbol': t1['symbol'],
+            'open_ts1': t1['open_ts'],
+            'open_ts2': t2['open_ts'],
+            'closing_ts1': t1['closing_ts'],
+            'closing_ts2': t2['closing_ts'],
+            'leverage': t1['leverage'],
+            'amount1': t1['amount'],
+            'amount2': t2['amount'],
+            'position_id1': t1['position_id'],
+            'position_id2': t2['position_id'],
+            'side1': t1['side'].astype(object),
+            'side2': t2['side'].astype(object),
+            'rpnl1': t1['rpnl'],
+            'rpnl2': t2['rpnl'],
+            'open_time_diff_sec': np.abs(open_ns[left] - open_ns[right]) / 1e9,
+            'close_time_diff_sec': np.abs(close_ns[left] - close_ns[right]) / 1e9,
+        })
+
+
 class CandidateExtractor:
     """후보 거래 쌍 추출"""
     
+    ORDER_BY = "symbol, open_ts1"
+    
     def __init__(self, con: dd.DuckDBPyConnection, config: DetectionConfig):
         self.con = con
         self.config = config
+        self.band_join = BandJoinEngine(config)
     
     def extract_candidates(self) -> List[Dict]:
-        """SQL을 통해 후보 거래 쌍 추출"""
+        """포지션 band join으로 후보 거래 쌍 추출"""
         print("후보 거래 쌍 추출 중...")
+        ensure_positions(self.con)
         
-        # 주요 심볼 제외 조건
-        exclude_clause = ""
-        if self.config.exclude_major_symbols:
-            symbols_str = "', '".join(self.config.major_symbols)
-            exclude_clause = f"AND t1.symbol NOT IN ('{symbols_str}')"
+        if self.config.incremental_mode:
+            return self._extract_incremental()
         
-        query = f"""
-        WITH position AS (
-            SELECT
-                account_id,
-                position_id,
-                MAX(leverage) AS leverage,
-                CAST(MIN(ts) AS TIMESTAMP) as open_ts,
-                CAST(MAX(ts) AS TIMESTAMP) as closing_ts,
-                MAX(symbol) as symbol,
-                MAX(side) as side,
-                DATE(MAX(ts)) as closing_day,
-                SUM(CASE WHEN openclose='OPEN' THEN amount ELSE 0 END) as amount,
-                SUM(
-                    CASE WHEN openclose='OPEN' THEN -amount ELSE amount END * 
-                    CASE WHEN side='LONG' THEN 1 ELSE -1 END
-                ) as rpnl
-            FROM Trade
-            GROUP BY account_id, position_id
-        ),
-        joined AS (
-            SELECT
-                t1.account_id AS account_id1,
-                t2.account_id AS account_id2,
-                t1.symbol,
-                t1.open_ts AS open_ts1,
-                t2.open_ts AS open_ts2,
-                t1.closing_ts AS closing_ts1,
-                t2.closing_ts AS closing_ts2,
-                t1.leverage,
-                t1.amount AS amount1,
-                t2.amount AS amount2,
-                t1.position_id AS position_id1,
-                t2.position_id AS position_id2,
-                t1.side as side1,
-                t2.side as side2,
-                t1.rpnl as rpnl1,
-                t2.rpnl as rpnl2,
-                ABS(epoch(t1.open_ts) - epoch(t2.open_ts)) AS open_time_diff_sec,
-                ABS(epoch(t1.closing_ts) - epoch(t2.closing_ts)) AS close_time_diff_sec
-            FROM position t1 
-            INNER JOIN position t2 ON
-                t1.symbol = t2.symbol
-                AND ABS(epoch(t1.open_ts) - epoch(t2.open_ts)) <= {self.config.max_open_time_diff_min * 60}
-                AND ABS(epoch(t1.closing_ts) - epoch(t2.closing_ts)) <= {self.config.max_close_time_diff_min * 60}
-                AND t1.open_ts < t2.open_ts
-                AND GREATEST(t1.open_ts, t2.open_ts) < LEAST(t1.closing_ts, t2.closing_ts)
-                AND t1.account_id != t2.account_id
-                AND t1.side = t2.side
-                {exclude_clause}
-        )
-        SELECT DISTINCT *
-        FROM joined
-        ORDER BY symbol, open_ts1
-        """
-        
-        df = self.con.execute(query).fetchdf()
+        df = self.band_join.join(self._load_positions())
         print(f"후보 거래 쌍 {len(df)}개 추출")
         
         return df.to_dict('records')
+    
+    def _extract_incremental(self) -> List[Dict]:
+        """
+        증분 후보 추출
+        
+        워터마크 이후 변경된(close_ts > 워터마크) 포지션이 포함된 쌍만 다시 계산해 병합.
+        상대 포지션은 클로즈 시간차/오픈 시간차 조건을 만족해야 하므로
+        closing_ts > 워터마크 - max_close_time_diff, open_ts >= 변경 포지션 최소 open_ts - max_open_time_diff
+        범위만 조회하면 충분함.
+        """
+        signature = (
+            f"coop:v2:{self.config.max_open_time_diff_min}:{self.config.max_close_time_diff_min}:"
+            f"{self.config.exclude_major_symbols}:{','.join(sorted(self.config.major_symbols))}"
+        )
+        state = IncrementalState(self.con, 'coop', signature)
+        
+        if not state.is_incremental:
+            pairs = self.band_join.join(self._load_positions())
+            self.con.register('coop_band_pairs', pairs)
+            state.replace_candidates('SELECT * FROM coop_band_pairs')
+            self.con.unregister('coop_band_pairs')
+            print(f"전체 후보 계산 (워터마크: {state.new_watermark})")
+        else:
+            open_lookback = state.changed_lookback('open_ts', self.config.max_open_time_diff_min * 60)
+            if open_lookback is not None:
+                close_lookback = state.previous_watermark - timedelta(minutes=self.config.max_close_time_diff_min)
+                positions = self._load_positions(
+                    "close_ts > $close_lookback AND open_ts >= $open_lookback",
+                    {'close_lookback': close_lookback, 'open_lookback': open_lookback},
+                )
+                pairs = self.band_join.join(positions, changed_after=state.previous_watermark)
+                self.con.register('coop_band_pairs', pairs)
+                deleted, inserted = state.merge_candidates(
+                    'SELECT * FROM coop_band_pairs',
+                    None,
+                    [('account_id1', 'position_id1'), ('account_id2', 'position_id2')],
+                )
+                self.con.unregister('coop_band_pairs')
+                print(f"증분 후보 병합: {state.previous_watermark} 이후 - 삭제 {deleted}, 추가 {inserted}")
+            else:
+                print(f"변경된 포지션 없음 (워터마크: {state.previous_watermark})")
+        state.commit()
+        
+        rows = state.read_candidates(self.ORDER_BY)
+        print(f"후보 거래 쌍 {len(rows)}개 추출")
+        return rows
+    
+    def _load_positions(self, where: str = "", params: Optional[Dict] = None) -> pd.DataFrame:
+        """band join 입력 포지션 (주요 심볼 제외 조건을 $major_symbols 파라미터로 적용)"""
+        conditions = ["symbol IS NOT NULL"] + ([where] if where else [])
+        params = dict(params or {})
+        if self.config.exclude_major_symbols and self.config.major_symbols:
+            conditions.append("NOT list_contains($major_symbols, symbol)")
+            params['major_symbols'] = list(self.config.major_symbols)
+        
+        return self.con.execute(f"""
+            SELECT
+                account_id,
+                position_id,
+                leverage,
+                open_ts,
+                close_ts as closing_ts,
+                symbol,
+                side,
+                amount,
+                rpnl
+            FROM positions
+            WHERE {' AND '.join(conditions)}
+        """, params or None).fetchdf()
 
 
 # ============================================================================
@@ -446,212 +590,191 @@ class FilterEngine:
 class ScoringEngine:
     """점수 계산 및 위험도 분류"""
     
-    def __init__(self, config: DetectionConfig, ip_data: pd.DataFrame):
+    def __init__(self, config: DetectionConfig, ip_index: IPIndex):
         self.config = config
-        self.ip_data = ip_data
-        
-        # IP 매핑 생성 (account_id -> set of IPs)
-        self.account_ips = self._build_ip_mapping()
+        self.ip_index = ip_index
     
-    def _build_ip_mapping(self) -> Dict[str, Set[str]]:
-        """계정별 IP 매핑 생성"""
-        mapping = defaultdict(set)
-        for _, row in self.ip_data.iterrows():
-            mapping[row['account_id']].add(row['ip'])
-        return mapping
+    # score_frame 입력 컬럼 (TradePair 필드명과 동일)
+    FEATURE_COLUMNS = (
+        'account_id1', 'account_id2', 'rpnl1', 'rpnl2', 'open_time_diff_sec', 'close_time_diff_sec',
+        'open_ts1', 'open_ts2', 'closing_ts1', 'closing_ts2',
+    )
+    SCORE_COLUMNS = ('pnl_asymmetry', 'time_proximity', 'ip_sharing', 'position_overlap', 'total')
     
     def score_all_pairs(self, pairs: List[TradePair]) -> List[TradePair]:
-        """모든 거래 쌍 점수 계산"""
+        """모든 거래 쌍 점수 계산 (score_frame 배치 계산 결과를 객체에 반영)"""
         print("점수 엔진 시작...")
         
-        for pair in pairs:
-            # 각 지표별 점수 계산
-            pnl_score = self._score_pnl_asymmetry(pair)
-            time_score = self._score_time_proximity(pair)
-            ip_score = self._score_ip_sharing(pair)
-            overlap_score = self._score_position_overlap(pair)
-            
-            # 점수 저장
-            pair.score = ScoreBreakdown(
-                pnl_asymmetry=pnl_score,
-                time_proximity=time_score,
-                ip_sharing=ip_score,
-                position_overlap=overlap_score,
-                total=pnl_score + time_score + ip_score + overlap_score
-            )
-            
-            # 위험도 분류
-            pair.risk_level = self._classify_risk(pair.score.total)
-            
-            # if self.config.enable_detailed_logging:
-            #     print(
-            #         f"{pair.pair_id}: 점수={pair.score.total:.1f} "
-            #         f"(PnL:{pnl_score:.1f}, Time:{time_score:.1f}, "
-            #         f"IP:{ip_score:.1f}, Overlap:{overlap_score:.1f}) "
-            #         f"→ {pair.risk_level.value}"
-            #     )
+        scores = self.score_frame(feature_frame(pairs, self.FEATURE_COLUMNS))
+        apply_scores(pairs, scores, ScoreBreakdown, self.SCORE_COLUMNS, 'risk_level', RiskLevel)
         
         print(f"점수 계산 완료: {len(pairs)}개")
         
         return pairs
     
-    def _score_pnl_asymmetry(self, pair: TradePair) -> float:
-        """PnL 비대칭성 점수 (35점) - 한쪽이 큰 이익"""
-        max_weight = self.config.weight_pnl_asymmetry
-        
-        total_pnl = pair.rpnl1 + pair.rpnl2
-        max_pnl = max(abs(pair.rpnl1), abs(pair.rpnl2))
-        
-        if max_pnl == 0:
-            return 0.0
-        
-        # 비대칭 비율: 클수록 한쪽만 이득
-        asymmetry_ratio = abs(total_pnl) / max_pnl
-        
-        if asymmetry_ratio >= 0.8:  # 80% 이상: 한쪽만 큰 이득
-            return max_weight
-        elif asymmetry_ratio >= 0.6:
-            return max_weight * 0.75
-        elif asymmetry_ratio >= 0.4:
-            return max_weight * 0.50
-        elif asymmetry_ratio >= 0.2:
-            return max_weight * 0.25
-        else:
-            return 0.0
-    
-    def _score_time_proximity(self, pair: TradePair) -> float:
-        """시간 근접도 점수 (25점)"""
-        max_weight = self.config.weight_time_proximity
-        
-        avg_diff = (pair.open_time_diff_sec + pair.close_time_diff_sec) / 2
-        
-        if avg_diff <= 5:  # 5초 이내
-            return max_weight
-        elif avg_diff <= 15:  # 15초 이내
-            return max_weight * 0.80
-        elif avg_diff <= 30:  # 30초 이내
-            return max_weight * 0.60
-        elif avg_diff <= 60:  # 1분 이내
-            return max_weight * 0.40
-        else:  # 2분 이내
-            return max_weight * 0.20
-    
-    def _score_ip_sharing(self, pair: TradePair) -> float:
-        """IP 공유 점수 (25점)"""
-        max_weight = self.config.weight_ip_sharing
-        
-        ips1 = self.account_ips.get(pair.account_id1, set())
-        ips2 = self.account_ips.get(pair.account_id2, set())
-        
-        shared_ips = ips1 & ips2
-        shared_count = len(shared_ips)
-        
-        if shared_count >= 5:
-            return max_weight
-        elif shared_count >= 3:
-            return max_weight * 0.80
-        elif shared_count >= 2:
-            return max_weight * 0.60
-        elif shared_count >= 1:
-            return max_weight * 0.40
-        else:
-            return 0.0
-    
-    def _score_position_overlap(self, pair: TradePair) -> float:
-        """포지션 겹침 점수 (15점)"""
-        max_weight = self.config.weight_position_overlap
-        
-        # 오픈/클로즈 시간 겹침 계산
-        overlap_start = max(pair.open_ts1, pair.open_ts2)
-        overlap_end = min(pair.closing_ts1, pair.closing_ts2)
+    def score_frame(self, features: pd.DataFrame) -> pd.DataFrame:
+        """
+        배치 점수 계산 (항목별 구간 점수와 위험도 임계값을 np.select로 배열 단위 적용)
         
-        if overlap_end <= overlap_start:
-            return 0.0
+        점수 규칙은 여기에만 정의 (score_all_pairs도 이 결과를 TradePair에 반영)
         
-        overlap_duration = (overlap_end - overlap_start).total_seconds()
-        total_duration1 = (pair.closing_ts1 - pair.open_ts1).total_seconds()
-        total_duration2 = (pair.closing_ts2 - pair.open_ts2).total_seconds()
-        min_duration = min(total_duration1, total_duration2)
+        Args:
+            features: FEATURE_COLUMNS 컬럼을 가진 DataFrame
         
-        if min_duration == 0:
-            return 0.0
+        Returns:
+            SCORE_COLUMNS + risk_level(RiskLevel 값) 컬럼 DataFrame (features와 같은 index)
+        """
+        c = self.config
+        col = lambda name: features[name].to_numpy(dtype=float)
+        ts = lambda name: pd.to_datetime(features[name]).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # PnL 비대칭성 (35점): |합| / max|PnL|, 클수록 한쪽만 이득 (80% 이상 한쪽만 큰 이득)
+            rpnl1, rpnl2 = col('rpnl1'), col('rpnl2')
+            max_pnl = np.maximum(np.abs(rpnl1), np.abs(rpnl2))
+            asymmetry = np.abs(rpnl1 + rpnl2) / max_pnl
+            w = c.weight_pnl_asymmetry
+            pnl = np.select(
+                [max_pnl == 0, asymmetry >= 0.8, asymmetry >= 0.6, asymmetry >= 0.4, asymmetry >= 0.2],
+                [0.0, w, w * 0.75, w * 0.50, w * 0.25],
+                0.0,
+            )
+            
+            # 시간 근접도 (25점): 오픈/클로즈 평균 시간차 5초, 15초, 30초, 1분 이내, 그 외 2분 이내
+            avg_diff = (col('open_time_diff_sec') + col('close_time_diff_sec')) / 2
+            w = c.weight_time_proximity
+            time_score = np.select(
+                [avg_diff <= 5, avg_diff <= 15, avg_diff <= 30, avg_diff <= 60],
+                [w, w * 0.80, w * 0.60, w * 0.40],
+                w * 0.20,
+            )
+            
+            # IP 공유 (25점): 두 계정이 함께 쓴 IP 수
+            shared = self.ip_index.shared_ip_count(features['account_id1'], features['account_id2'])
+            w = c.weight_ip_sharing
+            ip = np.select(
+                [shared >= 5, shared >= 3, shared >= 2, shared >= 1],
+                [w, w * 0.80, w * 0.60, w * 0.40],
+                0.0,
+            )
+            
+            # 포지션 겹침 (15점): 겹친 시간 / 짧은 포지션 보유 시간 (겹침 없음 또는 보유 시간 0이면 0점)
+            open1, open2, close1, close2 = ts('open_ts1'), ts('open_ts2'), ts('closing_ts1'), ts('closing_ts2')
+            overlap_ns = np.minimum(close1, close2) - np.maximum(open1, open2)
+            min_duration_ns = np.minimum(close1 - open1, close2 - open2)
+            overlap_ratio = overlap_ns / min_duration_ns
+            w = c.weight_position_overlap
+            overlap = np.select(
+                [overlap_ns <= 0, min_duration_ns == 0, overlap_ratio >= 0.9, overlap_ratio >= 0.7, overlap_ratio >= 0.5],
+                [0.0, 0.0, w, w * 0.75, w * 0.50],
+                w * 0.25,
+            )
         
-        overlap_ratio = overlap_duration / min_duration
+        total = pnl + time_score + ip + overlap
+        risk = np.select(
+            [total >= c.critical_threshold, total >= c.high_threshold, total >= c.medium_threshold],
+            [RiskLevel.CRITICAL.value, RiskLevel.HIGH.value, RiskLevel.MEDIUM.value],
+            RiskLevel.LOW.value,
+        )
         
-        if overlap_ratio >= 0.9:
-            return max_weight
-        elif overlap_ratio >= 0.7:
-            return max_weight * 0.75
-        elif overlap_ratio >= 0.5:
-            return max_weight * 0.50
-        else:
-            return max_weight * 0.25
-    
-    def _classify_risk(self, total_score: float) -> RiskLevel:
-        """점수 기반 위험도 분류"""
-        if total_score >= self.config.critical_threshold:
-            return RiskLevel.CRITICAL
-        elif total_score >= self.config.high_threshold:
-            return RiskLevel.HIGH
-        elif total_score >= self.config.medium_threshold:
-            return RiskLevel.MEDIUM
-        else:
-            return RiskLevel.LOW
-
+        return pd.DataFrame({
+            'pnl_asymmetry': pnl,
+            'time_proximity': time_score,
+            'ip_sharing': ip,
+            'position_overlap': overlap,
+            'total': total,
+            'risk_level': risk,
+        }, index=features.index)
 
 # ============================================================================
 # 7. NETWORK ANALYZER
 # ============================================================================
 
+class DisjointSet:
+    """Union-Find (union by rank + 경로 압축)"""
+    
+    def __init__(self):
+        self.index: Dict[str, int] = {}    # 원소 -> 내부 번호 (추가 순서)
+        self.items: List[str] = []
+        self.parent: List[int] = []
+        self.rank: List[int] = []
+    
+    def add(self, item: str) -> int:
+        """원소 추가 (이미 있으면 기존 번호 반환)"""
+        idx = self.index.get(item)
+        if idx is None:
+            idx = len(self.items)
+            self.index[item] = idx
+            self.items.append(item)
+            self.parent.append(idx)
+            self.rank.append(0)
+        return idx
+    
+    def find(self, idx: int) -> int:
+        """루트 번호 (경로 압축)"""
+        parent = self.parent
+        root = idx
+        while parent[root] != root:
+            root = parent[root]
+        while parent[idx] != root:
+            parent[idx], idx = root, parent[idx]
+        return root
+    
+    def union(self, a: str, b: str) -> int:
+        """두 원소의 집합 병합 후 루트 번호 반환"""
+        ra, rb = self.find(self.add(a)), self.find(self.add(b))
+        if ra == rb:
+            return ra
+        if self.rank[ra] < self.rank[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        if self.rank[ra] == self.rank[rb]:
+            self.rank[ra] += 1
+        return ra
+    
+    def components(self) -> Dict[int, List[str]]:
+        """루트 번호 -> 원소 리스트 (원소 추가 순서 유지)"""
+        groups: Dict[int, List[str]] = {}
+        for idx, item in enumerate(self.items):
+            groups.setdefault(self.find(idx), []).append(item)
+        return groups
+
+
 class NetworkAnalyzer:
     """네트워크 분석 및 그룹 탐지"""
     
-    def __init__(self, config: DetectionConfig, ip_data: pd.DataFrame):
+    def __init__(self, config: DetectionConfig, ip_index: IPIndex):
         self.config = config
-        self.ip_data = ip_data
+        self.ip_index = ip_index
     
     def find_groups(self, pairs: List[TradePair]) -> List[CooperativeGroup]:
         """연결된 계정 그룹 찾기"""
         print("네트워크 그룹 탐색 중...")
         
-        # 계정 쌍 수집
-        unique_pairs = set()
+        # Union-Find로 연결된 계정 집합 계산
+        dsu = DisjointSet()
         for pair in pairs:
-            sorted_accounts = tuple(sorted([pair.account_id1, pair.account_id2]))
-            unique_pairs.add(sorted_accounts)
-        
-        # Union-Find 알고리즘으로 그룹 찾기
-        groups = []
-        
-        for a, b in unique_pairs:
-            found = []
-            for g in groups:
-                if a in g or b in g:
-                    g.update([a, b])
-                    found.append(g)
-            
-            if not found:
-                groups.append(set([a, b]))
-            elif len(found) > 1:
-                merged = set().union(*found)
-                groups = [g for g in groups if g not in found]
-                groups.append(merged)
+            dsu.union(pair.account_id1, pair.account_id2)
+        
+        # 한 번의 순회로 컴포넌트별 거래 쌍 수집 (거래 쌍 순서 유지)
+        component_pairs: Dict[int, List[TradePair]] = {}
+        for pair in pairs:
+            root = dsu.find(dsu.index[pair.account_id1])
+            component_pairs.setdefault(root, []).append(pair)
+        members_by_root = dsu.components()
+        
+        # 최소 크기 이상 그룹 (첫 거래 쌍이 나타난 순서대로) + 그룹별 공유 IP 일괄 조회
+        candidates = [
+            (idx, sorted(members_by_root[root]), group_pairs)
+            for idx, (root, group_pairs) in enumerate(component_pairs.items())
+            if len(members_by_root[root]) >= self.config.min_group_size
+        ]
+        shared_ips_by_group = self.ip_index.shared_ips_many([members for _, members, _ in candidates])
         
         # CooperativeGroup 객체 생성
         cooperative_groups = []
         
-        for idx, group_set in enumerate(groups):
-            if len(group_set) < self.config.min_group_size:
-                continue
-            
-            group_members = sorted(list(group_set))
-            
-            # 그룹 관련 거래 쌍 찾기
-            group_pairs = [
-                p for p in pairs
-                if p.account_id1 in group_set or p.account_id2 in group_set
-            ]
-            
+        for (idx, group_members, group_pairs), shared_ip_info in zip(candidates, shared_ips_by_group):
             # PnL 계산 (position_id 중복 제거)
             # AD_2.py 로직 참고: 동일 position_id가 여러 pair에 나타날 수 있어 중복 제거 필요
             unique_rpnl = []
@@ -674,9 +797,6 @@ class NetworkAnalyzer:
             total_neg = sum(min(0, rpnl) for rpnl in unique_rpnl)
             total_pnl = total_pos + total_neg
             
-            # IP 공유 분석
-            shared_ip_info = self._analyze_shared_ips(group_members)
-            
             # 평균 점수 계산
             scores = [p.score.total for p in group_pairs]
             avg_score = sum(scores) / len(scores) if scores else 0.0
@@ -706,19 +826,6 @@ class NetworkAnalyzer:
         
         return cooperative_groups
     
-    def _analyze_shared_ips(self, members: List[str]) -> Dict[str, List[str]]:
-        """그룹 내 공유 IP 분석"""
-        group_ips = self.ip_data[self.ip_data['account_id'].isin(members)]
-        ip_counter = Counter(group_ips['ip'])
-        
-        shared_ips = {}
-        for ip, count in ip_counter.items():
-            if count > 1:
-                accounts = group_ips[group_ips['ip'] == ip]['account_id'].tolist()
-                shared_ips[ip] = accounts
-        
-        return shared_ips
-    
     def _classify_group_risk(self, avg_score: float, shared_ip_count: int) -> RiskLevel:
         """그룹 위험도 분류"""
         # IP 공유가 많으면 위험도 상승
@@ -742,10 +849,15 @@ class NetworkAnalyzer:
 class SanctionPipeline:
     """제재 케이스 생성 및 출력"""
     
-    def __init__(self, config: DetectionConfig, logger: DetectionLogger):
+    def __init__(self, config: DetectionConfig, logger: DetectionLogger, registry: Optional[SanctionRegistry] = None):
         self.config = config
         self.logger = logger
-        self.sanction_cases: List[SanctionCase] = []
+        self.registry = registry or SanctionRegistry('group_id', carry_field='account_ids')  # 그룹 ID는 실행마다 바뀌므로 이전 실행과는 구성원으로 비교
+        self.sanctions_document: Optional[Dict] = None
+    
+    @property
+    def sanction_cases(self) -> List[SanctionCase]:
+        return self.registry.cases
     
     def process_critical_groups(self, groups: List[CooperativeGroup]) -> List[SanctionCase]:
         """Critical 그룹 즉시 제재 케이스 생성"""
@@ -775,12 +887,12 @@ class SanctionPipeline:
                 evidence_summary=f"확실한 공모 거래 패턴 (점수: {group.max_score:.1f}/100, 거래: {group.trade_count}건)"
             )
             
-            self.sanction_cases.append(sanction)
+            self.registry.add(sanction)
             self.logger.logger.warning(f"제재 케이스 생성: {sanction.case_id}")
         
         print(f"Critical 제재: {len(critical_groups)}건")
         
-        return [c for c in self.sanction_cases if c.sanction_type == SanctionType.IMMEDIATE_CRITICAL]
+        return self.registry.by_type(SanctionType.IMMEDIATE_CRITICAL)
     
     def process_ip_shared_groups(self, groups: List[CooperativeGroup]) -> List[SanctionCase]:
         """IP 공유 네트워크 제재 케이스 생성"""
@@ -797,8 +909,7 @@ class SanctionPipeline:
         
         for group in ip_shared_groups:
             # 이미 Critical로 제재된 경우 스킵
-            if any(c.group_id == group.group_id and c.sanction_type == SanctionType.IMMEDIATE_CRITICAL 
-                   for c in self.sanction_cases):
+            if self.registry.contains(SanctionType.IMMEDIATE_CRITICAL, group.group_id):
                 continue
             
             sanction = SanctionCase(
@@ -819,7 +930,7 @@ class SanctionPipeline:
             )
             
             ip_sanctions.append(sanction)
-            self.sanction_cases.append(sanction)
+            self.registry.add(sanction)
             self.logger.logger.warning(f"제재 케이스 생성: {sanction.case_id}")
         
         print(f"IP 공유 제재: {len(ip_sanctions)}건")
@@ -837,10 +948,15 @@ class SanctionPipeline:
             'sanctions': [case.to_dict() for case in self.sanction_cases]
         }
         
+        self.sanctions_document = data
+        
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
         print(f"제재 케이스 저장: {filepath} ({len(self.sanction_cases)}건)")
+        carried = self.registry.carried_over_count()
+        if carried:
+            print(f"  이전 실행에서 이어진 제재 {carried}건, 신규 {len(self.sanction_cases) - carried}건")
         
         return str(filepath)
 
@@ -855,6 +971,8 @@ class ReportGenerator:
     def __init__(self, config: DetectionConfig):
         self.config = config
         self.output_dir = Path(config.output_dir)
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.documents: Dict[str, Dict] = {}
     
     def generate_all_reports(
         self,
@@ -865,6 +983,7 @@ class ReportGenerator:
         print("보고서 생성 중...")
         
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.frames, self.documents = {}, {}
         
         # 1. 거래 쌍 상세 데이터 (CSV)
         self._export_trade_pairs_csv(all_pairs)
@@ -909,6 +1028,7 @@ class ReportGenerator:
             records.append(record)
         
         df = pd.DataFrame(records)
+        self.frames['pairs'] = df
         filepath = self.output_dir / "trade_pairs_detailed.csv"
         df.to_csv(filepath, index=False, encoding='utf-8-sig')
         print(f"거래 쌍 CSV 저장: {filepath}")
@@ -936,6 +1056,7 @@ class ReportGenerator:
             records.append(record)
         
         df = pd.DataFrame(records)
+        self.frames['groups'] = df
         filepath = self.output_dir / "cooperative_groups.csv"
         df.to_csv(filepath, index=False, encoding='utf-8-sig')
         print(f"그룹 CSV 저장: {filepath}")
@@ -995,6 +1116,7 @@ class ReportGenerator:
             ]
         }
         
+        self.documents['visualization'] = vis_data
         filepath = self.output_dir / "visualization_data.json"
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(vis_data, f, indent=2, ensure_ascii=False)
@@ -1072,14 +1194,15 @@ class CooperativeTradingDetector:
         self.logger = DetectionLogger(config)
         self.sanction_pipeline = SanctionPipeline(config, self.logger)
     
-    def detect(self, data_filepath: str) -> Dict:
-        """전체 탐지 프로세스 실행"""
+    def detect(self, data_filepath: str, con: Optional[dd.DuckDBPyConnection] = None) -> Dict:
+        """전체 탐지 프로세스 실행 (con이 주어지면 공유 커서 사용)"""
         
         # 1. 데이터 로드 (공통 DataManager 사용)
         self.logger.log_phase("데이터 로드")
         # detectors should use the persistent DuckDB file created by main
-        db_path = Path.cwd() / 'data' / 'ingest.duckdb'
-        con = dd.connect(database=str(db_path))
+        if con is None:
+            db_path = Path.cwd() / 'data' / 'ingest.duckdb'
+            con = dd.connect(database=str(db_path))
 
         # load auxiliary tables used by non-SQL parts of the detector
         data = {}
@@ -1095,7 +1218,7 @@ class CooperativeTradingDetector:
         
         if len(candidates) == 0:
             print("후보 거래 쌍이 없습니다. 탐지 종료.")
-            return self._empty_result()
+            return self._empty_result(con)
         
         # 3. 필터 적용
         self.logger.log_phase("필터 적용")
@@ -1105,11 +1228,12 @@ class CooperativeTradingDetector:
         
         if len(passed_pairs) == 0:
             print("필터를 통과한 거래 쌍이 없습니다.")
-            return self._empty_result()
+            return self._empty_result(con)
         
         # 4. 점수 계산
         self.logger.log_phase("점수 계산 및 위험도 분류")
-        scoring_engine = ScoringEngine(self.config, data['IP'])
+        ip_index = IPIndex(data['IP'])  # 점수 계산/네트워크 분석 공용
+        scoring_engine = ScoringEngine(self.config, ip_index)
         scored_pairs = scoring_engine.score_all_pairs(passed_pairs)
         
         # 위험도 분포 로깅
@@ -1120,11 +1244,12 @@ class CooperativeTradingDetector:
         
         # 5. 네트워크 분석
         self.logger.log_phase("네트워크 분석 및 그룹 탐지")
-        network_analyzer = NetworkAnalyzer(self.config, data['IP'])
+        network_analyzer = NetworkAnalyzer(self.config, ip_index)
         groups = network_analyzer.find_groups(scored_pairs)
         
         # 6. Critical 그룹 즉시 제재
         self.logger.log_phase("Critical 그룹 제재")
+        self.sanction_pipeline.registry.remember_published(ResultsStore(con), 'coop')
         critical_sanctions = self.sanction_pipeline.process_critical_groups(groups)
         
         # 7. IP 공유 네트워크 제재
@@ -1140,7 +1265,17 @@ class CooperativeTradingDetector:
         report_generator = ReportGenerator(self.config)
         report_generator.generate_all_reports(scored_pairs, groups)
         
-        # 10. 결과 반환
+        # 10. API용 결과 테이블 게시 (CSV/JSON과 같은 내용)
+        self.logger.log_phase("결과 테이블 게시")
+        ResultsStore(con).publish_run(
+            'coop',
+            self.config.to_dict(),
+            report_generator.frames,
+            report_generator.documents.get('visualization'),
+            self.sanction_pipeline.sanctions_document,
+        )
+        
+        # 11. 결과 반환
         all_sanctions = critical_sanctions + ip_sanctions
         return {
             'config': self.config.to_dict(),
@@ -1155,8 +1290,9 @@ class CooperativeTradingDetector:
             'output_directory': self.config.output_dir,
         }
     
-    def _empty_result(self) -> Dict:
-        """빈 결과 반환"""
+    def _empty_result(self, con: dd.DuckDBPyConnection) -> Dict:
+        """빈 결과 게시 후 반환 (이전 실행의 결과 테이블이 API에 남지 않도록)"""
+        ResultsStore(con).publish_run('coop', self.config.to_dict())
         return {
             'config': self.config.to_dict(),
             'total_candidates': 0,
@@ -1174,7 +1310,8 @@ class CooperativeTradingDetector:
 
 def run_detection(
     data_filepath: str,
-    config: Optional[DetectionConfig] = None
+    config: Optional[DetectionConfig] = None,
+    con: Optional[dd.DuckDBPyConnection] = None
 ) -> Dict:
     """
     공모거래 탐지 실행
@@ -1182,6 +1319,7 @@ def run_detection(
     Args:
         data_filepath: Excel 데이터 파일 경로
         config: 탐지 설정 (None이면 기본값 사용)
+        con: 공유 DuckDB 커넥션/커서 (None이면 탐지기가 직접 연결)
     
     Returns:
         탐지 결과 딕셔너리
@@ -1194,7 +1332,7 @@ def run_detection(
     
     # 탐지 실행
     detector = CooperativeTradingDetector(config)
-    result = detector.detect(data_filepath)
+    result = detector.detect(data_filepath, con=con)
     
     return result
 
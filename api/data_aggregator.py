@@ -1,28 +1,53 @@
 """
 Data Aggregator for Detection System
 모든 모델의 output을 읽어서 통합하는 레이어
+
+탐지기가 DuckDB에 게시한 결과 테이블(common.results_store)을 우선 조회하고,
+아직 게시된 적 없는 모델은 output 디렉토리의 CSV/JSON 파일을 읽음
+
+캐시는 모델별로 세대(게시 세대 또는 결과 파일 수정 시각)를 키로 유지되며,
+세대가 바뀐 모델만 다시 읽음. 같은 모델의 동시 리로드는 한 번만 실행 (single-flight)
 """
 
 import json
+import threading
+import time
 import pandas as pd
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from datetime import datetime
 from collections import defaultdict
 
+from api.detection_index import RecordIndex, decode_cursor, encode_cursor
+from common.materialized import (
+    FIRST_TRADE_TABLE, POSITIONS_TABLE, ensure_first_trades, ensure_positions, ensure_trade_account_index,
+)
+from common.results_store import ResultsStore
+
 
 class DataAggregator:
     """모든 탐지 모델의 output 데이터를 통합"""
     
+    # 통합 데이터 키 -> 결과 스토어 모델 이름
+    MODELS = {'bonus': 'wash', 'funding': 'funding', 'cooperative': 'coop'}
+    
     def __init__(self, output_base_dir: str = "output"):
         self.output_base_dir = Path(output_base_dir)
         self.bonus_dir = self.output_base_dir / "bonus"
         self.funding_dir = self.output_base_dir / "funding_fee"
         self.cooperative_dir = self.output_base_dir / "cooperative"
         
-        # 캐시
+        # 캐시: 모델 -> (세대, 데이터, 로드 완료 시각), 통합 스냅샷은 모델 캐시가 바뀔 때만 재구성
+        self._model_cache: Dict[str, Tuple[Any, Dict[str, Any], float]] = {}
         self._cache: Dict[str, Any] = {}
         self._cache_timestamp: Optional[datetime] = None
+        self._cache_lock = threading.Lock()
+        self._load_locks = {key: threading.Lock() for key in self.MODELS}
+        
+        # 점수순 인덱스 (detections / sanctions): 이름 -> (모델 캐시 세대, 인덱스)
+        self._indexes: Dict[str, Tuple[tuple, RecordIndex]] = {}
+        self._index_locks = {name: threading.Lock() for name in ('detections', 'sanctions')}
     
     def _read_json(self, filepath: Path) -> Optional[Dict]:
         """JSON 파일 읽기"""
@@ -43,42 +68,189 @@ class DataAggregator:
             print(f"Error reading {filepath}: {e}")
         return None
     
-    def get_all_data(self, force_reload: bool = False) -> Dict[str, Any]:
-        """모든 데이터를 통합하여 반환"""
-        
-        # 캐시 확인 (5분 이내면 캐시 사용)
-        if not force_reload and self._cache and self._cache_timestamp:
-            elapsed = (datetime.now() - self._cache_timestamp).total_seconds()
-            if elapsed < 300:  # 5분
-                return self._cache
-        
-        print("Loading all detection data...")
-        
-        # 각 모델 데이터 로드
-        bonus_data = self._load_bonus_data()
-        funding_data = self._load_funding_data()
-        cooperative_data = self._load_cooperative_data()
-        
-        # 데이터 통합
-        integrated_data = {
-            'bonus': bonus_data,
-            'funding': funding_data,
-            'cooperative': cooperative_data,
-            'timestamp': datetime.now().isoformat(),
-        }
+    def _open_results_store(self) -> Optional[ResultsStore]:
+        """결과 테이블 조회용 스토어 (DuckDB 연결 실패 시 None -> 파일에서 읽음)"""
+        from common.data_manager import get_data_manager
         
-        # 캐시 업데이트
-        self._cache = integrated_data
-        self._cache_timestamp = datetime.now()
+        try:
+            dm = get_data_manager()
+            return ResultsStore(dm.get_connection(persistent=True).cursor())  # 백그라운드 작업과 분리된 커서
+        except Exception as e:
+            print(f"Warning: Results store unavailable, reading output files: {e}")
+            return None
+    
+    @contextmanager
+    def _cursor(self, required: bool = True) -> Iterator[Optional[Any]]:
+        """
+        백그라운드 작업과 분리된 DuckDB 커서 (with 블록을 벗어나면 닫음)
         
-        print("Data loading complete!")
+        required=False면 연결 실패 시 경고만 출력하고 None을 넘김
+        """
+        from common.data_manager import get_data_manager
         
-        return integrated_data
+        try:
+            con = get_data_manager().get_connection(persistent=True).cursor()
+        except Exception as e:
+            if required:
+                raise
+            print(f"Warning: Failed to connect to DuckDB: {e}")
+            con = None
+        try:
+            yield con
+        finally:
+            if con is not None:
+                con.close()
+    
+    def _close_results_store(self, store: Optional[ResultsStore]):
+        if store is not None:
+            try:
+                store.con.close()
+            except Exception:
+                pass
     
-    def _load_bonus_data(self) -> Dict[str, Any]:
+    def _load_from_store(
+        self,
+        store: Optional[ResultsStore],
+        model: str,
+        documents: Dict[str, str],
+        frames: Dict[str, str],
+    ) -> Optional[Dict[str, Any]]:
+        """게시된 결과 테이블에서 모델 데이터 구성 (게시 전이면 None)"""
+        try:
+            if store is None or not store.has_results(model):
+                return None
+            data = {key: store.read_document(model, name) for key, name in documents.items()}
+            data.update({key: store.read_records(model, name) for key, name in frames.items()})
+            return data
+        except Exception as e:
+            print(f"Warning: Failed to read results tables for {model}, reading output files: {e}")
+            return None
+    
+    def _model_dir(self, key: str) -> Path:
+        return {'bonus': self.bonus_dir, 'funding': self.funding_dir, 'cooperative': self.cooperative_dir}[key]
+    
+    def _files_generation(self, directory: Path) -> Optional[tuple]:
+        """결과 파일 세대 (파일명, 수정 시각, 크기) - 결과 테이블을 게시하지 않은 모델용"""
+        try:
+            return tuple(sorted(
+                (f.name, f.stat().st_mtime_ns, f.stat().st_size)
+                for f in directory.iterdir() if f.suffix in ('.csv', '.json')
+            ))
+        except OSError:
+            return None
+    
+    def _current_generations(self, store: Optional[ResultsStore]) -> Dict[str, Any]:
+        """모델별 현재 세대 (게시 세대 우선, 없으면 결과 파일 상태)"""
+        published = {}
+        if store is not None:
+            try:
+                published = store.generations()
+            except Exception as e:
+                print(f"Warning: Failed to read result generations: {e}")
+        return {
+            key: ('store', published[model]) if model in published
+            else ('files', self._files_generation(self._model_dir(key)))
+            for key, model in self.MODELS.items()
+        }
+    
+    def _ensure_model_loaded(
+        self,
+        key: str,
+        generation: Any,
+        store: Optional[ResultsStore],
+        requested_at: Optional[float] = None,
+    ):
+        """세대가 바뀐 모델만 리로드 (requested_at: 강제 리로드 요청 시각)"""
+        def is_fresh(cached) -> bool:
+            if cached is None or cached[0] != generation:
+                return False
+            # 강제 리로드는 요청 이후에 끝난 로드만 재사용
+            return requested_at is None or cached[2] >= requested_at
+        
+        if is_fresh(self._model_cache.get(key)):
+            return
+        with self._load_locks[key]:
+            # 기다리는 동안 다른 요청이 같은 세대를 로드했으면 그대로 사용 (single-flight)
+            if is_fresh(self._model_cache.get(key)):
+                return
+            loader = {
+                'bonus': self._load_bonus_data,
+                'funding': self._load_funding_data,
+                'cooperative': self._load_cooperative_data,
+            }[key]
+            data = loader(store if generation[0] == 'store' else None)
+            with self._cache_lock:
+                self._model_cache[key] = (generation, data, time.monotonic())
+                self._cache = {
+                    **{k: self._model_cache[k][1] for k in self.MODELS if k in self._model_cache},
+                    'timestamp': datetime.now().isoformat(),
+                }
+                self._cache_timestamp = datetime.now()
+    
+    def get_all_data(self, force_reload: bool = False) -> Dict[str, Any]:
+        """모든 데이터를 통합하여 반환 (세대가 바뀐 모델만 다시 읽음)"""
+        requested_at = time.monotonic() if force_reload else None
+        store = self._open_results_store()
+        try:
+            if store is not None:
+                # 세대 확인과 로드를 한 트랜잭션에서 (게시 도중의 결과가 섞이지 않음)
+                with store.snapshot():
+                    generations = self._current_generations(store)
+                    for key in self.MODELS:
+                        self._ensure_model_loaded(key, generations[key], store, requested_at)
+            else:
+                generations = self._current_generations(None)
+                for key in self.MODELS:
+                    self._ensure_model_loaded(key, generations[key], None, requested_at)
+        finally:
+            self._close_results_store(store)
+        
+        with self._cache_lock:
+            return self._cache
+    
+    def _loaded_generations(self) -> tuple:
+        """현재 모델 캐시의 (모델, 세대, 로드 완료 시각) - 인덱스 재구성 여부 판단용"""
+        with self._cache_lock:
+            return tuple(
+                (key, self._model_cache[key][0], self._model_cache[key][2])
+                for key in self.MODELS if key in self._model_cache
+            )
+    
+    def _get_index(self, name: str, build) -> RecordIndex:
+        """모델 캐시 세대가 바뀌었을 때만 인덱스 재구성 (동시 요청은 한 번만 구성)"""
+        self.get_all_data()
+        generation = self._loaded_generations()
+        cached = self._indexes.get(name)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        with self._index_locks[name]:
+            cached = self._indexes.get(name)
+            if cached is not None and cached[0] == generation:
+                return cached[1]
+            index = RecordIndex(build())
+            self._indexes[name] = (generation, index)
+            return index
+    
+    def detection_index(self) -> RecordIndex:
+        """탐지 케이스 점수순 인덱스 (결과 세대마다 한 번 구성)"""
+        return self._get_index('detections', self.get_detections)
+    
+    def sanction_index(self) -> RecordIndex:
+        """제재 케이스 점수순 인덱스 (결과 세대마다 한 번 구성)"""
+        return self._get_index('sanctions', self.get_sanctions)
+    
+    def _load_bonus_data(self, store: Optional[ResultsStore] = None) -> Dict[str, Any]:
         """Bonus Laundering 데이터 로드"""
         print("  - Loading bonus data...")
         
+        data = self._load_from_store(
+            store, 'wash',
+            documents={'config': 'config', 'visualization': 'visualization', 'sanctions': 'sanctions'},
+            frames={'trade_pairs': 'pairs'},
+        )
+        if data is not None:
+            return data
+        
         data = {
             'config': self._read_json(self.bonus_dir / 'detection_config.json'),
             'visualization': self._read_json(self.bonus_dir / 'visualization_data.json'),
@@ -93,10 +265,18 @@ class DataAggregator:
         
         return data
     
-    def _load_funding_data(self) -> Dict[str, Any]:
+    def _load_funding_data(self, store: Optional[ResultsStore] = None) -> Dict[str, Any]:
         """Funding Fee Hunter 데이터 로드"""
         print("  - Loading funding fee data...")
         
+        data = self._load_from_store(
+            store, 'funding',
+            documents={'config': 'config', 'visualization': 'visualization', 'sanctions': 'sanctions'},
+            frames={'cases': 'cases', 'account_summaries': 'accounts'},
+        )
+        if data is not None:
+            return data
+        
         data = {
             'config': self._read_json(self.funding_dir / 'detection_config.json'),
             'visualization': self._read_json(self.funding_dir / 'visualization_data.json'),
@@ -116,10 +296,18 @@ class DataAggregator:
         
         return data
     
-    def _load_cooperative_data(self) -> Dict[str, Any]:
+    def _load_cooperative_data(self, store: Optional[ResultsStore] = None) -> Dict[str, Any]:
         """Cooperative Trading 데이터 로드"""
         print("  - Loading cooperative trading data...")
         
+        data = self._load_from_store(
+            store, 'coop',
+            documents={'config': 'config', 'visualization': 'visualization', 'sanctions': 'sanctions'},
+            frames={'trade_pairs': 'pairs', 'groups': 'groups'},
+        )
+        if data is not None:
+            return data
+        
         data = {
             'config': self._read_json(self.cooperative_dir / 'detection_config.json'),
             'visualization': self._read_json(self.cooperative_dir / 'visualization_data.json'),
@@ -182,20 +370,59 @@ class DataAggregator:
             },
         }
     
+    def _join_keys(self, con, keys: List[tuple], columns: List[str], sql: str) -> Dict[tuple, Any]:
+        """키 목록을 DataFrame으로 등록해 한 번의 조인으로 조회 (sql: _keys(k, <columns>) 참조, (k, 값) 반환)"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        keys_df = pd.DataFrame(
+            [(i, *(str(v) for v in key)) for i, key in enumerate(keys)],
+            columns=['k', *columns],
+        )
+        con.register('_keys', keys_df)
+        try:
+            rows = con.execute(sql).fetchall()
+        finally:
+            con.unregister('_keys')
+        return {keys[k]: value for k, value in rows if value is not None}
+    
+    def _first_trade_times(self, con, account_symbol_pairs: List[Tuple[Any, Any]]) -> Dict[tuple, Any]:
+        """(account_id, symbol) -> 첫 거래 시각 (account_symbol_first_trade 테이블 조인)"""
+        ensure_first_trades(con)
+        return self._join_keys(
+            con, account_symbol_pairs, ['account_id', 'symbol'],
+            f'''
+                SELECT k.k, f.first_ts
+                FROM _keys k
+                JOIN "{FIRST_TRADE_TABLE}" f ON f.account_id = k.account_id AND f.symbol = k.symbol
+            ''',
+        )
+    
+    def _position_open_times(self, con, position_ids: List[Any]) -> Dict[Any, Any]:
+        """position_id -> 포지션 시작 시각 (positions 테이블 조인)"""
+        ensure_positions(con)
+        times = self._join_keys(
+            con, [(pid,) for pid in position_ids], ['position_id'],
+            f'''
+                SELECT k.k, MIN(p.open_ts)
+                FROM _keys k
+                JOIN "{POSITIONS_TABLE}" p ON p.position_id = k.position_id
+                GROUP BY k.k
+            ''',
+        )
+        return {key[0]: value for key, value in times.items()}
+    
     def get_detections(self) -> List[Dict[str, Any]]:
         """모든 탐지 케이스 통합 반환 (제재 여부 포함)"""
-        from common.data_manager import get_data_manager
-        
         all_data = self.get_all_data()
-        detections = []
         
-        # DuckDB 연결하여 실제 거래 시간 가져오기
-        try:
-            dm = get_data_manager()
-            con = dm.get_connection(persistent=True)
-        except Exception as e:
-            print(f"Warning: Failed to connect to DuckDB: {e}")
-            con = None
+        # DuckDB 연결하여 실제 거래 시간 가져오기 (연결 실패 시 시간 정보 없이)
+        with self._cursor(required=False) as con:
+            return self._collect_detections(all_data, con)
+    
+    def _collect_detections(self, all_data: Dict[str, Any], con: Optional[Any]) -> List[Dict[str, Any]]:
+        """통합 탐지 케이스 구성 (con: 거래 시간 조회용 커서, None이면 시간 조회 생략)"""
+        detections = []
         
         # 제재 케이스 ID 맵 생성
         sanction_ids = set()
@@ -248,20 +475,11 @@ class DataAggregator:
                 if loser and symbol:
                     account_symbol_pairs.append((loser, symbol))
             
-            # DB에서 시간 정보 가져오기 (loser 계정 기준)
+            # DB에서 시간 정보 가져오기 (loser 계정 기준, 첫 거래 시각 테이블과 한 번에 조인)
             pair_times = {}
             if con and account_symbol_pairs:
                 try:
-                    # 각 (account, symbol) 조합의 최소 시간 가져오기
-                    for account, symbol in account_symbol_pairs:
-                        query = f"""
-                            SELECT MIN(ts) as open_time
-                            FROM Trade
-                            WHERE account_id = '{account}' AND symbol = '{symbol}'
-                        """
-                        result = con.execute(query).fetchone()
-                        if result and result[0]:
-                            pair_times[(account, symbol)] = result[0]
+                    pair_times = self._first_trade_times(con, account_symbol_pairs)
                 except Exception as e:
                     print(f"Warning: Failed to fetch trade times for wash trading: {e}")
             
@@ -313,21 +531,11 @@ class DataAggregator:
             # position_id로 실제 거래 시간 가져오기 (배치 조회)
             position_ids = [case.get('position_id') for case in funding_cases if case.get('position_id')]
             
-            # DB에서 시간 정보 가져오기
+            # DB에서 시간 정보 가져오기 (position_id 목록을 등록해 positions 테이블과 조인)
             position_times = {}
             if con and position_ids:
                 try:
-                    position_ids_str = ', '.join([f"'{pid}'" for pid in position_ids])
-                    query = f"""
-                        SELECT position_id, MIN(ts) as open_time
-                        FROM Trade
-                        WHERE position_id IN ({position_ids_str})
-                        GROUP BY position_id
-                    """
-                    result = con.execute(query).fetchall()
-                    for row in result:
-                        if row[0] and row[1]:
-                            position_times[row[0]] = row[1]
+                    position_times = self._position_open_times(con, position_ids)
                 except Exception as e:
                     print(f"Warning: Failed to fetch trade times for funding fee: {e}")
             
@@ -373,19 +581,11 @@ class DataAggregator:
                 if account1 and symbol:
                     account_symbol_pairs.append((account1, symbol))
             
-            # DB에서 시간 정보 가져오기
+            # DB에서 시간 정보 가져오기 (첫 거래 시각 테이블과 한 번에 조인)
             pair_times = {}
             if con and account_symbol_pairs:
                 try:
-                    for account, symbol in account_symbol_pairs:
-                        query = f"""
-                            SELECT MIN(ts) as open_time
-                            FROM Trade
-                            WHERE account_id = '{account}' AND symbol = '{symbol}'
-                        """
-                        result = con.execute(query).fetchone()
-                        if result and result[0]:
-                            pair_times[(account, symbol)] = result[0]
+                    pair_times = self._first_trade_times(con, account_symbol_pairs)
                 except Exception as e:
                     print(f"Warning: Failed to fetch trade times for cooperative: {e}")
             
@@ -691,62 +891,97 @@ class DataAggregator:
         all_data = self.get_all_data()
         return all_data['cooperative'].get('groups', [])
     
-    def get_account_trade_history(self, account_id: str) -> List[Dict[str, Any]]:
-        """특정 계정의 거래 이력 반환
+    # 계정 거래 이력 (keyset 페이지): 계정 조건만 MATERIALIZED CTE로 분리해야 Trade(account_id) 인덱스를 사용
+    ACCOUNT_TRADES_SQL = """
+        WITH account_trades AS MATERIALIZED (
+            SELECT rowid AS row_id, position_id, account_id, ts, symbol, side, leverage, price, qty, amount
+            FROM Trade
+            WHERE account_id = $account_id
+        )
+        SELECT row_id, position_id, account_id, ts, symbol, side, leverage, price, qty, amount
+        FROM account_trades
+        WHERE $cursor_ts IS NULL OR ts < $cursor_ts OR (ts = $cursor_ts AND row_id < $cursor_row)
+        ORDER BY ts DESC, row_id DESC
+        LIMIT $limit
+    """
+    
+    def get_account_trade_page(
+        self,
+        account_id: str,
+        limit: int = 1000,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """계정 거래 이력 한 페이지 (최신순)와 다음 페이지 cursor (마지막 페이지면 None)"""
+        cursor_ts, cursor_row = None, None
+        if cursor:
+            cursor_ts, cursor_row = decode_cursor(cursor, 2)
+            try:
+                cursor_ts, cursor_row = datetime.fromisoformat(str(cursor_ts)), int(cursor_row)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid cursor: {cursor}") from e
+        
+        with self._cursor() as con:
+            try:
+                ensure_trade_account_index(con)
+            except Exception as e:
+                print(f"Warning: Trade(account_id) index unavailable: {e}")
+            
+            # limit + 1개를 읽어 다음 페이지 존재 여부 확인
+            rows = con.execute(self.ACCOUNT_TRADES_SQL, {
+                'account_id': account_id,
+                'cursor_ts': cursor_ts,
+                'cursor_row': cursor_row,
+                'limit': limit + 1,
+            }).fetchall()
         
-        Note: 현재는 탐지된 거래만 반환. 
-        전체 거래 이력은 별도 데이터베이스 쿼리 필요.
+        trades = []
+        for row in rows[:limit]:
+            trades.append({
+                'trade_id': row[1] if row[1] else f'TRADE_{len(trades)}',
+                'account_id': row[2],
+                'timestamp': str(row[3]),  # timestamp를 문자열로 변환
+                'symbol': row[4],
+                'side': row[5],
+                'position_id': row[1] if row[1] else '',
+                'leverage': float(row[6]) if row[6] else 1.0,
+                'price': float(row[7]) if row[7] else 0.0,
+                'quantity': float(row[8]) if row[8] else 0.0,
+                'amount': float(row[9]) if row[9] else 0.0,
+            })
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor([last[3].isoformat(), last[0]])
+        return trades, next_cursor
+    
+    def get_account_trade_history(
+        self,
+        account_id: str,
+        limit: int = 1000,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """특정 계정의 거래 이력 반환 (최신순 limit건, 다음 페이지 cursor)
+        
+        Note: 첫 페이지(cursor 없음)의 DB 조회에 실패하거나 거래가 없으면 탐지된 거래에서 찾음.
+              다음 페이지(cursor 있음) 조회 실패는 그대로 raise.
         """
-        from common.data_manager import get_data_manager
-        
-        # 먼저 DuckDB에서 실제 거래 데이터를 조회
         try:
-            dm = get_data_manager()
-            con = dm.get_connection(persistent=True)
-            
-            # Trade 테이블에서 해당 계정의 거래 조회 (컬럼명 수정)
-            query = f"""
-                SELECT 
-                    position_id as trade_id,
-                    account_id,
-                    ts as timestamp,
-                    symbol,
-                    side,
-                    position_id,
-                    leverage,
-                    price,
-                    qty as quantity,
-                    amount
-                FROM Trade
-                WHERE account_id = '{account_id}'
-                ORDER BY ts DESC
-                LIMIT 1000
-            """
-            
-            result = con.execute(query).fetchall()
-            
-            if result:
-                trades = []
-                for row in result:
-                    trades.append({
-                        'trade_id': row[0] if row[0] else f'TRADE_{len(trades)}',
-                        'account_id': row[1],
-                        'timestamp': str(row[2]),  # timestamp를 문자열로 변환
-                        'symbol': row[3],
-                        'side': row[4],
-                        'position_id': row[5] if row[5] else '',
-                        'leverage': float(row[6]) if row[6] else 1.0,
-                        'price': float(row[7]) if row[7] else 0.0,
-                        'quantity': float(row[8]) if row[8] else 0.0,
-                        'amount': float(row[9]) if row[9] else 0.0,
-                    })
-                return trades
+            trades, next_cursor = self.get_account_trade_page(account_id, limit, cursor)
+            if trades or cursor:
+                return trades, next_cursor
+        except ValueError:
+            raise  # 잘못된 cursor
         except Exception as e:
+            if cursor:
+                raise  # 탐지 거래로 대체하면 이전 페이지와 다른 목록이 이어짐
             print(f"Error querying trades from database: {e}")
             import traceback
             traceback.print_exc()
         
-        # DB 조회 실패 시 기존 방식 사용
+        return self._detected_account_trades(account_id), None
+    
+    def _detected_account_trades(self, account_id: str) -> List[Dict[str, Any]]:
+        """탐지 결과(증정금/펀딩비/공모 케이스)에 포함된 계정 거래"""
         all_data = self.get_all_data()
         trades = []
         
@@ -827,8 +1062,37 @@ class DataAggregator:
         
         return trades
     
+    def _find_case_in_store(self, model: str, case_id: str) -> Optional[Dict[str, Any]]:
+        """결과 테이블에서 케이스 ID로 바로 조회 (게시 전이거나 실패하면 None)"""
+        # API 모델 이름 -> (스토어 모델, [(프레임, ID 컬럼)])
+        lookups = {
+            'wash': ('wash', [('pairs', 'pair_id')]),
+            'funding': ('funding', [('cases', 'case_id')]),
+            'cooperative': ('coop', [('pairs', 'pair_id'), ('groups', 'group_id')]),
+        }
+        if model not in lookups:
+            return None
+        store_model, frames = lookups[model]
+        store = self._open_results_store()
+        try:
+            if store is None or not store.has_results(store_model):
+                return None
+            for name, id_column in frames:
+                rows = store.read_records(store_model, name, where=f'"{id_column}" = ?', params=[case_id], limit=1)
+                if rows:
+                    return rows[0]
+        except Exception as e:
+            print(f"Warning: Failed to query results tables for case {case_id}: {e}")
+        finally:
+            self._close_results_store(store)
+        return None
+    
     def get_case_detail(self, model: str, case_id: str) -> Optional[Dict[str, Any]]:
         """특정 케이스의 상세 정보 반환"""
+        case = self._find_case_in_store(model, case_id)
+        if case is not None:
+            return case
+        
         all_data = self.get_all_data()
         
         if model == 'wash':
@@ -864,14 +1128,10 @@ class DataAggregator:
     
     def get_simulation_status(self) -> Dict[str, Any]:
         """시뮬레이션 현재 상태 조회"""
-        from common.data_manager import get_data_manager
-        
         try:
-            dm = get_data_manager()
-            con = dm.get_connection(persistent=True)
-            
             # simulaterTime 테이블에서 current_time 조회
-            result = con.execute('SELECT current_time FROM "simulaterTime"').fetchone()
+            with self._cursor() as con:
+                result = con.execute('SELECT current_time FROM "simulaterTime"').fetchone()
             current_time = result[0] if result else None
             
             if current_time:
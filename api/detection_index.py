@@ -0,0 +1,153 @@
+"""Score-ordered index over the unified detection / sanction lists.
+
+Features
+- Built once per results generation from `DataAggregator.get_detections()`
+  or `get_sanctions()`; records are kept sorted by (score desc, model, id).
+- Keyset pagination: `page()` returns the next cursor (an opaque encoding of
+  the last row's sort key), so a page costs O(limit) instead of re-sorting
+  the whole list per request. A cursor stays valid across rebuilds.
+- Filters: model / type / sanctioned / account use posting lists (record
+  positions per value); the shortest list drives the scan and the remaining
+  predicates (including the timestamp range) are checked per row.
+- Field projection: `fields=['id', 'score']` drops everything else (e.g. `raw`).
+
+# usage
+from api.detection_index import RecordIndex
+index = RecordIndex(aggregator.get_detections())
+rows, cursor = index.page(limit=50, model='wash', fields=['id', 'score'])
+rows, cursor = index.page(limit=50, model='wash', cursor=cursor)
+"""
+from __future__ import annotations
+
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def timestamp_ms(value: Any) -> Optional[int]:
+    """탐지/제재 timestamp (ms 정수, datetime, ISO 문자열) -> ms (해석 불가 시 None)"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def _score(record: Dict[str, Any]) -> float:
+    try:
+        return float(record.get('score') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _sort_key(record: Dict[str, Any]) -> Tuple[float, str, str]:
+    return (-_score(record), str(record.get('model', '')), str(record.get('id', '')))
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """정렬 키 -> 불투명 cursor 문자열 (JSON 직렬화 불가 값은 str)"""
+    return base64.urlsafe_b64encode(json.dumps(list(key), default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """cursor 문자열 -> 정렬 키 (값 size개, 형식이 틀리면 ValueError)"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key
+
+
+class RecordIndex:
+    """Score-ordered records with posting lists for keyset pagination."""
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.records: List[Dict[str, Any]] = sorted(records, key=_sort_key)
+        self.keys = [_sort_key(r) for r in self.records]
+        self.timestamps = [timestamp_ms(r.get('timestamp')) for r in self.records]
+
+        # 필터 값 -> 레코드 위치 (정렬 순서 유지)
+        self.postings: Dict[str, Dict[Any, List[int]]] = {
+            'model': defaultdict(list),
+            'type': defaultdict(list),
+            'sanctioned': defaultdict(list),
+            'account': defaultdict(list),
+        }
+        for pos, record in enumerate(self.records):
+            self.postings['model'][record.get('model')].append(pos)
+            self.postings['type'][record.get('type')].append(pos)
+            self.postings['sanctioned'][bool(record.get('is_sanctioned', True))].append(pos)
+            for account in dict.fromkeys(record.get('accounts') or []):
+                self.postings['account'][account].append(pos)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        model: Optional[str] = None,
+        type: Optional[str] = None,
+        sanctioned: Optional[bool] = None,
+        account: Optional[str] = None,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """cursor 다음부터 조건에 맞는 최대 limit개와 다음 페이지 cursor (마지막 페이지면 None)
+
+        start_ms/end_ms: timestamp 범위 [start_ms, end_ms] (ms)
+        """
+        begin = 0
+        if cursor:
+            try:
+                neg_score, cursor_model, cursor_id = decode_cursor(cursor, 3)
+                begin = bisect_right(self.keys, (float(neg_score), str(cursor_model), str(cursor_id)))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid cursor: {cursor}") from e
+
+        # 가장 짧은 posting list로 후보를 좁힘 (조건이 없으면 전체 순회)
+        filters = {'model': model, 'type': type, 'sanctioned': sanctioned, 'account': account}
+        lists = [self.postings[name].get(value, []) for name, value in filters.items() if value is not None]
+        if lists:
+            driver = min(lists, key=len)
+            candidates = iter(driver[bisect_left(driver, begin):])
+        else:
+            candidates = iter(range(begin, len(self.records)))
+
+        rows: List[int] = []
+        for pos in candidates:
+            record = self.records[pos]
+            if model is not None and record.get('model') != model:
+                continue
+            if type is not None and record.get('type') != type:
+                continue
+            if sanctioned is not None and bool(record.get('is_sanctioned', True)) != sanctioned:
+                continue
+            if account is not None and account not in (record.get('accounts') or []):
+                continue
+            if start_ms is not None or end_ms is not None:
+                ts = self.timestamps[pos]
+                if ts is None or (start_ms is not None and ts < start_ms) or (end_ms is not None and ts > end_ms):
+                    continue
+            if limit is not None and len(rows) == limit:
+                # limit개를 채운 뒤 조건에 맞는 행이 더 있으면 다음 페이지 존재
+                return self._project(rows, fields), encode_cursor(self.keys[rows[-1]])
+            rows.append(pos)
+        return self._project(rows, fields), None
+
+    def _project(self, positions: List[int], fields: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+        if not fields:
+            return [self.records[pos] for pos in positions]
+        return [{f: self.records[pos][f] for f in fields if f in self.records[pos]} for pos in positions]
@@ -0,0 +1,154 @@
+"""
+Background Job Runner
+시뮬레이션 진행/리셋 + 탐지 재실행을 API 프로세스 안에서 백그라운드로 실행
+
+- 작업은 단일 워커 스레드에서 순서대로 실행 (DB 변경 작업 직렬화)
+- 작업마다 job_id를 발급하고 상태(pending/running/succeeded/failed/cancelled)를 조회 가능
+- 취소는 협조적: 대기 중이면 즉시 취소, 실행 중이면 다음 단계 경계에서 중단
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """작업이 취소 요청을 받아 중단됨"""
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    params: Dict[str, Any]
+    status: JobStatus = JobStatus.PENDING
+    stage: str = "queued"
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def set_stage(self, stage: str):
+        """현재 단계 기록 + 취소 요청 확인 (단계 경계가 취소 지점)"""
+        self.check_cancelled()
+        self.stage = stage
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.job_id} cancelled during '{self.stage}'")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status.value,
+            'stage': self.stage,
+            'cancel_requested': self.cancel_event.is_set(),
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobRunner:
+    """단일 워커 백그라운드 작업 실행기"""
+
+    def __init__(self, max_workers: int = 1, max_history: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sim-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.max_history = max_history
+
+    def submit(self, kind: str, fn: Callable[..., Dict[str, Any]], **params) -> Job:
+        """fn(job, **params)를 백그라운드에서 실행하고 Job을 즉시 반환"""
+        job = Job(job_id=uuid.uuid4().hex, kind=kind, params=params)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._futures[job.job_id] = self._executor.submit(self._run, job, fn, params)
+            self._prune()
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now()
+        try:
+            job.check_cancelled()
+            job.result = fn(job, **params)
+            job.status = JobStatus.SUCCEEDED
+            job.stage = "done"
+            return job.result
+        except JobCancelled as e:
+            job.status = JobStatus.CANCELLED
+            job.error = str(e)
+            raise
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            raise
+        finally:
+            job.finished_at = datetime.now()
+
+    def _prune(self):
+        # 오래된 완료 작업부터 정리 (진행 중 작업은 유지)
+        finished = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+        while len(self._jobs) > self.max_history:
+            old_id = next((jid for jid, j in self._jobs.items() if j.status in finished), None)
+            if old_id is None:
+                break
+            self._jobs.pop(old_id)
+            self._futures.pop(old_id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def future(self, job_id: str) -> Optional[Future]:
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """취소 요청. 대기 중인 작업은 바로 취소되고, 실행 중인 작업은 다음 단계 경계에서 중단됨"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if future is not None and future.cancel():
+            job.status = JobStatus.CANCELLED
+            job.error = f"Job {job_id} cancelled before start"
+            job.finished_at = datetime.now()
+        return job
+
+
+# 싱글톤 인스턴스
+_runner_instance: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """JobRunner 싱글톤 인스턴스 반환"""
+    global _runner_instance
+    with _runner_lock:
+        if _runner_instance is None:
+            _runner_instance = JobRunner()
+    return _runner_instance
@@ -3,7 +3,7 @@ Detection API Router
 탐지 시스템 관련 API 엔드포인트
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from typing import List, Dict, Any, Optional
 from api.data_aggregator import get_aggregator
 
@@ -33,17 +33,41 @@ async def get_stats():
         raise HTTPException(status_code=500, detail=f"Error getting stats: {str(e)}")
 
 
+def _page(index, response: Response, fields: Optional[str], **query) -> List[Dict[str, Any]]:
+    """인덱스 페이지 조회, 다음 페이지 cursor는 X-Next-Cursor 헤더로 전달"""
+    field_list = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+    try:
+        rows, next_cursor = index.page(fields=field_list, **query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+
 @router.get("/detections")
 async def get_detections(
+    response: Response,
     model: Optional[str] = Query(None, description="Filter by model: wash, funding, cooperative"),
-    limit: Optional[int] = Query(None, description="Limit number of results"),
+    type: Optional[str] = Query(None, description="Filter by type (tier / severity / risk level)"),
+    sanctioned: Optional[bool] = Query(None, description="Filter by sanction status"),
+    account: Optional[str] = Query(None, description="Filter by related account"),
+    start: Optional[int] = Query(None, description="Earliest timestamp (Unix ms, inclusive)"),
+    end: Optional[int] = Query(None, description="Latest timestamp (Unix ms, inclusive)"),
+    limit: Optional[int] = Query(None, description="Limit number of results", ge=1),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (e.g. id,model,score)"),
 ):
     """
-    모든 탐지 케이스 통합 리스트 (제재 여부 포함)
+    모든 탐지 케이스 통합 리스트 (제재 여부 포함, 점수 높은 순)
     
     Parameters:
         - model: 필터링할 모델 (wash, funding, cooperative)
-        - limit: 반환할 최대 개수
+        - type / sanctioned / account: 유형, 제재 여부, 관련 계정 필터
+        - start / end: timestamp 범위 (Unix ms)
+        - limit: 반환할 최대 개수 (다음 페이지가 있으면 X-Next-Cursor 헤더)
+        - cursor: 이전 페이지의 X-Next-Cursor 값
+        - fields: 반환할 필드 (생략 시 raw 포함 전체)
     
     Returns:
         List of detections with:
@@ -61,35 +85,39 @@ async def get_detections(
     """
     try:
         aggregator = get_aggregator()
-        detections = aggregator.get_detections()
-        
-        # 모델 필터링
-        if model:
-            detections = [d for d in detections if d['model'] == model]
-        
-        # 점수 기준 정렬 (높은 순)
-        detections = sorted(detections, key=lambda x: x.get('score', 0), reverse=True)
-        
-        # 제한
-        if limit:
-            detections = detections[:limit]
-        
-        return detections
+        return _page(
+            aggregator.detection_index(), response, fields,
+            limit=limit, cursor=cursor, model=model, type=type, sanctioned=sanctioned,
+            account=account, start_ms=start, end_ms=end,
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting detections: {str(e)}")
 
 
 @router.get("/sanctions")
 async def get_sanctions(
+    response: Response,
     model: Optional[str] = Query(None, description="Filter by model: wash, funding, cooperative"),
-    limit: Optional[int] = Query(None, description="Limit number of results"),
+    type: Optional[str] = Query(None, description="Filter by sanction type"),
+    account: Optional[str] = Query(None, description="Filter by related account"),
+    start: Optional[int] = Query(None, description="Earliest timestamp (Unix ms, inclusive)"),
+    end: Optional[int] = Query(None, description="Latest timestamp (Unix ms, inclusive)"),
+    limit: Optional[int] = Query(None, description="Limit number of results", ge=1),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (e.g. id,model,score)"),
 ):
     """
-    모든 제재 케이스 통합 리스트
+    모든 제재 케이스 통합 리스트 (점수 높은 순)
     
     Parameters:
         - model: 필터링할 모델 (wash, funding, cooperative)
-        - limit: 반환할 최대 개수
+        - type / account: 제재 유형, 관련 계정 필터
+        - start / end: timestamp 범위 (Unix ms)
+        - limit: 반환할 최대 개수 (다음 페이지가 있으면 X-Next-Cursor 헤더)
+        - cursor: 이전 페이지의 X-Next-Cursor 값
+        - fields: 반환할 필드 (생략 시 raw 포함 전체)
     
     Returns:
         List of sanctions with:
@@ -104,20 +132,13 @@ async def get_sanctions(
     """
     try:
         aggregator = get_aggregator()
-        sanctions = aggregator.get_sanctions()
-        
-        # 모델 필터링
-        if model:
-            sanctions = [s for s in sanctions if s['model'] == model]
-        
-        # 점수 기준 정렬 (높은 순)
-        sanctions = sorted(sanctions, key=lambda x: x.get('score', 0), reverse=True)
-        
-        # 제한
-        if limit:
-            sanctions = sanctions[:limit]
-        
-        return sanctions
+        return _page(
+            aggregator.sanction_index(), response, fields,
+            limit=limit, cursor=cursor, model=model, type=type,
+            account=account, start_ms=start, end_ms=end,
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting sanctions: {str(e)}")
 
@@ -230,7 +251,7 @@ async def reload_data():
     """
     데이터 강제 리로드
     
-    캐시를 무시하고 output 파일들을 다시 읽어옵니다.
+    캐시를 무시하고 결과 테이블(없으면 output 파일)을 다시 읽어옵니다.
     """
     try:
         aggregator = get_aggregator()
@@ -312,20 +333,29 @@ async def get_cooperative_groups():
 @router.get("/account/{account_id}/trades")
 async def get_account_trades(
     account_id: str,
+    response: Response,
+    limit: int = Query(1000, description="Number of trades per page", ge=1, le=10000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
 ):
     """
-    특정 계정의 거래 이력 반환
+    특정 계정의 거래 이력 반환 (최신순)
     
     Parameters:
         - account_id: 계정 ID
+        - limit: 페이지당 거래 수 (다음 페이지가 있으면 X-Next-Cursor 헤더)
+        - cursor: 이전 페이지의 X-Next-Cursor 값
     
     Returns:
         List of trades for the account
     """
     try:
         aggregator = get_aggregator()
-        trades = aggregator.get_account_trade_history(account_id)
+        trades, next_cursor = aggregator.get_account_trade_history(account_id, limit=limit, cursor=cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return trades
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting account trades: {str(e)}")
 
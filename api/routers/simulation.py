@@ -3,14 +3,13 @@ Simulation API Router
 시뮬레이션 관련 API 엔드포인트
 """
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-from typing import Optional
-import subprocess
-import sys
-from pathlib import Path
+from typing import Any, Dict
 from common.data_manager import get_data_manager
 from api.data_aggregator import get_aggregator
+from api.jobs import Job, JobCancelled, JobStatus, get_job_runner
 
 router = APIRouter()
 
@@ -37,134 +36,183 @@ async def get_simulation_status():
         raise HTTPException(status_code=500, detail=f"Error getting simulation status: {str(e)}")
 
 
+# ============================================================================
+# 백그라운드 작업 (API 프로세스 내부에서 실행, 웜 커넥션/로드된 데이터 재사용)
+# ============================================================================
+
+def _run_detections_in_process(job: Job, dm, incremental: bool = False):
+    """탐지 모델을 현재 프로세스에서 재실행하고 캐시를 리로드"""
+    from run_all_detections import run_all_detections
+
+    job.set_stage("detection")
+    print("Running detection models...")
+    results = run_all_detections(
+        con=dm.get_connection(persistent=True),
+        cancel_event=job.cancel_event,
+        incremental=incremental,
+    )
+    job.check_cancelled()
+
+    failed = {name: r['error'] for name, r in results.items() if name != 'metrics' and 'error' in r}
+    if failed:
+        raise Exception(f"Detection execution failed: {failed}")
+    print("Detection completed successfully")
+
+    # 새로 게시된 모델만 캐시 갱신 (다음 API 요청이 리로드를 기다리지 않도록 미리 로드)
+    job.set_stage("reload_cache")
+    get_aggregator().get_all_data()
+    return results.get('metrics', {})
+
+
+def _advance_job(job: Job, days: int, hours: int) -> Dict[str, Any]:
+    print(f"=== Simulation Advance Started ({job.job_id}) ===")
+    print(f"Advancing by {days} days and {hours} hours")
+
+    # 1. DataManager를 통해 데이터 진행
+    job.set_stage("advance_data")
+    dm = get_data_manager()
+    dm.advance_model_by_days(days=days, hours=hours)
+
+    # 2. 탐지 모델 재실행 (진행된 구간만 증분 계산) + 캐시 리로드
+    metrics = _run_detections_in_process(job, dm, incremental=True)
+
+    # 3. 새로운 상태 반환
+    status = get_aggregator().get_simulation_status()
+    print(f"=== Simulation Advance Completed ===")
+    return {
+        'status': 'success',
+        'job_id': job.job_id,
+        'current_time': status.get('current_time'),
+        'days_advanced': days,
+        'hours_advanced': hours,
+        'detection_metrics': metrics,
+        'message': f'Simulation advanced by {days} days and {hours} hours'
+    }
+
+
+def _reset_job(job: Job) -> Dict[str, Any]:
+    print(f"=== Simulation Reset Started ({job.job_id}) ===")
+
+    # 1. DataManager를 통해 초기 상태로 리셋
+    job.set_stage("seed_data")
+    dm = get_data_manager()
+    dm.seed_full_and_model(year=2025, month=2)
+
+    # 2. 탐지 모델 재실행 + 캐시 리로드
+    metrics = _run_detections_in_process(job, dm)
+
+    # 3. 새로운 상태 반환
+    status = get_aggregator().get_simulation_status()
+    print(f"=== Simulation Reset Completed ===")
+    return {
+        'status': 'success',
+        'job_id': job.job_id,
+        'current_time': status.get('current_time'),
+        'detection_metrics': metrics,
+        'message': 'Simulation reset to 2025-02-01'
+    }
+
+
+async def _await_job(job: Job, action: str) -> Dict[str, Any]:
+    """이벤트 루프를 막지 않고 작업 완료를 기다림"""
+    future = get_job_runner().future(job.job_id)
+    try:
+        return await asyncio.wrap_future(future)
+    except JobCancelled as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except asyncio.CancelledError:
+        # 대기 중 취소된 작업 (클라이언트 연결 종료는 그대로 전파)
+        if job.status == JobStatus.CANCELLED:
+            raise HTTPException(status_code=409, detail=job.error or "Job cancelled")
+        raise
+    except Exception as e:
+        print(f"Error {action} simulation: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error {action} simulation: {str(e)}")
+
+
+# ============================================================================
+# 엔드포인트
+# ============================================================================
+
 @router.post("/advance")
-async def advance_simulation(request: AdvanceRequest):
+async def advance_simulation(
+    request: AdvanceRequest,
+    wait: bool = Query(True, description="완료까지 대기 (false면 job 정보를 즉시 반환)"),
+):
     """
     시뮬레이션을 지정된 일수만큼 진행
     
     Parameters:
         - days: 진행할 일수 (기본 7일)
         - hours: 진행할 시간수 (기본 0시간)
+        - wait: false면 작업을 백그라운드로 등록하고 job 정보를 바로 반환
     
-    Process:
+    Process (백그라운드 작업):
         1. data_manager의 advance_model_by_days 호출
-        2. run_all_detections.py 실행하여 새 데이터 기반 탐지
-        3. 완료 후 새로운 상태 반환
+        2. 같은 프로세스에서 탐지 모델 재실행 (웜 DuckDB 커넥션 재사용)
+        3. 캐시 리로드 후 새로운 상태 반환
     
     Returns:
         - status: success or error
+        - job_id: 작업 ID (/jobs/{job_id}로 조회)
         - current_time: 진행 후 시뮬레이션 시간
         - message: 진행 결과 메시지
     """
-    try:
-        print(f"=== Simulation Advance Started ===")
-        print(f"Advancing by {request.days} days and {request.hours} hours")
-        
-        # 1. DataManager를 통해 데이터 진행
-        dm = get_data_manager()
-        dm.advance_model_by_days(days=request.days, hours=request.hours)
-        
-        # 2. 탐지 모델 재실행
-        print("Running detection models...")
-        script_path = Path(__file__).parent.parent.parent / "run_all_detections.py"
-
-        dm.close_connection()
-        
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
-            cwd=str(script_path.parent)
-        )
-
-        dm.reopen_connection()
-        
-        if result.returncode != 0:
-            print(f"Detection failed: {result.stderr}")
-            raise Exception(f"Detection execution failed: {result.stderr}")
-        
-        print("Detection completed successfully")
-        
-        # 3. 캐시 강제 리로드
-        aggregator = get_aggregator()
-        aggregator.get_all_data(force_reload=True)
-        
-        # 4. 새로운 상태 반환
-        status = aggregator.get_simulation_status()
-        
-        print(f"=== Simulation Advance Completed ===")
-        
-        return {
-            'status': 'success',
-            'current_time': status.get('current_time'),
-            'days_advanced': request.days,
-            'hours_advanced': request.hours,
-            'message': f'Simulation advanced by {request.days} days and {request.hours} hours'
-        }
-        
-    except Exception as e:
-        print(f"Error advancing simulation: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error advancing simulation: {str(e)}")
+    job = get_job_runner().submit('advance', _advance_job, days=request.days, hours=request.hours)
+    if not wait:
+        return job.to_dict()
+    return await _await_job(job, "advancing")
 
 
 @router.post("/reset")
-async def reset_simulation():
+async def reset_simulation(
+    wait: bool = Query(True, description="완료까지 대기 (false면 job 정보를 즉시 반환)"),
+):
     """
     시뮬레이션을 초기 상태로 리셋 (2025-02-01)
     
-    Process:
+    Process (백그라운드 작업):
         1. data_manager의 seed_full_and_model 재호출
-        2. run_all_detections.py 실행
+        2. 같은 프로세스에서 탐지 모델 재실행
         3. 캐시 리로드
     
     Returns:
         - status: success or error
+        - job_id: 작업 ID
         - current_time: 리셋 후 시뮬레이션 시간
         - message: 리셋 결과 메시지
     """
-    try:
-        print(f"=== Simulation Reset Started ===")
-        
-        # 1. DataManager를 통해 초기 상태로 리셋
-        dm = get_data_manager()
-        dm.seed_full_and_model(year=2025, month=2)
-        
-        # 2. 탐지 모델 재실행
-        print("Running detection models...")
-        script_path = Path(__file__).parent.parent.parent / "run_all_detections.py"
-
-        dm.close_connection()
-        
-        result = subprocess.run(
-            [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True,
-            cwd=str(script_path.parent)
-        )
-
-        dm.reopen_connection()
-        
-        if result.returncode != 0:
-            print(f"Detection failed: {result.stderr}")
-            raise Exception(f"Detection execution failed: {result.stderr}")
-        
-        print("Detection completed successfully")
-        
-        # 3. 캐시 강제 리로드
-        aggregator = get_aggregator()
-        aggregator.get_all_data(force_reload=True)
-        
-        # 4. 새로운 상태 반환
-        status = aggregator.get_simulation_status()
-        
-        print(f"=== Simulation Reset Completed ===")
-        
-        return {
-            'status': 'success',
-            'current_time': status.get('current_time'),
-            'message': 'Simulation reset to 2025-02-01'
-        }
-        
-    except Exception as e:
-        print(f"Error resetting simulation: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error resetting simulation: {str(e)}")
+    job = get_job_runner().submit('reset', _reset_job)
+    if not wait:
+        return job.to_dict()
+    return await _await_job(job, "resetting")
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    백그라운드 작업 상태 조회
+    
+    Returns:
+        - status: pending, running, succeeded, failed, cancelled
+        - stage: 현재 단계 (advance_data, seed_data, detection, reload_cache, done)
+        - result / error
+    """
+    job = get_job_runner().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    백그라운드 작업 취소 요청
+    
+    대기 중인 작업은 즉시 취소되고, 실행 중인 작업은 다음 단계 경계에서 중단됩니다.
+    (이미 반영된 데이터 진행은 되돌리지 않음)
+    """
+    job = get_job_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
@@ -6,6 +6,17 @@ detectors and dashboard code.
 Features
 - Loads an Excel file (default: problem_data_final.xlsx in repo root) once
   into a dict of pandas.DataFrame objects (one per sheet).
+- Keeps a per-sheet Parquet cache (data/cache) keyed by the workbook's
+  content hash, so later boots skip openpyxl parsing entirely. Per-sheet
+  load timings are available via `get_load_metrics()`.
+- `full_data_<sheet>` tables are written with explicit column types
+  (TIMESTAMP/DATE/ENUM/DOUBLE, see `FULL_TABLE_SCHEMAS`) and sorted by
+  time, so range predicates need no query-time casts and can prune
+  row groups. Cells that fail the cast become NULL and are counted per
+  column (warning + `get_load_metrics()[sheet]['cast_nulls']`).
+- `ingest_mode='streaming'` reads sheets (xlsx or CSV) in bounded row
+  batches and appends them straight into `full_data_<sheet>` tables at
+  seed time, so whole sheets are never held in pandas.
 - Exposes a DuckDB connection with each DataFrame registered as a table so
   existing SQL queries (used in detectors) can run against the in-memory
   tables.
@@ -23,13 +34,28 @@ con.execute('SELECT COUNT(*) FROM Trade').fetchall()
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 import pandas as pd
 import duckdb
+import hashlib
+import json
 import threading
+import time
 from datetime import datetime, timedelta
 from typing import List
 
+from common.incremental import reset_incremental_state
+from common.materialized import (
+    ensure_trade_account_index,
+    rebuild_first_trades,
+    rebuild_funding_cumulative,
+    rebuild_positions,
+    rebuild_spec_index,
+    refresh_first_trades,
+    refresh_funding_cumulative,
+    refresh_positions,
+)
+
 
 class DataManager:
     """Singleton manager that loads data once and provides accessors.
@@ -49,15 +75,58 @@ class DataManager:
                     cls._instance = super().__new__(cls)
         return cls._instance
 
-    def __init__(self, filepath: Optional[str] = None):
+    INGEST_MODES = ('eager', 'streaming')
+
+    # full_data_<sheet> 컬럼 타입. 'ENUM'은 적재 시점의 고유값으로 생성하고,
+    # 스키마에 없는 컬럼은 원본 타입을 그대로 유지함.
+    # 금액 컬럼은 DECIMAL 대신 DOUBLE을 사용 (pandas/탐지 로직과 동일한 부동소수 연산 유지)
+    FULL_TABLE_SCHEMAS: Dict[str, Dict[str, str]] = {
+        'Trade': {
+            'ts': 'TIMESTAMP', 'account_id': 'VARCHAR', 'position_id': 'VARCHAR',
+            'symbol': 'VARCHAR', 'side': 'ENUM', 'openclose': 'ENUM',
+            'amount': 'DOUBLE', 'leverage': 'DOUBLE', 'price': 'DOUBLE', 'qty': 'DOUBLE',
+        },
+        'Funding': {
+            'ts': 'TIMESTAMP', 'account_id': 'VARCHAR', 'symbol': 'VARCHAR', 'funding_fee': 'DOUBLE',
+        },
+        'Reward': {
+            'ts': 'TIMESTAMP', 'account_id': 'VARCHAR', 'reward_amount': 'DOUBLE',
+        },
+        'IP': {
+            'account_id': 'VARCHAR', 'ip': 'VARCHAR',
+        },
+        'Spec': {
+            'day': 'DATE', 'symbol': 'VARCHAR', 'funding_interval': 'INTEGER', 'max_order_amount': 'DOUBLE',
+        },
+    }
+
+    # 정렬 키: 시간 범위 조건(seed/advance)에서 zone-map pruning이 되도록 시간 컬럼을 선두에 둠
+    FULL_TABLE_SORT_KEYS: Dict[str, tuple] = {
+        'Trade': ('ts', 'account_id'),
+        'Funding': ('ts', 'account_id'),
+        'Reward': ('ts', 'account_id'),
+        'IP': ('account_id',),
+        'Spec': ('day', 'symbol'),
+    }
+
+    def __init__(self, filepath: Optional[str] = None, ingest_mode: str = 'eager', chunk_rows: int = 50_000):
         if getattr(self, "_initialized", False):
             return
 
+        if ingest_mode not in self.INGEST_MODES:
+            raise ValueError(f"ingest_mode must be one of {self.INGEST_MODES}, got {ingest_mode!r}")
+
         self._initialized = True
         self.filepath = Path(filepath) if filepath else Path.cwd() / "problem_data_final.xlsx"
         self.sheets: Dict[str, pd.DataFrame] = {}
         self._load_called = False
 
+        # 'eager': 시트 전체를 pandas로 읽음 / 'streaming': seed 시 배치 단위로 DuckDB에 직접 적재
+        self.ingest_mode = ingest_mode
+        self.chunk_rows = max(1, int(chunk_rows))
+        self._stream_sources: Dict[str, Path] = {}
+        self._fingerprint: Optional[Dict[str, Any]] = None
+
         # DuckDB connection (in-memory) - created lazily when requested
         # default persistent duckdb path for sharing between main and detectors
         self.duckdb_path: Path = Path.cwd() / "data" / "ingest.duckdb"
@@ -65,6 +134,13 @@ class DataManager:
         self._con: Optional[duckdb.DuckDBPyConnection] = None
         self._registered: Dict[str, bool] = {}
 
+        # per-sheet Parquet cache keyed by the workbook content hash
+        self.cache_dir: Path = self.duckdb_path.parent / "cache"
+        self._parquet_sources: Dict[str, Path] = {}
+        self.load_metrics: Dict[str, Dict[str, Any]] = {}
+        # 타입 지정 시 TRY_CAST로 NULL이 된 값 수 (시트 -> 컬럼 -> 건수)
+        self.cast_nulls: Dict[str, Dict[str, int]] = {}
+
         # 워킹 테이블 자동 삭제 비활성화 - 시뮬레이션 상태 유지를 위해
         # if self.duckdb_path.exists() and self.duckdb_path.stat().st_size > 0:
         #     try:
@@ -123,30 +199,67 @@ class DataManager:
             except Exception as e:
                 print(f"⚠️ 영구 DB 확인 실패: {e}")
 
-        # 1. Excel에서 시트 이름만 먼저 읽기 (빠름)
+        # 0. 원본 파일 지문(hash/mtime) 확인 -> Parquet 캐시 유효성 판단
+        manifest = self._read_manifest()
+        fingerprint = None
         try:
-            xlsx = pd.ExcelFile(self.filepath, engine='openpyxl')
-            sheet_names = xlsx.sheet_names
-        except Exception as e:
-            print(f"🔥 Excel 파일 읽기 실패 ({self.filepath}): {e}")
-            self.sheets = {}
-            self._load_called = True
-            print(f"---------------------\n")
-            return
+            fingerprint = self._source_fingerprint(manifest)
+        except OSError as e:
+            print(f"⚠️ 원본 파일 지문 계산 실패: {e}")
+
+        cache_valid = fingerprint is not None and manifest.get('sha256') == fingerprint['sha256']
+        if fingerprint is not None and manifest.get('sha256') not in (None, fingerprint['sha256']):
+            # 원본 Excel이 바뀌었으면 DB의 full_data_ 테이블도 신뢰할 수 없음
+            print(f"🔄 원본 파일 변경 감지 ({self.filepath.name}). Parquet 캐시와 full_data_ 테이블을 재생성합니다.")
+            db_full_tables = set()
+
+        # 1. Excel에서 시트 이름만 먼저 읽기 (빠름) - 캐시가 유효하면 manifest 사용
+        self._fingerprint = fingerprint
+        if cache_valid and manifest.get('sheet_names'):
+            sheet_names = list(manifest['sheet_names'])
+        else:
+            try:
+                sheet_names = self._discover_sheet_names()
+            except Exception as e:
+                print(f"🔥 Excel 파일 읽기 실패 ({self.filepath}): {e}")
+                self.sheets = {}
+                self._load_called = True
+                print(f"---------------------\n")
+                return
 
-        # 2. DB에 없는 시트만 Excel에서 로드할 목록 생성
+        # 2. DB / Parquet 캐시에 없는 시트만 Excel에서 로드할 목록 생성
         sheets_to_load_from_excel = []
         self.sheets = {} # 초기화
+        self._parquet_sources = {}
+        self._stream_sources = {}
         
         for name in sheet_names:
             full_name = self._full_table_name(name)
+            started = time.perf_counter()
             if full_name in db_full_tables:
                 # 💡 DB에 이미 존재함 -> Excel 로드 건너뛰기
                 print(f"✅ '{name}' (-> {full_name})은(는) DB에 존재. Excel 로드 건너뜀.")
                 # self.sheets에 키가 존재해야 하므로, 빈 DataFrame을 넣어둠
                 self.sheets[name] = pd.DataFrame() 
+                self._record_metric(name, 'duckdb', None, started)
+                continue
+
+            cached = manifest.get('sheets', {}).get(name) if cache_valid else None
+            cache_file = self.cache_dir / cached['file'] if cached else None
+            rows = self._count_parquet_rows(cache_file) if cache_file is not None else None
+            if rows is not None:
+                # 💡 Parquet 캐시 적중 -> Excel 파싱 없이 seed 시 read_parquet로 직접 적재
+                print(f"📦 '{name}'은(는) Parquet 캐시 사용: {cache_file.name}")
+                self.sheets[name] = pd.DataFrame()
+                self._parquet_sources[name] = cache_file
+                self._record_metric(name, 'parquet', rows, started)
+            elif self.ingest_mode == 'streaming':
+                # 💡 스트리밍 모드 -> seed 시 배치 단위로 full_data_ 테이블에 직접 적재
+                print(f"🌊 '{name}' (-> {full_name})은(는) seed 시 스트리밍 적재 예정 (chunk_rows={self.chunk_rows}).")
+                self.sheets[name] = pd.DataFrame()
+                self._stream_sources[name] = self._sheet_source(name)
             else:
-                # 💡 DB에 없음 -> Excel에서 로드
+                # 💡 DB/캐시에 없음 -> Excel에서 로드
                 print(f"➡️  '{name}' (-> {full_name})을(를) Excel에서 로드합니다.")
                 sheets_to_load_from_excel.append(name)
 
@@ -155,20 +268,338 @@ class DataManager:
             from concurrent.futures import ThreadPoolExecutor
 
             def _read_sheet(name: str):
+                started = time.perf_counter()
                 try:
-                    return name, pd.read_excel(self.filepath, sheet_name=name, engine='openpyxl')
+                    return name, pd.read_excel(self.filepath, sheet_name=name, engine='openpyxl'), started
                 except Exception:
-                    return name, None
+                    return name, None, started
 
             max_workers = min(8, max(1, len(sheets_to_load_from_excel)))
             with ThreadPoolExecutor(max_workers=max_workers) as ex:
                 futures = [ex.submit(_read_sheet, n) for n in sheets_to_load_from_excel]
                 for f in futures:
-                    name, df = f.result()
+                    name, df, started = f.result()
                     if df is not None:
                         self.sheets[name] = df # 로드된 데이터로 채우기
+                        self._record_metric(name, 'excel', len(df), started)
+
+        # 4. 새로 파싱한 시트는 Parquet 캐시에 기록
+        if fingerprint is not None:
+            self._update_parquet_cache(manifest, fingerprint, sheet_names, cache_valid)
+
+        for name, metric in self.load_metrics.items():
+            rows = metric['rows'] if metric['rows'] is not None else '-'
+            print(f"⏱  '{name}': {metric['source']} / rows={rows} / {metric['seconds']:.3f}s")
+        print(f"---------------------\n")
         self._load_called = True
 
+    # --------------------------- Parquet ingest cache -----------------------
+    def _manifest_path(self) -> Path:
+        return self.cache_dir / "manifest.json"
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        path = self._manifest_path()
+        if not path.exists():
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Parquet 캐시 manifest 읽기 실패: {e}")
+            return {}
+        # 다른 원본 파일의 manifest라면 무시
+        if manifest.get('source') != str(self.filepath.resolve()):
+            return {}
+        return manifest
+
+    def _source_fingerprint(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """Return sha256/mtime/size of the source workbook.
+
+        The content hash is only recomputed when mtime or size differ from
+        the manifest, so an untouched workbook costs a single stat() call.
+        """
+        stat = self.filepath.stat()
+        if (manifest.get('sha256') and manifest.get('mtime') == stat.st_mtime
+                and manifest.get('size') == stat.st_size):
+            return {'sha256': manifest['sha256'], 'mtime': stat.st_mtime, 'size': stat.st_size}
+
+        digest = hashlib.sha256()
+        with open(self.filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return {'sha256': digest.hexdigest(), 'mtime': stat.st_mtime, 'size': stat.st_size}
+
+    def _cache_file_name(self, name: str, sha256: str) -> str:
+        return f"{self._normalize_name(name)}-{sha256[:16]}.parquet"
+
+    def _count_parquet_rows(self, path: Path) -> Optional[int]:
+        """Row count from Parquet metadata, or None if the file is unusable."""
+        if not path.exists():
+            return None
+        try:
+            con = duckdb.connect(database=':memory:')
+            try:
+                return con.execute('SELECT COUNT(*) FROM read_parquet(?)', [str(path)]).fetchone()[0]
+            finally:
+                con.close()
+        except Exception as e:
+            print(f"⚠️ Parquet 캐시 손상 ({path.name}): {e}")
+            return None
+
+    def _update_parquet_cache(self, manifest: Dict[str, Any], fingerprint: Dict[str, Any],
+                              sheet_names: List[str], cache_valid: bool):
+        """Write freshly parsed sheets to Parquet and refresh the manifest."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        previous = manifest.get('sheets', {}) if cache_valid else {}
+        entries: Dict[str, Dict[str, Any]] = {}
+
+        con = duckdb.connect(database=':memory:')
+        try:
+            for name in sheet_names:
+                df = self.sheets.get(name)
+                if name in self._parquet_sources or name in self._stream_sources or df is None or df.empty:
+                    if name in previous:
+                        entries[name] = previous[name]
+                    continue
+                file_name = self._cache_file_name(name, fingerprint['sha256'])
+                target = self.cache_dir / file_name
+                try:
+                    con.register('cache_df', df)
+                    con.execute(f"COPY cache_df TO {self._sql_literal(str(target))} (FORMAT PARQUET)")
+                    con.unregister('cache_df')
+                    entries[name] = {'file': file_name, 'rows': len(df)}
+                except Exception as e:
+                    print(f"⚠️ '{name}' Parquet 캐시 기록 실패: {e}")
+        finally:
+            con.close()
+
+        new_manifest = {
+            'source': str(self.filepath.resolve()),
+            'sha256': fingerprint['sha256'],
+            'mtime': fingerprint['mtime'],
+            'size': fingerprint['size'],
+            'sheet_names': list(sheet_names),
+            'sheets': entries,
+        }
+        try:
+            with open(self._manifest_path(), 'w', encoding='utf-8') as f:
+                json.dump(new_manifest, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"⚠️ Parquet 캐시 manifest 기록 실패: {e}")
+            return
+
+        # 이전 버전(hash)의 캐시 파일 정리
+        live = {entry['file'] for entry in entries.values()}
+        for stale in self.cache_dir.glob('*.parquet'):
+            if stale.name not in live:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+    def _add_cache_entry(self, con: duckdb.DuckDBPyConnection, name: str, full_name: str):
+        """Export a streamed full_data_ table to the Parquet cache and record it in the manifest."""
+        if self._fingerprint is None:
+            return
+        manifest = self._read_manifest()
+        if manifest.get('sha256') != self._fingerprint['sha256']:
+            return
+        file_name = self._cache_file_name(name, self._fingerprint['sha256'])
+        target = self.cache_dir / file_name
+        try:
+            con.execute(f'COPY "{full_name}" TO {self._sql_literal(str(target))} (FORMAT PARQUET)')
+            rows = con.execute(f'SELECT COUNT(*) FROM "{full_name}"').fetchone()[0]
+            manifest.setdefault('sheets', {})[name] = {'file': file_name, 'rows': rows}
+            with open(self._manifest_path(), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+            self._parquet_sources[name] = target
+        except Exception as e:
+            print(f"⚠️ '{name}' Parquet 캐시 기록 실패: {e}")
+
+    # --------------------------- Streaming ingest ---------------------------
+    def _is_csv_source(self) -> bool:
+        return self.filepath.is_dir() or self.filepath.suffix.lower() == '.csv'
+
+    def _discover_sheet_names(self) -> List[str]:
+        """Sheet names without parsing any rows (xlsx sheets or CSV file stems)."""
+        if self.filepath.is_dir():
+            return sorted(p.stem for p in self.filepath.glob('*.csv'))
+        if self.filepath.suffix.lower() == '.csv':
+            return [self.filepath.stem]
+        if self.ingest_mode == 'streaming':
+            from openpyxl import load_workbook
+            wb = load_workbook(self.filepath, read_only=True, data_only=True)
+            try:
+                return list(wb.sheetnames)
+            finally:
+                wb.close()
+        xlsx = pd.ExcelFile(self.filepath, engine='openpyxl')
+        return xlsx.sheet_names
+
+    def _sheet_source(self, name: str) -> Path:
+        if self.filepath.is_dir():
+            return self.filepath / f"{name}.csv"
+        return self.filepath
+
+    def _iter_sheet_batches(self, name: str):
+        """Yield DataFrames of at most `chunk_rows` rows for sheet `name`."""
+        source = self._stream_sources.get(name, self._sheet_source(name))
+        if self._is_csv_source():
+            yield from pd.read_csv(source, chunksize=self.chunk_rows)
+            return
+
+        from openpyxl import load_workbook
+        wb = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = wb[name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+            batch = []
+            for row in rows:
+                if all(v is None for v in row):
+                    continue
+                batch.append(row[:len(columns)])
+                if len(batch) >= self.chunk_rows:
+                    yield pd.DataFrame.from_records(batch, columns=columns)
+                    batch = []
+            if batch:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+        finally:
+            wb.close()
+
+    def _stream_into_table(self, con: duckdb.DuckDBPyConnection, name: str, full_name: str) -> int:
+        """Append sheet `name` batch by batch into table `full_name`; returns row count."""
+        ts_col = self.timestamp_cols.get(name)
+        total = 0
+        created = False
+        con.execute(f'DROP TABLE IF EXISTS "{full_name}"')
+        for batch in self._iter_sheet_batches(name):
+            if ts_col and ts_col in batch.columns:
+                batch[ts_col] = pd.to_datetime(batch[ts_col], errors='coerce')
+            con.register('stream_batch', batch)
+            try:
+                if not created:
+                    con.execute(f'CREATE TABLE "{full_name}" AS SELECT * FROM stream_batch')
+                    created = True
+                else:
+                    self._widen_columns(con, full_name)
+                    con.execute(f'INSERT INTO "{full_name}" BY NAME SELECT * FROM stream_batch')
+            finally:
+                con.unregister('stream_batch')
+            total += len(batch)
+        return total
+
+    @staticmethod
+    def _widen_columns(con: duckdb.DuckDBPyConnection, full_name: str):
+        """Promote table columns whose type differs from the incoming batch.
+
+        Each batch infers its own dtypes (e.g. an all-integer batch followed
+        by one containing NaN), so mismatches are widened to DOUBLE for
+        numeric pairs and VARCHAR otherwise.
+        """
+        numeric = {'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'FLOAT', 'DOUBLE',
+                   'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT'}
+        table_types = {r[0]: r[1] for r in con.execute(f'DESCRIBE "{full_name}"').fetchall()}
+        batch_types = {r[0]: r[1] for r in con.execute('DESCRIBE stream_batch').fetchall()}
+        for col, btype in batch_types.items():
+            ttype = table_types.get(col)
+            if ttype is None or ttype == btype:
+                continue
+            if ttype in numeric and btype in numeric:
+                if ttype == 'DOUBLE':
+                    continue
+                target = 'DOUBLE'
+            elif ttype == 'VARCHAR':
+                continue
+            else:
+                target = 'VARCHAR'
+            con.execute(f'ALTER TABLE "{full_name}" ALTER COLUMN "{col}" TYPE {target}')
+
+    # ----------------------------- Typed schema ----------------------------
+    def _typed_select_sql(self, con: duckdb.DuckDBPyConnection, name: str, source: str) -> str:
+        """SELECT statement that casts `source` columns to FULL_TABLE_SCHEMAS[name] and sorts by time."""
+        schema = self.FULL_TABLE_SCHEMAS.get(name, {})
+        columns = [d[0] for d in con.execute(f'SELECT * FROM {source} LIMIT 0').description]
+
+        exprs = []
+        for col in columns:
+            col_type = schema.get(col)
+            if col_type == 'ENUM':
+                values = [r[0] for r in con.execute(
+                    f'SELECT DISTINCT CAST("{col}" AS VARCHAR) FROM {source} WHERE "{col}" IS NOT NULL ORDER BY 1'
+                ).fetchall()]
+                col_type = f"ENUM({', '.join(self._sql_literal(v) for v in values)})" if values else 'VARCHAR'
+            if col_type:
+                exprs.append(f'TRY_CAST("{col}" AS {col_type}) AS "{col}"')
+            else:
+                exprs.append(f'"{col}"')
+
+        sql = f"SELECT {', '.join(exprs)} FROM {source}"
+        sort_keys = [k for k in self.FULL_TABLE_SORT_KEYS.get(name, ()) if k in columns]
+        if sort_keys:
+            sql += ' ORDER BY ' + ', '.join(f'"{k}"' for k in sort_keys)
+        return sql
+
+    def _create_typed_full_table(self, con: duckdb.DuckDBPyConnection, name: str, full_name: str,
+                                 source: str) -> Dict[str, int]:
+        """Create `full_name` from `source` with typed columns; returns per-column cast failures.
+
+        TRY_CAST keeps malformed cells (e.g. an unparsable ts) as NULL like
+        the pandas `errors='coerce'` path did, but every value lost that way
+        is counted (non-NULL before, NULL after), printed and kept in
+        `get_load_metrics()[name]['cast_nulls']`.
+        """
+        columns = [d[0] for d in con.execute(f'SELECT * FROM {source} LIMIT 0').description]
+        typed = [c for c in self.FULL_TABLE_SCHEMAS.get(name, {}) if c in columns]
+        counts_sql = ', '.join(f'COUNT("{c}")' for c in typed)
+        before = con.execute(f'SELECT {counts_sql} FROM {source}').fetchone() if typed else ()
+
+        con.execute(f'CREATE OR REPLACE TABLE "{full_name}" AS {self._typed_select_sql(con, name, source)}')
+
+        after = con.execute(f'SELECT {counts_sql} FROM "{full_name}"').fetchone() if typed else ()
+        failures = {c: b - a for c, b, a in zip(typed, before, after) if b != a}
+        self.cast_nulls[name] = failures
+        for col, count in failures.items():
+            print(f"⚠️ '{full_name}.{col}' 값 {count}건이 {self.FULL_TABLE_SCHEMAS[name][col]}(으)로 변환되지 않아 NULL 처리됨")
+        return failures
+
+    def _ensure_typed_full_table(self, con: duckdb.DuckDBPyConnection, name: str, full_name: str):
+        """Rewrite a pre-existing (untyped) full_data_ table in place if its column types differ."""
+        schema = self.FULL_TABLE_SCHEMAS.get(name)
+        if not schema:
+            return
+        current = {r[0]: r[1] for r in con.execute(f'DESCRIBE "{full_name}"').fetchall()}
+        for col, col_type in schema.items():
+            actual = current.get(col)
+            if actual is None:
+                continue
+            if (col_type == 'ENUM' and not actual.startswith('ENUM')) or (col_type != 'ENUM' and actual != col_type):
+                print(f"🔧 '{full_name}' 컬럼 타입 정규화 중 ({col}: {actual} -> {col_type})...")
+                self._create_typed_full_table(con, name, full_name, f'"{full_name}"')
+                return
+
+    def _record_metric(self, name: str, source: str, rows: Optional[int], started: float):
+        self.load_metrics[name] = {
+            'source': source,
+            'rows': rows,
+            'seconds': time.perf_counter() - started,
+        }
+
+    @staticmethod
+    def _sql_literal(value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    def get_load_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-sheet load metrics: source (duckdb/parquet/excel/streaming), rows, seconds, cast_nulls."""
+        if not self._load_called:
+            self._load()
+        return {
+            name: dict(metric, cast_nulls=dict(self.cast_nulls.get(name, {})))
+            for name, metric in self.load_metrics.items()
+        }
+
     # ----------------------------- New helpers -----------------------------
     def _normalize_name(self, name: str) -> str:
         """Normalize sheet name for use in persistent table names."""
@@ -205,7 +636,7 @@ class DataManager:
 
         sheet_list = sheets if sheets is not None else list(self.sheets.keys())
         for name in sheet_list:
-            df = self.sheets.get(name)
+            df = self.get_sheet(name)
             if df is None:
                 continue
 
@@ -248,7 +679,7 @@ class DataManager:
         con = self._con
         sheet_list = sheets if sheets is not None else list(self.sheets.keys())
         for name in sheet_list:
-            df = self.sheets.get(name)
+            df = self.get_sheet(name)
             if df is None:
                 continue
             ts_col = self.timestamp_cols.get(name)
@@ -284,14 +715,30 @@ class DataManager:
             self.last_loaded[name] = max_ts
 
     def get_sheet(self, name: str) -> Optional[pd.DataFrame]:
-        """Return a pandas DataFrame for sheet `name` or None if missing."""
+        """Return a pandas DataFrame for sheet `name` or None if missing.
+
+        Sheets served from the Parquet cache are materialized on first access.
+        """
         if not self._load_called:
             self._load()
+        parquet_src = self._parquet_sources.get(name)
+        if parquet_src is not None and self.sheets.get(name) is not None and self.sheets[name].empty:
+            con = duckdb.connect(database=':memory:')
+            try:
+                self.sheets[name] = con.execute('SELECT * FROM read_parquet(?)', [str(parquet_src)]).fetchdf()
+            finally:
+                con.close()
+        elif name in self._stream_sources and self.sheets.get(name) is not None and self.sheets[name].empty:
+            # 스트리밍 모드에서도 DataFrame을 직접 요청하면 전체를 읽음
+            batches = list(self._iter_sheet_batches(name))
+            self.sheets[name] = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
         return self.sheets.get(name)
 
     def get_all_sheets(self) -> Dict[str, pd.DataFrame]:
         if not self._load_called:
             self._load()
+        for name in list(self._parquet_sources) + list(self._stream_sources):
+            self.get_sheet(name)
         return self.sheets
 
     def get_connection(self, persistent: bool = True) -> duckdb.DuckDBPyConnection:
@@ -313,7 +760,7 @@ class DataManager:
             # register DataFrames as tables
             if not self._load_called:
                 self._load()
-            for name, df in self.sheets.items():
+            for name, df in self.get_all_sheets().items():
                 try:
                     self._con.register(name, df)
                 except Exception:
@@ -352,11 +799,36 @@ class DataManager:
                 continue
 
             full_name = self._full_table_name(name)
-            if not df.empty:
+            parquet_src = self._parquet_sources.get(name)
+            if df.empty and name in self._stream_sources and parquet_src is None:
+                # 스트리밍 모드 -> 배치 단위로 full_data_ 테이블에 직접 적재 후 Parquet 캐시 기록
+                print(f"🌊 '{full_name}' 테이블 스트리밍 적재 중 (chunk_rows={self.chunk_rows})...")
+                started = time.perf_counter()
+                staging = f"{full_name}__staging"
+                try:
+                    rows = self._stream_into_table(con, name, staging)
+                    self._create_typed_full_table(con, name, full_name, f'"{staging}"')
+                except Exception as e:
+                    print(f"🔥 '{full_name}' 스트리밍 적재 실패: {e}")
+                    continue
+                finally:
+                    con.execute(f'DROP TABLE IF EXISTS "{staging}"')
+                self._record_metric(name, 'streaming', rows, started)
+                print(f"⏱  '{name}': streaming / rows={rows} / {self.load_metrics[name]['seconds']:.3f}s")
+                self._add_cache_entry(con, name, full_name)
+            elif df.empty and parquet_src is not None:
+                # Parquet 캐시 -> DuckDB로 직접 적재 (pandas 경유 없음)
+                print(f"📦 '{full_name}' 테이블을 Parquet 캐시에서 생성/교체 중...")
+                try:
+                    self._create_typed_full_table(con, name, full_name, f'read_parquet({self._sql_literal(str(parquet_src))})')
+                except Exception as e:
+                    print(f"🔥 '{full_name}' 테이블 생성 실패: {e}")
+                    continue
+            elif not df.empty:
                 print(f"🛠  '{full_name}' 테이블 생성/교체 중...")
                 try:
                     con.register('tmp_df', df)
-                    con.execute(f'CREATE OR REPLACE TABLE "{full_name}" AS SELECT * FROM tmp_df')
+                    self._create_typed_full_table(con, name, full_name, 'tmp_df')
                     try:
                         con.unregister('tmp_df')
                     except Exception:
@@ -366,34 +838,38 @@ class DataManager:
                     continue
             else:
                 # df가 비어있다면 (즉, _load가 Excel 로드를 건너뛰었다면)
-                # 이미 존재하는 'full_data_' 테이블을 덮어쓰지 않고 넘어감
+                # 이미 존재하는 'full_data_' 테이블을 덮어쓰지 않고 넘어감 (타입만 확인)
                 print(f"✅ '{full_name}' 테이블이 이미 존재하므로 생성 건너뜀.")
+                try:
+                    self._ensure_typed_full_table(con, name, full_name)
+                except Exception as e:
+                    print(f"⚠️ '{full_name}' 타입 정규화 실패: {e}")
 
             ts_col = self.timestamp_cols.get(name)
             # 'and ts_col in df.columns' 체크를 제거합니다.
             # ts_col이 설정(config)에 존재하기만 하면 필터링을 시도합니다.
             if ts_col:
                 print(f"... '{name}' 워킹 테이블 생성 중 ({year}-{month} 데이터)...")
-                # ensure type in DB by casting in query
+                # full_data_ 테이블은 이미 타입이 지정되어 있으므로 캐스팅 없이 범위 조건 사용
                 start_s = start.isoformat()
                 end_s = end.isoformat()
                 try:
                     con.execute(
                         f'CREATE OR REPLACE TABLE "{name}" AS '
-                        f'SELECT * FROM "{full_name}" WHERE CAST({ts_col} AS TIMESTAMP) >= TIMESTAMP \'{start_s}\' '
-                        f'AND CAST({ts_col} AS TIMESTAMP) < TIMESTAMP \'{end_s}\''
+                        f'SELECT * FROM "{full_name}" WHERE {ts_col} >= TIMESTAMP \'{start_s}\' '
+                        f'AND {ts_col} < TIMESTAMP \'{end_s}\''
                     )
                     
                     # --- [수정된 부분 2] ---
                     # df가 비어있을 수 있으므로, df를 참조하는 대신 DB('full_name')에서 직접 max 값을 가져옵니다.
-                    last_row = con.execute(f'SELECT MAX(CAST({ts_col} AS TIMESTAMP)) FROM "{full_name}"').fetchone()
+                    last_row = con.execute(f'SELECT MAX({ts_col}) FROM "{full_name}"').fetchone()
                     last = last_row[0] if last_row else None
                     
                     if last is not None: # pd.notna(last) 대신 last is not None 사용
                     # --- [여기까지] ---
                         
                         # set last_loaded to last timestamp within the model table if exists
-                        res = con.execute(f'SELECT MAX(CAST({ts_col} AS TIMESTAMP)) AS m FROM "{name}"').fetchone()
+                        res = con.execute(f'SELECT MAX({ts_col}) AS m FROM "{name}"').fetchone()
                         self.last_loaded[name] = res[0] if res else None
                         self._registered[name] = True
                 
@@ -420,10 +896,48 @@ class DataManager:
                 try:
                     con.execute(f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM "{full_name}"')
                     self.last_loaded[name] = None
-                    self.registered[name] = True
+                    self._registered[name] = True
                 except Exception:
                     pass
 
+        # 공유 파생 테이블(positions, account_symbol_first_trade, funding_cumulative, spec_index)과 Trade 계정 인덱스 재생성
+        if 'Trade' in sheet_list and self._registered.get('Trade'):
+            try:
+                count = rebuild_positions(con)
+                print(f"🧮 'positions' 테이블 생성 완료 ({count}개 포지션)")
+            except Exception as e:
+                print(f"⚠️ 'positions' 테이블 생성 실패: {e}")
+            try:
+                count = rebuild_first_trades(con)
+                print(f"🧮 'account_symbol_first_trade' 테이블 생성 완료 ({count}개 계정/심볼)")
+            except Exception as e:
+                print(f"⚠️ 'account_symbol_first_trade' 테이블 생성 실패: {e}")
+            try:
+                ensure_trade_account_index(con)
+                print("🧮 'Trade(account_id)' 인덱스 생성 완료")
+            except Exception as e:
+                print(f"⚠️ 'Trade(account_id)' 인덱스 생성 실패: {e}")
+
+        if 'Funding' in sheet_list and self._registered.get('Funding'):
+            try:
+                count = rebuild_funding_cumulative(con)
+                print(f"🧮 'funding_cumulative' 테이블 생성 완료 ({count}개 행)")
+            except Exception as e:
+                print(f"⚠️ 'funding_cumulative' 테이블 생성 실패: {e}")
+
+        if 'Spec' in sheet_list and self._registered.get('Spec'):
+            try:
+                count = rebuild_spec_index(con)
+                print(f"🧮 'spec_index' 테이블 생성 완료 ({count}개 행)")
+            except Exception as e:
+                print(f"⚠️ 'spec_index' 테이블 생성 실패: {e}")
+
+        # 워킹 테이블이 새로 만들어졌으므로 증분 탐지 상태(워터마크/후보) 초기화
+        try:
+            reset_incremental_state(con)
+        except Exception as e:
+            print(f"⚠️ 증분 탐지 상태 초기화 실패: {e}")
+
     def advance_model_by_days(self, days: int = 7, hours: int = 0, sheets: Optional[List[str]] = None):
         """Advance model tables by appending rows from full tables up to N days.
 
@@ -456,16 +970,45 @@ class DataManager:
                 con.execute(f'CREATE TABLE IF NOT EXISTS "{name}" AS SELECT * FROM "{full_name}" WHERE 1=0')
                 con.execute(
                     f'INSERT INTO "{name}" '
-                    f'SELECT * FROM "{full_name}" WHERE CAST({ts_col} AS TIMESTAMP) > TIMESTAMP \'{last_time}\' '
-                    f'AND CAST({ts_col} AS TIMESTAMP) <= TIMESTAMP \'{new_time_s}\''
+                    f'SELECT * FROM "{full_name}" WHERE {ts_col} > TIMESTAMP \'{last_time}\' '
+                    f'AND {ts_col} <= TIMESTAMP \'{new_time_s}\''
                 )
                 # update last_loaded
-                res = con.execute(f'SELECT MAX(CAST({ts_col} AS TIMESTAMP)) FROM "{name}"').fetchone()
+                res = con.execute(f'SELECT MAX({ts_col}) FROM "{name}"').fetchone()
                 self.last_loaded[name] = res[0] if res else None
                 self._registered[name] = True
             except Exception:
                 # best-effort: continue
                 continue
+
+        # 새로 추가된 거래가 속한 포지션만 positions 테이블에서 갱신
+        if 'Trade' in sheet_list:
+            try:
+                touched = refresh_positions(con, pd.to_datetime(last_time).to_pydatetime(), new_time.to_pydatetime())
+                print(f"🧮 'positions' 테이블 갱신 ({touched}개 포지션)")
+            except Exception as e:
+                print(f"⚠️ 'positions' 테이블 갱신 실패: {e}")
+            try:
+                added = refresh_first_trades(con, pd.to_datetime(last_time).to_pydatetime(), new_time.to_pydatetime())
+                print(f"🧮 'account_symbol_first_trade' 테이블 갱신 ({added}개 계정/심볼 추가)")
+            except Exception as e:
+                print(f"⚠️ 'account_symbol_first_trade' 테이블 갱신 실패: {e}")
+
+        # 새로 추가된 펀딩 기록만 계정별 누적합에 이어붙임
+        if 'Funding' in sheet_list:
+            try:
+                appended = refresh_funding_cumulative(con, pd.to_datetime(last_time).to_pydatetime(), new_time.to_pydatetime())
+                print(f"🧮 'funding_cumulative' 테이블 갱신 ({appended}개 행)")
+            except Exception as e:
+                print(f"⚠️ 'funding_cumulative' 테이블 갱신 실패: {e}")
+
+        # Spec은 작은 일 단위 시트이므로 진행 시 인덱스 전체 재생성
+        if 'Spec' in sheet_list:
+            try:
+                count = rebuild_spec_index(con)
+                print(f"🧮 'spec_index' 테이블 갱신 ({count}개 행)")
+            except Exception as e:
+                print(f"⚠️ 'spec_index' 테이블 갱신 실패: {e}")
     
     def close_connection(self):
         """Close the persistent connection if it exists."""
@@ -496,15 +1039,16 @@ class DataManager:
 _GLOBAL_MANAGER: Optional[DataManager] = None
 
 
-def get_data_manager(filepath: Optional[str] = None) -> DataManager:
+def get_data_manager(filepath: Optional[str] = None, ingest_mode: str = 'eager', chunk_rows: int = 50_000) -> DataManager:
     """Convenience accessor for the singleton DataManager.
 
     If a filepath is provided on the first call, it will be used to load the
-    data. Subsequent calls ignore filepath.
+    data. Subsequent calls ignore filepath. `ingest_mode='streaming'` (with
+    `chunk_rows` rows per batch) is likewise only honoured on the first call.
     """
     global _GLOBAL_MANAGER
     if _GLOBAL_MANAGER is None:
-        _GLOBAL_MANAGER = DataManager(filepath)
+        _GLOBAL_MANAGER = DataManager(filepath, ingest_mode=ingest_mode, chunk_rows=chunk_rows)
     else:
         # if caller provided a filepath and manager hasn't loaded any data,
         # ensure we load that path
@@ -0,0 +1,144 @@
+"""Detector filters compiled to SQL predicates with bound parameters.
+
+Features
+- Each detector's FilterEngine describes its DetectionConfig filter fields as
+  `SqlFilter`s: a name, a predicate over the candidate columns and the
+  `$name` parameters it binds (thresholds are never formatted into the SQL).
+- `FilterSet.fetch(con, candidates_sql, order_by)` numbers the candidates in
+  `order_by` order (`candidate_idx`, so pair/case ids match the ones the
+  Python filter engines assign) and lets DuckDB return only the rows that
+  pass every filter; fetch size and the Python work per row shrink by the
+  rejection rate.
+- `explain=True` returns every candidate with `filter_failure_mask`
+  (bit i = filters[i] failed) computed in SQL, for auditing rejections.
+- A NULL predicate counts as a failure, like NaN comparisons in the Python
+  engines.
+- `log_filter_failures(logger, failures)` logs how many rows each filter
+  rejected (explain mode of every detector).
+
+# usage
+from common.filter_pushdown import FilterSet, SqlFilter, log_filter_failures
+filters = FilterSet([
+    SqlFilter('min_leverage', 'leverage >= $min_leverage', {'min_leverage': 5}),
+    SqlFilter('hour_change', 'opening_hour != closing_hour'),
+])
+frame, total = filters.fetch(con, candidates_sql, 'window_funding DESC')
+frame, total = filters.fetch(con, candidates_sql, 'window_funding DESC', explain=True)
+filters.failure_names(int(frame['filter_failure_mask'].iloc[0]))
+log_filter_failures(logger, failed['filter_failures'])
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import duckdb
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class SqlFilter:
+    """필터 하나 (predicate: 후보 컬럼에 대한 SQL 조건, params: $name 파라미터 값)"""
+    name: str
+    predicate: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+class FilterSet:
+    """SqlFilter 목록 -> WHERE 조건 / 실패 비트마스크 SQL"""
+
+    def __init__(self, filters: Sequence[SqlFilter]):
+        self.filters: List[SqlFilter] = list(filters)
+
+    @property
+    def names(self) -> List[str]:
+        return [f.name for f in self.filters]
+
+    def params(self) -> Dict[str, Any]:
+        merged: Dict[str, Any] = {}
+        for f in self.filters:
+            for key, value in f.params.items():
+                if key in merged and merged[key] != value:
+                    raise ValueError(f"Conflicting filter parameter: ${key}")
+                merged[key] = value
+        return merged
+
+    @staticmethod
+    def _passed(f: SqlFilter) -> str:
+        return f"COALESCE(({f.predicate}), FALSE)"
+
+    def where_sql(self) -> str:
+        """모든 필터 통과 조건"""
+        return " AND ".join(self._passed(f) for f in self.filters) or "TRUE"
+
+    def failure_mask_sql(self) -> str:
+        """실패 비트마스크 식 (bit i = filters[i] 실패, 0이면 모두 통과)"""
+        terms = [f"(CASE WHEN {self._passed(f)} THEN 0 ELSE {1 << bit} END)" for bit, f in enumerate(self.filters)]
+        return " + ".join(terms) or "0"
+
+    def failure_names(self, mask: int) -> List[str]:
+        """비트마스크 -> 실패한 필터 이름 리스트"""
+        return [f.name for bit, f in enumerate(self.filters) if mask & (1 << bit)]
+
+    def select_sql(self, candidates_sql: str, order_by: str, explain: bool = False) -> str:
+        """
+        후보 SQL에 순번(candidate_idx)과 전체 후보 수(candidate_total)를 붙이고 필터 적용
+
+        explain=False: 통과 행만 / explain=True: 모든 행 + filter_failure_mask
+        """
+        if explain:
+            select, where = f"*, {self.failure_mask_sql()} AS filter_failure_mask", ""
+        else:
+            select, where = "*", f"WHERE {self.where_sql()}"
+        # 통과 행이 없어도 전체 후보 수가 한 행(나머지 컬럼 NULL)으로 반환되도록
+        # 한 행짜리 집계에 통과 행을 LEFT JOIN (후보 SQL은 한 번만 실행)
+        return f"""
+        WITH numbered AS MATERIALIZED (
+            SELECT *, row_number() OVER (ORDER BY {order_by}) - 1 AS candidate_idx
+            FROM ({candidates_sql}) candidates
+        ),
+        passed AS (
+            SELECT {select} FROM numbered {where}
+        )
+        SELECT passed.*, totals.candidate_total
+        FROM (SELECT COUNT(*) AS candidate_total FROM numbered) totals
+        LEFT JOIN passed ON TRUE
+        ORDER BY passed.candidate_idx
+        """
+
+    def fetch(
+        self,
+        con: duckdb.DuckDBPyConnection,
+        candidates_sql: str,
+        order_by: str,
+        params: Optional[Dict[str, Any]] = None,
+        explain: bool = False,
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        필터를 DuckDB에서 실행
+
+        Args:
+            params: candidates_sql의 $name 파라미터 (필터 파라미터와 합쳐서 바인딩)
+
+        Returns:
+            (후보 DataFrame - candidate_idx [+ filter_failure_mask], 필터 전 전체 후보 수)
+        """
+        bound = {**(params or {}), **self.params()}
+        df = con.execute(self.select_sql(candidates_sql, order_by, explain), bound).fetchdf()
+        total = int(df['candidate_total'].iloc[0])
+        df = df.drop(columns=['candidate_total'])
+        if df['candidate_idx'].isna().iloc[0]:
+            # 통과 행 없음 -> 전체 후보 수만 담긴 행 제거
+            df = df.iloc[0:0]
+        return df, total
+
+
+def log_filter_failures(logger: logging.Logger, failures: Iterable[Sequence[str]]) -> Dict[str, int]:
+    """필터별 실패 건수 로그 (failures: 실패 행마다 실패한 필터 이름 목록)"""
+    counts = Counter(name for names in failures for name in names)
+    logger.info("필터 실패 사유:")
+    for name, count in counts.items():
+        logger.info(f"  - {name}: {count}건")
+    return dict(counts)
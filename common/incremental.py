@@ -0,0 +1,139 @@
+"""Incremental detection state shared by the detectors.
+
+Features
+- `detector_watermarks`: per-detector watermark (the latest position
+  close_ts seen by its last run) plus a signature of the settings that shape
+  its candidate SQL. A signature mismatch forces a full run.
+- `incr_<detector>_candidates`: the detector's previous candidate rows.
+  An incremental run deletes the rows that involve a changed position
+  (close_ts > watermark) and inserts freshly computed rows for them, so the
+  expensive candidate joins only scan the newly advanced window.
+- `reset_incremental_state` drops everything; DataManager calls it on seed.
+
+# usage
+from common.incremental import IncrementalState
+state = IncrementalState(con, 'wash', signature='v1')
+if state.previous_watermark is None:
+    state.replace_candidates(full_sql)
+else:
+    state.merge_candidates(window_sql, params, [('loser_account', 'loser_position_id')])
+state.commit()
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+
+
+WATERMARK_TABLE = "detector_watermarks"
+
+
+def ensure_watermark_table(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        f'CREATE TABLE IF NOT EXISTS "{WATERMARK_TABLE}" ('
+        "detector VARCHAR PRIMARY KEY, watermark TIMESTAMP, signature VARCHAR, updated_at TIMESTAMP)"
+    )
+
+
+def reset_incremental_state(con: duckdb.DuckDBPyConnection) -> None:
+    """Drop watermarks and stored candidates (next detector run is a full run)."""
+    tables = [r[0] for r in con.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_name LIKE 'incr\\_%\\_candidates' ESCAPE '\\'"
+    ).fetchall()]
+    for table in tables:
+        con.execute(f'DROP TABLE IF EXISTS "{table}"')
+    con.execute(f'DROP TABLE IF EXISTS "{WATERMARK_TABLE}"')
+
+
+class IncrementalState:
+    """Watermark bookkeeping and candidate merge for one detector."""
+
+    def __init__(self, con: duckdb.DuckDBPyConnection, detector: str, signature: str):
+        self.con = con
+        self.detector = detector
+        self.signature = signature
+        self.table = f"incr_{detector}_candidates"
+
+        ensure_watermark_table(con)
+        row = con.execute('SELECT MAX(close_ts) FROM positions').fetchone()
+        self.new_watermark: Optional[datetime] = row[0] if row else None
+        self.previous_watermark: Optional[datetime] = self._load_previous()
+
+    def _load_previous(self) -> Optional[datetime]:
+        row = self.con.execute(
+            f'SELECT watermark, signature FROM "{WATERMARK_TABLE}" WHERE detector = ?', [self.detector]
+        ).fetchone()
+        if row is None or row[1] != self.signature or row[0] is None:
+            return None
+        exists = self.con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [self.table]
+        ).fetchone()[0]
+        if not exists:
+            return None
+        # 이전 워터마크 이후 데이터가 사라졌다면 (재시드 등) 전체 재계산
+        if self.new_watermark is None or self.new_watermark < row[0]:
+            return None
+        return row[0]
+
+    @property
+    def is_incremental(self) -> bool:
+        return self.previous_watermark is not None
+
+    def changed_lookback(self, column: str, margin_sec: float) -> Optional[datetime]:
+        """MIN(column) over changed positions minus `margin_sec` (None if nothing changed)."""
+        row = self.con.execute(
+            f"SELECT MIN({column}) - to_seconds(CAST(? AS DOUBLE)) FROM positions WHERE close_ts > ?",
+            [margin_sec, self.previous_watermark],
+        ).fetchone()
+        return row[0] if row else None
+
+    def replace_candidates(self, sql: str, params: Any = None) -> None:
+        """Full run: store all candidate rows."""
+        self.con.execute(f'CREATE OR REPLACE TABLE "{self.table}" AS {sql}', params)
+
+    def merge_candidates(
+        self,
+        sql: str,
+        params: Any,
+        position_keys: List[Tuple[str, str]],
+    ) -> Tuple[int, int]:
+        """Replace rows touching changed positions with the rows produced by `sql`.
+
+        `params` are bound to `sql` (list or dict for $name parameters).
+        `position_keys` lists (account column, position_id column) pairs of
+        the candidate table that reference a position. Returns
+        (deleted, inserted) row counts.
+        """
+        changed = f"incr_{self.detector}_changed"
+        self.con.execute(
+            f'CREATE OR REPLACE TEMP TABLE "{changed}" AS '
+            "SELECT account_id, position_id FROM positions WHERE close_ts > ?",
+            [self.previous_watermark],
+        )
+        before = self.con.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+        for account_col, position_col in position_keys:
+            self.con.execute(
+                f'DELETE FROM "{self.table}" t USING "{changed}" c '
+                f'WHERE t."{account_col}" = c.account_id AND t."{position_col}" = c.position_id'
+            )
+        after_delete = self.con.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+        self.con.execute(f'INSERT INTO "{self.table}" BY NAME {sql}', params)
+        after_insert = self.con.execute(f'SELECT COUNT(*) FROM "{self.table}"').fetchone()[0]
+        self.con.execute(f'DROP TABLE IF EXISTS "{changed}"')
+        return before - after_delete, after_insert - after_delete
+
+    def commit(self) -> None:
+        self.con.execute(
+            f'INSERT OR REPLACE INTO "{WATERMARK_TABLE}" VALUES (?, ?, ?, ?)',
+            [self.detector, self.new_watermark, self.signature, datetime.now()],
+        )
+
+    def read_candidates_df(self, order_by: str) -> pd.DataFrame:
+        return self.con.execute(f'SELECT * FROM "{self.table}" ORDER BY {order_by}').fetchdf()
+
+    def read_candidates(self, order_by: str) -> List[dict]:
+        return self.read_candidates_df(order_by).to_dict('records')
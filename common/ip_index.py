@@ -0,0 +1,116 @@
+"""Account ↔ IP inverted index over the `IP` sheet.
+
+Features
+- Accounts and IPs are integer-encoded once (pd.factorize) and stored in CSR
+  arrays: `row_indptr`/`rows` map an account code to its IP sheet rows in
+  original order, `ip_indptr`/`account_ips` map it to its distinct IP codes.
+- `shared_ip_count(accounts1, accounts2)`: number of distinct IPs used by
+  both accounts, for many pairs at once (no per-pair set intersection).
+- `shared_ips(members)` / `shared_ips_many(groups)`: IP -> accounts for IPs
+  that appear on more than one IP sheet row of the group, in sheet order.
+
+# usage
+from common.ip_index import IPIndex
+index = IPIndex(con.execute('SELECT * FROM "IP"').fetchdf())
+counts = index.shared_ip_count(df['account_id1'], df['account_id2'])
+index.shared_ips(['A1', 'A2', 'A3'])
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _expand(indptr: np.ndarray, codes: np.ndarray):
+    """CSR slices for `codes` -> (owner position, flat index into the CSR data)."""
+    starts = indptr[codes]
+    lens = indptr[codes + 1] - starts
+    owner = np.repeat(np.arange(len(codes)), lens)
+    offsets = np.arange(int(lens.sum())) - np.repeat(np.cumsum(lens) - lens, lens)
+    return owner, np.repeat(starts, lens) + offsets
+
+
+class IPIndex:
+    """Integer-encoded account -> IP inverted index (CSR arrays)."""
+
+    def __init__(self, ip_data: pd.DataFrame):
+        if ip_data.empty or not {'account_id', 'ip'} <= set(ip_data.columns):
+            ip_data = pd.DataFrame({'account_id': pd.Series(dtype=object), 'ip': pd.Series(dtype=object)})
+
+        account_codes, accounts = pd.factorize(ip_data['account_id'].astype(object).to_numpy(), use_na_sentinel=False)
+        ip_codes, ips = pd.factorize(ip_data['ip'].astype(object).to_numpy(), use_na_sentinel=False)
+        self.accounts = pd.Index(accounts, dtype=object)
+        self.ips = np.asarray(ips, dtype=object)
+        self.row_account = account_codes.astype(np.int64)
+        self.row_ip = ip_codes.astype(np.int64)
+        n_accounts, self.n_ips = len(self.accounts), max(len(self.ips), 1)
+
+        # 계정 -> IP 시트 행 (원래 행 순서 유지)
+        self.rows = np.argsort(self.row_account, kind='stable')
+        self.row_indptr = np.concatenate([[0], np.cumsum(np.bincount(self.row_account, minlength=n_accounts))])
+
+        # 계정 -> 중복 제거된 IP 코드 (정렬), 조회용 (account, ip) 키
+        self.pair_keys = np.unique(self.row_account * self.n_ips + self.row_ip)
+        self.account_ips = self.pair_keys % self.n_ips
+        self.ip_indptr = np.concatenate([
+            [0], np.cumsum(np.bincount(self.pair_keys // self.n_ips, minlength=n_accounts)),
+        ])
+
+    def __len__(self) -> int:
+        return len(self.row_account)
+
+    def account_codes(self, accounts: Iterable) -> np.ndarray:
+        """계정 ID -> 코드 (IP 기록이 없는 계정은 -1)"""
+        if not isinstance(accounts, (list, tuple, np.ndarray, pd.Series, pd.Index)):
+            accounts = list(accounts)
+        return self.accounts.get_indexer(np.asarray(accounts, dtype=object))
+
+    def shared_ip_count(self, accounts1: Sequence, accounts2: Sequence) -> np.ndarray:
+        """쌍별 두 계정이 함께 사용한 (서로 다른) IP 수"""
+        c1, c2 = self.account_codes(accounts1), self.account_codes(accounts2)
+        counts = np.zeros(len(c1), dtype=np.int64)
+        valid = np.flatnonzero((c1 >= 0) & (c2 >= 0))
+        if len(valid) == 0:
+            return counts
+
+        # account1의 IP를 펼친 뒤 (account2, ip) 키 존재 여부 확인
+        owner, flat = _expand(self.ip_indptr, c1[valid])
+        keys = c2[valid][owner] * self.n_ips + self.account_ips[flat]
+        pos = np.minimum(np.searchsorted(self.pair_keys, keys), len(self.pair_keys) - 1)
+        hit = self.pair_keys[pos] == keys
+        counts[valid] = np.bincount(owner[hit], minlength=len(valid))
+        return counts
+
+    def shared_ips_many(self, groups: Sequence[Sequence]) -> List[Dict[str, List[str]]]:
+        """그룹별 IP -> 계정 리스트 (그룹 안에서 IP 시트 행이 2개 이상인 IP만, 시트 행 순서)"""
+        result: List[Dict[str, List[str]]] = [{} for _ in groups]
+        if len(self) == 0 or len(groups) == 0:
+            return result
+
+        group_of = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+        codes = self.account_codes([acc for g in groups for acc in g])
+        known = codes >= 0
+        group_of, codes = group_of[known], codes[known]
+
+        # (그룹, 행) 펼치기 후 그룹 -> 원래 행 순서로 정렬
+        owner, flat = _expand(self.row_indptr, codes)
+        group_ids, rows = group_of[owner], self.rows[flat]
+        order = np.lexsort((rows, group_ids))
+        group_ids, rows = group_ids[order], rows[order]
+
+        # 그룹 내 IP별 행 수 -> 2개 이상인 행만 남김
+        keys = group_ids * self.n_ips + self.row_ip[rows]
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        shared = counts[inverse] > 1
+
+        accounts = self.accounts.to_numpy()[self.row_account[rows[shared]]].tolist()
+        ips = self.ips[self.row_ip[rows[shared]]].tolist()
+        for gid, ip, account_id in zip(group_ids[shared].tolist(), ips, accounts):
+            result[gid].setdefault(ip, []).append(account_id)
+        return result
+
+    def shared_ips(self, members: Sequence) -> Dict[str, List[str]]:
+        """그룹 하나의 IP -> 계정 리스트"""
+        return self.shared_ips_many([members])[0]
@@ -0,0 +1,328 @@
+"""Materialized tables derived from the working sheets.
+
+Features
+- `positions`: one row per (account_id, position_id) aggregated from the
+  working `Trade` table (open_ts, close_ts, amount, rpnl, leverage, side,
+  symbol, closing_day). It is rebuilt when the model is seeded and refreshed
+  incrementally when the simulation advances, so the detectors no longer
+  repeat the same GROUP BY over `Trade`.
+- `funding_cumulative`: per-account running total of received funding
+  (SUM(-funding_fee)) at every distinct Funding timestamp, ordered by
+  (account_id, ts). Funding received in [open_ts, close_ts] is the running
+  total at the last ts <= close_ts minus the one at the last ts < open_ts,
+  i.e. two ASOF lookups instead of a scan of `Funding` per position. Advances
+  only append later rows, so the refresh continues each account's total.
+- `spec_index`: one row per (symbol, spec_day) from the working `Spec` sheet,
+  sorted by symbol and effective date. Detectors resolve a position's spec
+  as-of its closing day (latest spec_day <= closing_day) with an ASOF JOIN;
+  `spec_coverage_gaps` reports positions whose closing day had no Spec row.
+- `account_symbol_first_trade`: first trade time per (account_id, symbol),
+  used by the API to timestamp detections with one join instead of a
+  MIN(ts) scan of `Trade` per detection. Advances only append later trades,
+  so the refresh only adds pairs that traded for the first time.
+- `trade_account_idx`: ART index on `Trade(account_id)` for per-account
+  trade history. `Trade` stays sorted by ts for the seed/advance range
+  scans, so account lookups go through the index instead. Seed recreates
+  `Trade` (dropping the index) and re-creates it; advance inserts keep it
+  up to date. DuckDB only uses it for a bare `account_id = ?` filter, so
+  readers isolate that filter in a MATERIALIZED CTE before sorting.
+
+# usage
+from common.materialized import ensure_positions, ensure_funding_cumulative, ensure_spec_index, spec_coverage_gaps, ensure_first_trades, ensure_trade_account_index
+ensure_positions(con)
+con.execute('SELECT * FROM positions WHERE rpnl != 0').fetchdf()
+ensure_funding_cumulative(con)
+ensure_spec_index(con)
+spec_coverage_gaps(con)
+ensure_first_trades(con)
+ensure_trade_account_index(con)
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+import duckdb
+import pandas as pd
+
+
+POSITIONS_TABLE = "positions"
+
+# 포지션 집계 정의 (모든 탐지기가 공유)
+_POSITIONS_AGG = """
+    SELECT
+        account_id,
+        position_id,
+        MIN(ts) AS open_ts,
+        MAX(ts) AS close_ts,
+        SUM(CASE WHEN openclose='OPEN' THEN amount ELSE 0 END) AS amount,
+        SUM(
+            CASE WHEN openclose='OPEN' THEN -amount ELSE amount END *
+            CASE WHEN side='LONG' THEN 1 ELSE -1 END
+        ) AS rpnl,
+        MAX(leverage) AS leverage,
+        MAX(side) AS side,
+        MAX(symbol) AS symbol,
+        DATE(MAX(ts)) AS closing_day
+    FROM {source}
+    GROUP BY account_id, position_id
+"""
+
+
+def _table_exists(con: duckdb.DuckDBPyConnection, name: str) -> bool:
+    row = con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [name]
+    ).fetchone()
+    return bool(row and row[0])
+
+
+def rebuild_positions(con: duckdb.DuckDBPyConnection) -> int:
+    """Recreate `positions` from the whole working `Trade` table; returns row count."""
+    con.execute(
+        f'CREATE OR REPLACE TABLE "{POSITIONS_TABLE}" AS '
+        f'{_POSITIONS_AGG.format(source="Trade")} ORDER BY open_ts'
+    )
+    return con.execute(f'SELECT COUNT(*) FROM "{POSITIONS_TABLE}"').fetchone()[0]
+
+
+def refresh_positions(
+    con: duckdb.DuckDBPyConnection,
+    since: Optional[datetime],
+    until: Optional[datetime] = None,
+) -> int:
+    """Re-aggregate only positions touched by trades with since < ts <= until.
+
+    Returns the number of refreshed positions. Falls back to a full rebuild
+    when the table does not exist yet.
+    """
+    if not _table_exists(con, POSITIONS_TABLE) or since is None:
+        return rebuild_positions(con)
+
+    params = [since]
+    window = "ts > ?"
+    if until is not None:
+        window += " AND ts <= ?"
+        params.append(until)
+
+    # 새로 추가된 거래가 속한 (account_id, position_id)만 다시 집계
+    con.execute(
+        "CREATE OR REPLACE TEMP TABLE positions_touched AS "
+        f"SELECT DISTINCT account_id, position_id FROM Trade WHERE {window}",
+        params,
+    )
+    touched = con.execute("SELECT COUNT(*) FROM positions_touched").fetchone()[0]
+    if touched:
+        con.execute(
+            f'DELETE FROM "{POSITIONS_TABLE}" p USING positions_touched k '
+            "WHERE p.account_id = k.account_id AND p.position_id = k.position_id"
+        )
+        source = "(SELECT t.* FROM Trade t SEMI JOIN positions_touched k USING (account_id, position_id))"
+        con.execute(
+            f'INSERT INTO "{POSITIONS_TABLE}" BY NAME '
+            f'{_POSITIONS_AGG.format(source=source)} ORDER BY open_ts'
+        )
+    con.execute("DROP TABLE IF EXISTS positions_touched")
+    return touched
+
+
+def ensure_positions(con: duckdb.DuckDBPyConnection) -> None:
+    """Build `positions` if a detector runs against a DB seeded before it existed."""
+    if not _table_exists(con, POSITIONS_TABLE):
+        rebuild_positions(con)
+
+
+FUNDING_CUMULATIVE_TABLE = "funding_cumulative"
+
+# 누적합은 DECIMAL로 유지해 두 누적값의 차가 구간 합과 정확히 일치하도록 함
+_FUNDING_CUM_TYPE = "DECIMAL(38, 12)"
+
+# 같은 (account_id, ts)의 펀딩비는 한 행으로 합친 뒤 ts 순서로 누적
+_FUNDING_STEPS = f"""
+    SELECT
+        account_id,
+        ts,
+        COALESCE(SUM(CAST(-funding_fee AS {_FUNDING_CUM_TYPE})), 0) AS funding
+    FROM Funding
+    WHERE account_id IS NOT NULL AND ts IS NOT NULL {{window}}
+    GROUP BY account_id, ts
+"""
+
+
+def rebuild_funding_cumulative(con: duckdb.DuckDBPyConnection) -> int:
+    """Recreate `funding_cumulative` from the whole working `Funding` table; returns row count."""
+    con.execute(
+        f'CREATE OR REPLACE TABLE "{FUNDING_CUMULATIVE_TABLE}" AS '
+        "SELECT account_id, ts, "
+        "SUM(funding) OVER (PARTITION BY account_id ORDER BY ts) AS cum_funding "
+        f'FROM ({_FUNDING_STEPS.format(window="")}) ORDER BY account_id, ts'
+    )
+    return con.execute(f'SELECT COUNT(*) FROM "{FUNDING_CUMULATIVE_TABLE}"').fetchone()[0]
+
+
+def refresh_funding_cumulative(
+    con: duckdb.DuckDBPyConnection,
+    since: Optional[datetime],
+    until: Optional[datetime] = None,
+) -> int:
+    """Append running totals for Funding rows with since < ts <= until.
+
+    Each account continues from its last stored total. Returns the number of
+    appended rows. Falls back to a full rebuild when the table does not exist
+    yet or the new rows are not strictly later than an account's last entry.
+    """
+    if not _table_exists(con, FUNDING_CUMULATIVE_TABLE) or since is None:
+        return rebuild_funding_cumulative(con)
+
+    params = [since]
+    window = "AND ts > ?"
+    if until is not None:
+        window += " AND ts <= ?"
+        params.append(until)
+
+    con.execute(
+        "CREATE OR REPLACE TEMP TABLE funding_steps_new AS " + _FUNDING_STEPS.format(window=window),
+        params,
+    )
+    con.execute(
+        "CREATE OR REPLACE TEMP TABLE funding_cum_last AS "
+        "SELECT account_id, MAX(ts) AS last_ts, arg_max(cum_funding, ts) AS last_cum "
+        f'FROM "{FUNDING_CUMULATIVE_TABLE}" SEMI JOIN funding_steps_new USING (account_id) '
+        "GROUP BY account_id"
+    )
+    # 이전 기록보다 앞선 ts가 들어오면 누적값을 이어붙일 수 없으므로 전체 재생성
+    out_of_order = con.execute(
+        "SELECT COUNT(*) FROM funding_steps_new n JOIN funding_cum_last l USING (account_id) "
+        "WHERE n.ts <= l.last_ts"
+    ).fetchone()[0]
+    if out_of_order:
+        appended = None
+    else:
+        appended = con.execute("SELECT COUNT(*) FROM funding_steps_new").fetchone()[0]
+        con.execute(
+            f'INSERT INTO "{FUNDING_CUMULATIVE_TABLE}" '
+            "SELECT n.account_id, n.ts, "
+            "COALESCE(l.last_cum, 0) + SUM(n.funding) OVER (PARTITION BY n.account_id ORDER BY n.ts) "
+            "FROM funding_steps_new n LEFT JOIN funding_cum_last l USING (account_id) "
+            "ORDER BY n.account_id, n.ts"
+        )
+    con.execute("DROP TABLE IF EXISTS funding_steps_new")
+    con.execute("DROP TABLE IF EXISTS funding_cum_last")
+    if appended is None:
+        return rebuild_funding_cumulative(con)
+    return appended
+
+
+def ensure_funding_cumulative(con: duckdb.DuckDBPyConnection) -> None:
+    """Build `funding_cumulative` if a detector runs against a DB seeded before it existed."""
+    if not _table_exists(con, FUNDING_CUMULATIVE_TABLE):
+        rebuild_funding_cumulative(con)
+
+
+SPEC_INDEX_TABLE = "spec_index"
+
+
+def rebuild_spec_index(con: duckdb.DuckDBPyConnection) -> int:
+    """Recreate `spec_index` from the working `Spec` table; returns row count.
+
+    A (symbol, day) listed more than once keeps its last row in sheet order.
+    """
+    con.execute(
+        f'CREATE OR REPLACE TABLE "{SPEC_INDEX_TABLE}" AS '
+        "SELECT symbol, day AS spec_day, funding_interval AS fund_period_hr, max_order_amount "
+        "FROM Spec WHERE symbol IS NOT NULL AND day IS NOT NULL "
+        "QUALIFY row_number() OVER (PARTITION BY symbol, day ORDER BY rowid DESC) = 1 "
+        "ORDER BY symbol, spec_day"
+    )
+    return con.execute(f'SELECT COUNT(*) FROM "{SPEC_INDEX_TABLE}"').fetchone()[0]
+
+
+def ensure_spec_index(con: duckdb.DuckDBPyConnection) -> None:
+    """Build `spec_index` if a detector runs against a DB seeded before it existed."""
+    if not _table_exists(con, SPEC_INDEX_TABLE):
+        rebuild_spec_index(con)
+
+
+def spec_coverage_gaps(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    """Per-symbol count of positions whose closing day has no exact Spec row.
+
+    `carried_forward` positions resolve to an earlier spec (`max_lag_days`
+    behind at most); `unresolved` positions have no spec on or before their
+    closing day. Only symbols with at least one gap are returned.
+    """
+    return con.execute(f"""
+        SELECT
+            p.symbol,
+            COUNT(*) AS positions,
+            COUNT(*) FILTER (WHERE s.spec_day IS NOT NULL AND s.spec_day < p.closing_day) AS carried_forward,
+            COUNT(*) FILTER (WHERE s.spec_day IS NULL) AS unresolved,
+            MAX(p.closing_day - s.spec_day) AS max_lag_days
+        FROM "{POSITIONS_TABLE}" p
+        ASOF LEFT JOIN "{SPEC_INDEX_TABLE}" s
+            ON p.symbol = s.symbol AND p.closing_day >= s.spec_day
+        WHERE p.symbol IS NOT NULL
+        GROUP BY p.symbol
+        HAVING carried_forward > 0 OR unresolved > 0
+        ORDER BY p.symbol
+    """).fetchdf()
+
+
+FIRST_TRADE_TABLE = "account_symbol_first_trade"
+
+_FIRST_TRADE_AGG = """
+    SELECT account_id, symbol, MIN(ts) AS first_ts
+    FROM Trade
+    WHERE account_id IS NOT NULL AND symbol IS NOT NULL {window}
+    GROUP BY account_id, symbol
+"""
+
+
+def rebuild_first_trades(con: duckdb.DuckDBPyConnection) -> int:
+    """Recreate `account_symbol_first_trade` from the working `Trade` table; returns row count."""
+    con.execute(
+        f'CREATE OR REPLACE TABLE "{FIRST_TRADE_TABLE}" AS '
+        f'{_FIRST_TRADE_AGG.format(window="")} ORDER BY account_id, symbol'
+    )
+    return con.execute(f'SELECT COUNT(*) FROM "{FIRST_TRADE_TABLE}"').fetchone()[0]
+
+
+def refresh_first_trades(
+    con: duckdb.DuckDBPyConnection,
+    since: Optional[datetime],
+    until: Optional[datetime] = None,
+) -> int:
+    """Add (account_id, symbol) pairs whose first trade has since < ts <= until.
+
+    Returns the number of added pairs. Falls back to a full rebuild when the
+    table does not exist yet.
+    """
+    if not _table_exists(con, FIRST_TRADE_TABLE) or since is None:
+        return rebuild_first_trades(con)
+
+    params = [since]
+    window = "AND ts > ?"
+    if until is not None:
+        window += " AND ts <= ?"
+        params.append(until)
+
+    before = con.execute(f'SELECT COUNT(*) FROM "{FIRST_TRADE_TABLE}"').fetchone()[0]
+    con.execute(
+        f'INSERT INTO "{FIRST_TRADE_TABLE}" '
+        f'SELECT n.* FROM ({_FIRST_TRADE_AGG.format(window=window)}) n '
+        f'ANTI JOIN "{FIRST_TRADE_TABLE}" f USING (account_id, symbol)',
+        params,
+    )
+    return con.execute(f'SELECT COUNT(*) FROM "{FIRST_TRADE_TABLE}"').fetchone()[0] - before
+
+
+def ensure_first_trades(con: duckdb.DuckDBPyConnection) -> None:
+    """Build `account_symbol_first_trade` if the API runs against a DB seeded before it existed."""
+    if not _table_exists(con, FIRST_TRADE_TABLE):
+        rebuild_first_trades(con)
+
+
+TRADE_ACCOUNT_INDEX = "trade_account_idx"
+
+
+def ensure_trade_account_index(con: duckdb.DuckDBPyConnection) -> None:
+    """Create the `Trade(account_id)` ART index if it does not exist."""
+    con.execute(f'CREATE INDEX IF NOT EXISTS "{TRADE_ACCOUNT_INDEX}" ON "Trade" (account_id)')
@@ -0,0 +1,206 @@
+"""Typed DuckDB tables holding the latest detection results for the API.
+
+Features
+- Each detector publishes its result frames (`results_wash_pairs`,
+  `results_funding_cases`, `results_funding_accounts`, `results_coop_pairs`,
+  `results_coop_groups`) and its JSON documents (config, visualization,
+  sanctions -> `results_documents`) in one transaction, alongside the
+  CSV/JSON files it still writes to output/<model>.
+- Readers query the tables with a column projection, a WHERE clause with
+  bound parameters, ORDER BY and LIMIT instead of re-parsing CSV files.
+- Every publish bumps the model's generation in `results_generations`.
+  Readers cache per model keyed by `generations()` and reload a model only
+  when its generation moves; `snapshot()` reads inside one transaction so a
+  concurrent publish is never half visible.
+- `has_results(model)` tells readers whether a model has published yet, so
+  output directories produced before the store existed are still readable.
+- `publish_run(model, config, ...)` is the detectors' single publish call.
+  Runs that end early (no candidates, nothing passes the filters) call it
+  without frames, which clears the previous run's tables and bumps the
+  generation, so the API never keeps serving stale cases.
+
+# usage
+from common.results_store import ResultsStore
+store = ResultsStore(con)
+store.publish('wash', {'pairs': pairs_df}, {'sanctions': sanctions_dict})
+store.publish_run('wash', config.to_dict())  # 빈 결과
+store.read_frame('wash', 'pairs', columns=['pair_id', 'total_score'], where='tier = ?', params=['BOT'])
+store.read_document('wash', 'sanctions')
+with store.snapshot():
+    store.generations()  # {'wash': 3, ...}
+"""
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence
+
+import duckdb
+import pandas as pd
+
+
+DOCUMENTS_TABLE = "results_documents"
+GENERATIONS_TABLE = "results_generations"
+
+# 모델 -> 결과 프레임 이름 (테이블: results_<model>_<name>)
+RESULT_FRAMES: Dict[str, tuple] = {
+    'wash': ('pairs',),
+    'funding': ('cases', 'accounts'),
+    'coop': ('pairs', 'groups'),
+}
+
+
+def results_table(model: str, name: str) -> str:
+    if name not in RESULT_FRAMES.get(model, ()):
+        raise ValueError(f"Unknown result frame: {model}/{name}")
+    return f"results_{model}_{name}"
+
+
+def ensure_results_tables(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        f'CREATE TABLE IF NOT EXISTS "{DOCUMENTS_TABLE}" ('
+        "model VARCHAR, name VARCHAR, body VARCHAR, published_at TIMESTAMP, PRIMARY KEY (model, name))"
+    )
+    con.execute(
+        f'CREATE TABLE IF NOT EXISTS "{GENERATIONS_TABLE}" ('
+        "model VARCHAR PRIMARY KEY, generation BIGINT, published_at TIMESTAMP)"
+    )
+
+
+class ResultsStore:
+    """Latest detection results per model (typed frames + JSON documents)."""
+
+    def __init__(self, con: duckdb.DuckDBPyConnection):
+        self.con = con
+
+    def _table_exists(self, table: str) -> bool:
+        row = self.con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [table]
+        ).fetchone()
+        return bool(row and row[0])
+
+    def publish(
+        self,
+        model: str,
+        frames: Dict[str, pd.DataFrame],
+        documents: Dict[str, Any],
+    ) -> None:
+        """Replace all stored results of `model` atomically.
+
+        Frames missing from `frames` (e.g. no pairs this run) are dropped so
+        readers never mix results from two runs.
+        """
+        ensure_results_tables(self.con)
+        self.con.execute("BEGIN TRANSACTION")
+        try:
+            for name in RESULT_FRAMES[model]:
+                table = results_table(model, name)
+                df = frames.get(name)
+                if df is None or df.empty:
+                    self.con.execute(f'DROP TABLE IF EXISTS "{table}"')
+                    continue
+                view = f"_publish_{table}"
+                self.con.register(view, df)
+                try:
+                    self.con.execute(f'CREATE OR REPLACE TABLE "{table}" AS SELECT * FROM "{view}"')
+                finally:
+                    self.con.unregister(view)
+
+            self.con.execute(f'DELETE FROM "{DOCUMENTS_TABLE}" WHERE model = ?', [model])
+            self.con.executemany(
+                f'INSERT INTO "{DOCUMENTS_TABLE}" VALUES (?, ?, ?, now())',
+                [
+                    [model, name, json.dumps(body, ensure_ascii=False, default=str)]
+                    for name, body in documents.items() if body is not None
+                ],
+            )
+            self.con.execute(
+                f'INSERT INTO "{GENERATIONS_TABLE}" VALUES (?, 1, now()) '
+                "ON CONFLICT (model) DO UPDATE SET generation = generation + 1, published_at = excluded.published_at",
+                [model],
+            )
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+
+    def publish_run(
+        self,
+        model: str,
+        config: Dict[str, Any],
+        frames: Optional[Dict[str, pd.DataFrame]] = None,
+        visualization: Optional[Any] = None,
+        sanctions: Optional[Any] = None,
+    ) -> None:
+        """탐지 실행 한 번의 결과 게시 (frames 없이 호출하면 빈 결과로 이전 결과를 대체)"""
+        self.publish(
+            model,
+            frames or {},
+            {'config': config, 'visualization': visualization, 'sanctions': sanctions},
+        )
+    
+    @contextmanager
+    def snapshot(self):
+        """한 트랜잭션 안에서 조회 (게시 중인 결과가 절반만 보이지 않음)"""
+        self.con.execute("BEGIN TRANSACTION")
+        try:
+            yield self
+        finally:
+            self.con.execute("ROLLBACK")
+
+    def generations(self) -> Dict[str, int]:
+        """모델별 게시 세대 (게시할 때마다 1씩 증가)"""
+        if not self._table_exists(GENERATIONS_TABLE):
+            return {}
+        return dict(self.con.execute(f'SELECT model, generation FROM "{GENERATIONS_TABLE}"').fetchall())
+
+    def has_results(self, model: str) -> bool:
+        """모델이 한 번이라도 결과를 게시했는지 여부"""
+        return model in self.generations()
+
+    def read_document(self, model: str, name: str) -> Optional[Any]:
+        if not self._table_exists(DOCUMENTS_TABLE):
+            return None
+        row = self.con.execute(
+            f'SELECT body FROM "{DOCUMENTS_TABLE}" WHERE model = ? AND name = ?', [model, name]
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _select(
+        self,
+        model: str,
+        name: str,
+        columns: Optional[Sequence[str]] = None,
+        where: Optional[str] = None,
+        params: Any = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Optional[duckdb.DuckDBPyConnection]:
+        table = results_table(model, name)
+        if not self._table_exists(table):
+            return None
+        select = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        query = f'SELECT {select} FROM "{table}"'
+        if where:
+            query += f" WHERE {where}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return self.con.execute(query, params)
+
+    def read_frame(self, model: str, name: str, **query) -> Optional[pd.DataFrame]:
+        """결과 테이블 조회 (테이블이 없으면 None)
+
+        query: columns / where (?, $name 파라미터) / params / order_by / limit
+        """
+        result = self._select(model, name, **query)
+        return None if result is None else result.fetchdf()
+
+    def read_records(self, model: str, name: str, **query) -> Optional[List[Dict[str, Any]]]:
+        """read_frame과 같은 조회를 dict 리스트로 (LIST 컬럼은 list, NULL은 None)"""
+        result = self._select(model, name, **query)
+        if result is None:
+            return None
+        columns = [d[0] for d in result.description]
+        return [dict(zip(columns, row)) for row in result.fetchall()]
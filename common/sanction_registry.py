@@ -0,0 +1,97 @@
+"""Sanction cases keyed by (sanction_type, subject) for the detectors' SanctionPipelines.
+
+Features
+- `add(case)` appends to the ordered case list, a per-type bucket and a key
+  set, so "was this account/group already sanctioned as X" is a set lookup
+  and "all cases of type X" is the bucket instead of a rescan of every case.
+- The subject is a case field: `account_id` (funding), `group_id` (coop).
+- `remember(records)` loads the sanction records published by the previous
+  run; `remember_published(store, model)` reads them from the `sanctions`
+  document in results_store. `is_carried_over(case)`
+  then tells whether the same sanction already existed in the previous
+  simulation step. Detectors whose subject ids are positional (coop
+  GROUP_0001, ...) compare a stable `carry_field` (the member accounts).
+
+# usage
+from common.sanction_registry import SanctionRegistry
+registry = SanctionRegistry('account_id')
+registry.remember_published(ResultsStore(con), 'funding')
+registry.add(case)
+registry.contains(SanctionType.IMMEDIATE_CRITICAL, 'A0001')
+registry.by_type(SanctionType.IMMEDIATE_CRITICAL)
+registry.carried_over_count()
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from enum import Enum
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+def _type_key(sanction_type: Any) -> str:
+    return sanction_type.value if isinstance(sanction_type, Enum) else str(sanction_type)
+
+
+def _subject_key(value: Any) -> Hashable:
+    # 계정 목록은 순서와 무관하게 비교
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(str(v) for v in value))
+    return value
+
+
+class SanctionRegistry:
+    """Ordered sanction cases with (type, subject) membership and per-type buckets."""
+
+    def __init__(self, subject_field: str, carry_field: Optional[str] = None):
+        self.subject_field = subject_field
+        self.carry_field = carry_field or subject_field
+        self.cases: List[Any] = []
+        self._buckets: Dict[str, List[Any]] = defaultdict(list)
+        self._keys: Set[Tuple[str, Hashable]] = set()
+        self._previous: Set[Tuple[str, Hashable]] = set()
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def __iter__(self):
+        return iter(self.cases)
+
+    def add(self, case: Any) -> None:
+        sanction_type = _type_key(case.sanction_type)
+        self.cases.append(case)
+        self._buckets[sanction_type].append(case)
+        self._keys.add((sanction_type, _subject_key(getattr(case, self.subject_field))))
+
+    def contains(self, sanction_type: Any, subject: Any) -> bool:
+        """subject가 이번 실행에서 이미 해당 유형으로 제재되었는지"""
+        return (_type_key(sanction_type), _subject_key(subject)) in self._keys
+
+    def by_type(self, sanction_type: Any) -> List[Any]:
+        """해당 유형의 제재 케이스 (추가 순서)"""
+        return list(self._buckets.get(_type_key(sanction_type), []))
+
+    def subjects(self) -> Set[Hashable]:
+        return {subject for _, subject in self._keys}
+
+    def remember(self, records: Optional[Iterable[Dict[str, Any]]]) -> int:
+        """이전 실행이 게시한 제재 레코드(to_dict 결과)를 기억; 기억한 키 수 반환"""
+        self._previous = {
+            (_type_key(r.get('sanction_type')), _subject_key(r.get(self.carry_field)))
+            for r in records or []
+            if r.get(self.carry_field) is not None
+        }
+        return len(self._previous)
+
+    def remember_published(self, store: Any, model: str) -> int:
+        """ResultsStore에 게시된 model의 제재 문서를 기억 (이어진 제재/신규 제재 구분용)"""
+        count = self.remember((store.read_document(model, 'sanctions') or {}).get('sanctions'))
+        if count:
+            print(f"이전 실행 제재 {count}건 확인")
+        return count
+
+    def is_carried_over(self, case: Any) -> bool:
+        """같은 유형/대상의 제재가 이전 실행에도 있었는지"""
+        return (_type_key(case.sanction_type), _subject_key(getattr(case, self.carry_field))) in self._previous
+
+    def carried_over_count(self) -> int:
+        return sum(1 for case in self.cases if self.is_carried_over(case))
@@ -0,0 +1,41 @@
+"""Glue between the detectors' case objects and their batch `score_frame` APIs.
+
+Features
+- `feature_frame(objects, columns)` builds the score_frame input from
+  dataclass attributes (FEATURE_COLUMNS are attribute names).
+- `apply_scores(objects, scores, breakdown_cls, score_columns, label, label_type)`
+  writes the score_frame output back: a ScoreBreakdown built from
+  SCORE_COLUMNS (its field names) and the label column (tier / severity /
+  risk_level) converted to the detector's Enum on the attribute of the same
+  name.
+
+# usage
+from common.scoring import feature_frame, apply_scores
+scores = engine.score_frame(feature_frame(pairs, engine.FEATURE_COLUMNS))
+apply_scores(pairs, scores, ScoreBreakdown, engine.SCORE_COLUMNS, 'tier', TierType)
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Sequence
+
+import pandas as pd
+
+
+def feature_frame(objects: Sequence[Any], columns: Sequence[str]) -> pd.DataFrame:
+    """객체 속성 -> score_frame 입력 DataFrame (컬럼 = 속성 이름)"""
+    return pd.DataFrame({name: [getattr(obj, name) for obj in objects] for name in columns})
+
+
+def apply_scores(
+    objects: Sequence[Any],
+    scores: pd.DataFrame,
+    breakdown_cls: Callable[..., Any],
+    score_columns: Sequence[str],
+    label: str,
+    label_type: Callable[[Any], Any],
+) -> None:
+    """score_frame 결과를 객체의 score(breakdown_cls)와 label 속성(label_type)에 반영"""
+    rows = scores[list(score_columns)].to_numpy(dtype=float).tolist()
+    for obj, row, value in zip(objects, rows, scores[label]):
+        obj.score = breakdown_cls(**dict(zip(score_columns, row)))
+        setattr(obj, label, label_type(value))
@@ -11,15 +11,25 @@ Author: Singapore Fintech Hackathon Team
 탐지 대상: 펀딩비 정산 시점을 노린 고빈도 포지션 개폐 패턴
 """
 
+import numpy as np
 import pandas as pd
 import duckdb as dd
 import json
-from dataclasses import dataclass, field, asdict
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field, fields, asdict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 from enum import Enum
 import logging
+from common.materialized import (
+    FUNDING_CUMULATIVE_TABLE, SPEC_INDEX_TABLE,
+    ensure_funding_cumulative, ensure_positions, ensure_spec_index, spec_coverage_gaps,
+)
+from common.incremental import IncrementalState
+from common.filter_pushdown import FilterSet, SqlFilter, log_filter_failures
+from common.results_store import ResultsStore
+from common.scoring import apply_scores, feature_frame
+from common.sanction_registry import SanctionRegistry
 # detectors read model tables directly from persistent DuckDB file created by main
 
 # ============================================================================
@@ -62,6 +72,11 @@ class DetectionConfig:
     high_threshold: int = 70                       # High 최소 점수
     medium_threshold: int = 50                     # Medium 최소 점수
     
+    # ===== Execution Settings =====
+    incremental_mode: bool = False                 # 이전 실행 이후 변경된 포지션만 후보 재계산
+    filter_pushdown: bool = True                   # 필터를 후보 SQL의 WHERE로 실행 (DuckDB가 통과 행만 반환)
+    explain_filter_failures: bool = False          # pushdown 시 실패 행과 실패 사유도 반환 (감사용)
+    
     # ===== Output Settings =====
     output_dir: str = "output/funding_fee"
     enable_detailed_logging: bool = True
@@ -259,43 +274,120 @@ class DetectionLogger:
 class CandidateExtractor:
     """후보 케이스 추출"""
     
-    def __init__(self, con: dd.DuckDBPyConnection):
+    ORDER_BY = "window_funding DESC, holding_minutes ASC"
+    
+    def __init__(self, con: dd.DuckDBPyConnection, incremental: bool = False):
         self.con = con
+        self.incremental = incremental
     
     def extract_candidates(self) -> List[Dict]:
         """SQL을 통해 후보 케이스 추출"""
+        query = self.candidates_source() + f"""
+        ORDER BY {self.ORDER_BY}
+        """
+        
+        df = self.con.execute(query).fetchdf()
+        print(f"후보 케이스 {len(df)}개 추출")
+        
+        return df.to_dict('records')
+    
+    def extract_filtered(self, filters: FilterSet, explain: bool = False) -> Tuple[pd.DataFrame, int]:
+        """
+        필터를 후보 SQL의 WHERE로 실행해 통과 케이스만 추출 (ORDER_BY 순)
+        
+        Returns:
+            (candidate_idx [+ explain 시 filter_failure_mask] 컬럼이 붙은 DataFrame, 필터 전 전체 후보 수)
+        """
+        df, total = filters.fetch(self.con, self.candidates_source(), self.ORDER_BY, explain=explain)
+        print(f"후보 케이스 {total}개 추출 (SQL 필터 후 {len(df)}개 조회)")
+        return df, total
+    
+    def candidates_source(self) -> str:
+        """후보 케이스 SQL (정렬 전, 증분 모드면 저장 후보를 병합한 뒤 조회하는 SQL)"""
         print("후보 케이스 추출 중...")
+        ensure_positions(self.con)
+        ensure_funding_cumulative(self.con)
+        ensure_spec_index(self.con)
+        self._report_spec_gaps()
+        
+        if self.incremental:
+            return self._incremental_source()
+        return self._candidates_sql()
+    
+    def _incremental_source(self) -> str:
+        """
+        증분 후보 SQL
         
-        query = """
-        WITH spec_clean AS (
-            SELECT
-                symbol,
-                CAST(funding_interval AS INTEGER) AS fund_period_hr,
-                max_order_amount,
-                CAST(day AS DATE) AS spec_day
-            FROM Spec
-        ),
-        position AS (
+        후보는 포지션 단위이므로 워터마크 이후 변경된(close_ts > 워터마크) 포지션만 다시 계산해 병합.
+        계정 전체 펀딩비(account_total_funding)는 새 펀딩 데이터에 따라 바뀌므로 조회 시점에 다시 결합.
+        """
+        state = IncrementalState(self.con, 'funding', "funding:v3")
+        stored_sql = f"SELECT * EXCLUDE (account_total_funding) FROM ({{sql}})"
+        
+        if not state.is_incremental:
+            state.replace_candidates(stored_sql.format(sql=self._candidates_sql()))
+            print(f"전체 후보 계산 (워터마크: {state.new_watermark})")
+        else:
+            deleted, inserted = state.merge_candidates(
+                stored_sql.format(sql=self._candidates_sql("WHERE close_ts > $watermark")),
+                {'watermark': state.previous_watermark},
+                [('account_id', 'position_id')],
+            )
+            print(f"증분 후보 병합: {state.previous_watermark} 이후 - 삭제 {deleted}, 추가 {inserted}")
+        state.commit()
+        
+        return f"""
+        SELECT c.*, fa.account_total_funding
+        FROM "{state.table}" c
+        LEFT JOIN ({self._account_total_sql()}) fa ON c.account_id = fa.account_id
+        """
+    
+    def _report_spec_gaps(self):
+        """마감일에 Spec 행이 없는 포지션 수 출력 (이전 스펙 적용/스펙 없음)"""
+        gaps = spec_coverage_gaps(self.con)
+        if gaps.empty:
+            return
+        print(f"⚠️ Spec 누락 심볼 {len(gaps)}개: 이전 스펙 적용 {int(gaps['carried_forward'].sum())}건, "
+              f"스펙 없음 {int(gaps['unresolved'].sum())}건")
+        for row in gaps.itertuples(index=False):
+            lag = f", 최대 {int(row.max_lag_days)}일 전 스펙" if pd.notna(row.max_lag_days) else ""
+            print(f"  - {row.symbol}: 이전 스펙 {row.carried_forward}건, 스펙 없음 {row.unresolved}건{lag}")
+    
+    @staticmethod
+    def _account_total_sql() -> str:
+        """계정 전체 펀딩비 = 누적합 테이블의 계정별 마지막 값"""
+        return f"""
             SELECT
                 account_id,
-                position_id,
-                MAX(leverage) AS leverage,
-                CAST(MIN(ts) AS TIMESTAMP) as open_ts,
-                CAST(MAX(ts) AS TIMESTAMP) as closing_ts,
-                MAX(symbol) as symbol,
-                MAX(side) as side,
-                DATE(MAX(ts)) as closing_day,
-                SUM(CASE WHEN openclose='OPEN' THEN amount ELSE 0 END) as amount
-            FROM Trade
-            GROUP BY account_id, position_id
-        ),
-        funding_agg AS (
+                CAST(arg_max(cum_funding, ts) AS DOUBLE) AS account_total_funding
+            FROM "{FUNDING_CUMULATIVE_TABLE}"
+            GROUP BY account_id
+        """
+    
+    def _candidates_sql(self, position_where: str = "") -> str:
+        """
+        후보 케이스 SQL (position_where: positions 테이블에 적용할 추가 조건)
+        
+        포지션 구간 [open_ts, closing_ts]의 펀딩비는 계정별 누적합(funding_cumulative)에서
+        closing_ts 이하 마지막 누적값 - open_ts 미만 마지막 누적값 (ASOF 조인 2회)
+        심볼 스펙은 spec_index에서 closing_day 이하 가장 최근 spec_day로 결정 (ASOF 조인)
+        """
+        return f"""
+        WITH position AS (
             SELECT
                 account_id,
-                -SUM(funding_fee) AS account_total_funding
-            FROM Funding
-            GROUP BY account_id
+                position_id,
+                leverage,
+                open_ts,
+                close_ts as closing_ts,
+                symbol,
+                side,
+                closing_day,
+                amount
+            FROM positions
+            {position_where}
         ),
+        funding_agg AS ({self._account_total_sql()}),
         joined AS (
             SELECT
                 ct.account_id,
@@ -310,20 +402,17 @@ class CandidateExtractor:
                 (epoch(ct.closing_ts) - epoch(ct.open_ts)) / 60.0 AS holding_minutes,
                 sc.fund_period_hr,
                 sc.max_order_amount,
-                CAST(STRFTIME('%H', ct.closing_ts) AS INTEGER) AS closing_hour,
-                CAST(STRFTIME('%H', ct.open_ts) AS INTEGER) AS opening_hour,
-                COALESCE(fw.window_funding, 0) AS window_funding
+                HOUR(ct.closing_ts) AS closing_hour,
+                HOUR(ct.open_ts) AS opening_hour,
+                CAST(COALESCE(fc.cum_funding, 0) - COALESCE(fo.cum_funding, 0) AS DOUBLE) AS window_funding
             FROM position ct
             LEFT JOIN funding_agg fa ON ct.account_id = fa.account_id
-            LEFT JOIN spec_clean sc
-                ON ct.symbol = sc.symbol AND ct.closing_day = sc.spec_day
-            LEFT JOIN LATERAL (
-                SELECT SUM(-funding_fee) AS window_funding
-                FROM Funding f
-                WHERE f.account_id = ct.account_id
-                  AND CAST(f.ts AS TIMESTAMP) >= ct.open_ts
-                  AND CAST(f.ts AS TIMESTAMP) <= ct.closing_ts
-            ) fw ON TRUE
+            ASOF LEFT JOIN "{SPEC_INDEX_TABLE}" sc
+                ON ct.symbol = sc.symbol AND ct.closing_day >= sc.spec_day
+            ASOF LEFT JOIN "{FUNDING_CUMULATIVE_TABLE}" fc
+                ON ct.account_id = fc.account_id AND ct.closing_ts >= fc.ts
+            ASOF LEFT JOIN "{FUNDING_CUMULATIVE_TABLE}" fo
+                ON ct.account_id = fo.account_id AND ct.open_ts > fo.ts
         )
         SELECT 
             account_id,
@@ -348,13 +437,7 @@ class CandidateExtractor:
             AND fund_period_hr IS NOT NULL
             AND max_order_amount IS NOT NULL
             AND closing_hour % fund_period_hr = 0
-        ORDER BY window_funding DESC, holding_minutes ASC
         """
-        
-        df = self.con.execute(query).fetchdf()
-        print(f"후보 케이스 {len(df)}개 추출")
-        
-        return df.to_dict('records')
 
 
 # ============================================================================
@@ -367,11 +450,17 @@ class FilterEngine:
     def __init__(self, config: DetectionConfig):
         self.config = config
     
-    def apply_filters(self, candidates: List[Dict]) -> tuple[List[FundingHunterCase], List[Dict]]:
-        """필터 적용 및 FundingHunterCase 객체 생성"""
+    def apply_filters(self, candidates: List[Dict]) -> tuple[List[FundingHunterCase], pd.DataFrame, List[Dict]]:
+        """
+        필터 적용 및 FundingHunterCase 객체 생성
+        
+        Returns:
+            (통과 케이스, 통과 케이스 테이블(case_id + 후보 컬럼, 케이스 순서), 실패 행)
+        """
         print("필터 엔진 시작...")
         
         passed_cases = []
+        passed_rows = []
         failed_data = []
         
         for idx, row in enumerate(candidates):
@@ -400,6 +489,7 @@ class FilterEngine:
                 hunter_case = self._create_hunter_case(case_id, row)
                 hunter_case.passed_filter = True
                 passed_cases.append(hunter_case)
+                passed_rows.append({'case_id': case_id, **row})
             else:
                 # 실패 정보 기록
                 row['case_id'] = case_id
@@ -411,7 +501,57 @@ class FilterEngine:
         
         print(f"필터 완료: {len(passed_cases)}/{len(candidates)} 통과")
         
-        return passed_cases, failed_data
+        return passed_cases, pd.DataFrame(passed_rows), failed_data
+    
+    def sql_filters(self) -> FilterSet:
+        """apply_filters와 같은 순서/판정의 SQL 필터 (DuckDB에서 실행)"""
+        config = self.config
+        filters = [
+            SqlFilter("min_leverage", "leverage >= $min_leverage", {'min_leverage': config.min_leverage}),
+            SqlFilter("min_amount_ratio", "amount_ratio >= $min_amount_ratio",
+                      {'min_amount_ratio': float(config.min_amount_ratio)}),
+            SqlFilter("max_holding_time", "holding_minutes <= $max_holding_minutes",
+                      {'max_holding_minutes': float(config.max_holding_minutes)}),
+        ]
+        if config.require_hour_change:
+            filters.append(SqlFilter("hour_change", "opening_hour != closing_hour"))
+        return FilterSet(filters)
+    
+    def apply_filters_pushdown(
+        self, candidates: pd.DataFrame, total: int, filters: FilterSet
+    ) -> tuple[List[FundingHunterCase], pd.DataFrame, List[Dict]]:
+        """
+        SQL 필터 결과(CandidateExtractor.extract_filtered)로 FundingHunterCase 생성
+        
+        filter_failure_mask 컬럼(explain 모드)이 있으면 실패 행을 apply_filters와 같은 형식으로 반환
+        통과 케이스 테이블은 후보 DataFrame에서 컬럼 그대로 잘라냄 (apply_filters와 같은 형식)
+        """
+        print("필터 엔진 시작 (SQL)...")
+        
+        passed_cases = []
+        failed_data = []
+        
+        for row in candidates.to_dict('records'):
+            case_id = f"FUND_{row.pop('candidate_idx'):06d}"
+            mask = int(row.pop('filter_failure_mask', 0))
+            if mask == 0:
+                hunter_case = self._create_hunter_case(case_id, row)
+                hunter_case.passed_filter = True
+                passed_cases.append(hunter_case)
+            else:
+                row['case_id'] = case_id
+                row['filter_failures'] = filters.failure_names(mask)
+                failed_data.append(row)
+        
+        passed = candidates
+        if 'filter_failure_mask' in candidates:
+            passed = candidates[candidates['filter_failure_mask'] == 0]
+        case_table = passed.drop(columns=['candidate_idx', 'filter_failure_mask'], errors='ignore')
+        case_table.insert(0, 'case_id', 'FUND_' + passed['candidate_idx'].astype(str).str.zfill(6))
+        
+        print(f"필터 완료: {len(passed_cases)}/{total} 통과")
+        
+        return passed_cases, case_table.reset_index(drop=True), failed_data
     
     def _check_min_leverage(self, row: Dict) -> bool:
         """최소 레버리지 확인"""
@@ -465,112 +605,90 @@ class ScoringEngine:
     def __init__(self, config: DetectionConfig):
         self.config = config
     
-    def score_all_cases(self, cases: List[FundingHunterCase]) -> List[FundingHunterCase]:
-        """모든 케이스 점수 계산"""
+    # score_frame 입력 컬럼 (FundingHunterCase 필드명과 동일)
+    FEATURE_COLUMNS = ('window_funding', 'holding_minutes', 'leverage', 'amount_ratio')
+    SCORE_COLUMNS = ('funding_profit', 'short_holding', 'high_leverage', 'large_position', 'total')
+    
+    def score_all_cases(
+        self, cases: List[FundingHunterCase], scores: Optional[pd.DataFrame] = None
+    ) -> List[FundingHunterCase]:
+        """모든 케이스 점수 계산 (score_frame 배치 계산 결과를 객체에 반영, scores가 주어지면 그대로 사용)"""
         print("점수 엔진 시작...")
         
-        for case in cases:
-            # 각 지표별 점수 계산
-            funding_score = self._score_funding_profit(case)
-            holding_score = self._score_short_holding(case)
-            leverage_score = self._score_high_leverage(case)
-            position_score = self._score_large_position(case)
-            
-            # 점수 저장
-            case.score = ScoreBreakdown(
-                funding_profit=funding_score,
-                short_holding=holding_score,
-                high_leverage=leverage_score,
-                large_position=position_score,
-                total=funding_score + holding_score + leverage_score + position_score
-            )
-            
-            # 심각도 분류
-            case.severity = self._classify_severity(case.score.total)
-            
-            # if self.config.enable_detailed_logging:
-            #     print(
-            #         f"{case.case_id}: 점수={case.score.total:.1f} "
-            #         f"(Funding:{funding_score:.1f}, Holding:{holding_score:.1f}, "
-            #         f"Leverage:{leverage_score:.1f}, Position:{position_score:.1f}) "
-            #         f"→ {case.severity.value}"
-            #     )
+        if scores is None:
+            scores = self.score_frame(feature_frame(cases, self.FEATURE_COLUMNS))
+        apply_scores(cases, scores, ScoreBreakdown, self.SCORE_COLUMNS, 'severity', SeverityLevel)
         
         print(f"점수 계산 완료: {len(cases)}개")
         
         return cases
     
-    def _score_funding_profit(self, case: FundingHunterCase) -> float:
-        """펀딩비 수익 점수 (40점)"""
-        max_weight = self.config.weight_funding_profit
-        profit = case.window_funding
-        
-        if profit >= 1000:
-            return max_weight
-        elif profit >= 500:
-            return max_weight * 0.85
-        elif profit >= 200:
-            return max_weight * 0.65
-        elif profit >= 100:
-            return max_weight * 0.45
-        elif profit >= 50:
-            return max_weight * 0.25
-        else:
-            return max_weight * 0.10
-    
-    def _score_short_holding(self, case: FundingHunterCase) -> float:
-        """짧은 보유 시간 점수 (25점)"""
-        max_weight = self.config.weight_short_holding
-        minutes = case.holding_minutes
-        
-        if minutes <= 5:
-            return max_weight
-        elif minutes <= 10:
-            return max_weight * 0.80
-        elif minutes <= 15:
-            return max_weight * 0.60
-        else:  # <= 20
-            return max_weight * 0.35
-    
-    def _score_high_leverage(self, case: FundingHunterCase) -> float:
-        """높은 레버리지 점수 (20점)"""
-        max_weight = self.config.weight_high_leverage
-        leverage = case.leverage
-        
-        if leverage >= 20:
-            return max_weight
-        elif leverage >= 15:
-            return max_weight * 0.80
-        elif leverage >= 10:
-            return max_weight * 0.60
-        else:  # >= 5
-            return max_weight * 0.35
-    
-    def _score_large_position(self, case: FundingHunterCase) -> float:
-        """큰 포지션 크기 점수 (15점)"""
-        max_weight = self.config.weight_large_position
-        ratio = case.amount_ratio
-        
-        if ratio >= 0.8:
-            return max_weight
-        elif ratio >= 0.6:
-            return max_weight * 0.75
-        elif ratio >= 0.5:
-            return max_weight * 0.50
-        else:  # >= 0.3
-            return max_weight * 0.25
-    
-    def _classify_severity(self, total_score: float) -> SeverityLevel:
-        """점수 기반 심각도 분류"""
-        if total_score >= self.config.critical_threshold:
-            return SeverityLevel.CRITICAL
-        elif total_score >= self.config.high_threshold:
-            return SeverityLevel.HIGH
-        elif total_score >= self.config.medium_threshold:
-            return SeverityLevel.MEDIUM
-        else:
-            return SeverityLevel.LOW
-
+    def score_frame(self, features: pd.DataFrame) -> pd.DataFrame:
+        """
+        배치 점수 계산 (항목별 구간 점수와 심각도 임계값을 np.select로 배열 단위 적용)
+        
+        점수 규칙은 여기에만 정의 (score_all_cases도 이 결과를 FundingHunterCase에 반영)
+        
+        Args:
+            features: FEATURE_COLUMNS 컬럼을 가진 DataFrame
+        
+        Returns:
+            SCORE_COLUMNS + severity(SeverityLevel 값) 컬럼 DataFrame (features와 같은 index)
+        """
+        c = self.config
+        col = lambda name: features[name].to_numpy(dtype=float)
+        
+        # 펀딩비 수익 (40점)
+        profit = col('window_funding')
+        w = c.weight_funding_profit
+        funding = np.select(
+            [profit >= 1000, profit >= 500, profit >= 200, profit >= 100, profit >= 50],
+            [w, w * 0.85, w * 0.65, w * 0.45, w * 0.25],
+            w * 0.10,
+        )
+        
+        # 짧은 보유 시간 (25점)
+        minutes = col('holding_minutes')
+        w = c.weight_short_holding
+        holding = np.select(
+            [minutes <= 5, minutes <= 10, minutes <= 15],
+            [w, w * 0.80, w * 0.60],
+            w * 0.35,
+        )
+        
+        # 높은 레버리지 (20점)
+        lev = col('leverage')
+        w = c.weight_high_leverage
+        leverage = np.select(
+            [lev >= 20, lev >= 15, lev >= 10],
+            [w, w * 0.80, w * 0.60],
+            w * 0.35,
+        )
+        
+        # 큰 포지션 크기 (15점): 최대 주문액 대비 비율
+        ratio = col('amount_ratio')
+        w = c.weight_large_position
+        position = np.select(
+            [ratio >= 0.8, ratio >= 0.6, ratio >= 0.5],
+            [w, w * 0.75, w * 0.50],
+            w * 0.25,
+        )
+        
+        total = funding + holding + leverage + position
+        severity = np.select(
+            [total >= c.critical_threshold, total >= c.high_threshold, total >= c.medium_threshold],
+            [SeverityLevel.CRITICAL.value, SeverityLevel.HIGH.value, SeverityLevel.MEDIUM.value],
+            SeverityLevel.LOW.value,
+        )
+        
+        return pd.DataFrame({
+            'funding_profit': funding,
+            'short_holding': holding,
+            'high_leverage': leverage,
+            'large_position': position,
+            'total': total,
+            'severity': severity,
+        }, index=features.index)
 
 # ============================================================================
 # 7. ACCOUNT ANALYZER
@@ -582,45 +700,66 @@ class AccountAnalyzer:
     def __init__(self, config: DetectionConfig):
         self.config = config
     
-    def analyze_accounts(self, cases: List[FundingHunterCase]) -> Dict[str, AccountSummary]:
-        """계정별 요약 생성"""
+    SUMMARY_COLUMNS = [f.name for f in fields(AccountSummary)]
+    
+    def analyze_accounts(self, case_table: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
+        """
+        계정별 요약 생성 (필터 통과 케이스 테이블 + score_frame 결과를 summary_frame으로 집계)
+        
+        Args:
+            case_table: FilterEngine이 반환한 통과 케이스 테이블
+            scores: case_table에 대한 ScoringEngine.score_frame 결과 (같은 행 순서)
+        
+        Returns:
+            summary_frame 결과 (AccountSummary 객체는 제재 JSON 출력 시에만 구성)
+        """
         print("계정별 분석 중...")
         
-        account_map = {}
+        columns = ['account_id', 'case_id', 'window_funding', 'account_total_funding']
+        frame = case_table.reindex(columns=columns).assign(
+            severity=scores['severity'].to_numpy(),
+            score=scores['total'].to_numpy(),
+        )
+        summary = self.summary_frame(frame)
         
-        for case in cases:
-            account_id = case.account_id
-            
-            if account_id not in account_map:
-                account_map[account_id] = AccountSummary(account_id=account_id)
-            
-            summary = account_map[account_id]
-            summary.total_cases += 1
-            summary.total_funding_profit += case.window_funding
-            summary.account_total_funding = max(
-                summary.account_total_funding, case.account_total_funding
-            )
-            summary.case_ids.append(case.case_id)
-            
-            if case.severity == SeverityLevel.CRITICAL:
-                summary.critical_count += 1
-            elif case.severity == SeverityLevel.HIGH:
-                summary.high_count += 1
-            
-            # 점수 누적
-            if summary.total_cases == 1:
-                summary.avg_score = case.score.total
-                summary.max_score = case.score.total
-            else:
-                summary.avg_score = (
-                    (summary.avg_score * (summary.total_cases - 1) + case.score.total) 
-                    / summary.total_cases
-                )
-                summary.max_score = max(summary.max_score, case.score.total)
+        print(f"계정 분석 완료: {len(summary)}개 계정")
         
-        print(f"계정 분석 완료: {len(account_map)}개 계정")
+        return summary
+    
+    def summary_frame(self, cases: pd.DataFrame) -> pd.DataFrame:
+        """
+        계정별 요약 (계정 단위 groupby 한 번으로 집계)
         
-        return account_map
+        Args:
+            cases: account_id, case_id, window_funding, account_total_funding,
+                   severity(SeverityLevel 값), score 컬럼 DataFrame
+        
+        Returns:
+            SUMMARY_COLUMNS 컬럼 DataFrame (계정 첫 등장 순서, case_ids는 케이스 순서 리스트)
+        """
+        if cases.empty:
+            return pd.DataFrame(columns=self.SUMMARY_COLUMNS)
+        
+        grouped = cases.assign(
+            is_critical=cases['severity'] == SeverityLevel.CRITICAL.value,
+            is_high=cases['severity'] == SeverityLevel.HIGH.value,
+        ).groupby('account_id', sort=False, dropna=False)
+        
+        summary = grouped.agg(
+            total_cases=('case_id', 'size'),
+            total_funding_profit=('window_funding', 'sum'),
+            account_total_funding=('account_total_funding', 'max'),
+            avg_score=('score', 'mean'),
+            max_score=('score', 'max'),
+            critical_count=('is_critical', 'sum'),
+            high_count=('is_high', 'sum'),
+            case_ids=('case_id', list),
+        ).reset_index()
+        
+        # 계정 전체 펀딩비는 0에서 시작한 최댓값 (음수면 0)
+        summary['account_total_funding'] = summary['account_total_funding'].fillna(0.0).clip(lower=0.0)
+        summary['merged_interval_count'] = 0
+        return summary[self.SUMMARY_COLUMNS]
 
 
 # ============================================================================
@@ -630,10 +769,15 @@ class AccountAnalyzer:
 class SanctionPipeline:
     """제재 케이스 생성 및 출력"""
     
-    def __init__(self, config: DetectionConfig, logger: DetectionLogger):
+    def __init__(self, config: DetectionConfig, logger: DetectionLogger, registry: Optional[SanctionRegistry] = None):
         self.config = config
         self.logger = logger
-        self.sanction_cases: List[SanctionCase] = []
+        self.registry = registry or SanctionRegistry('account_id')
+        self.sanctions_document: Optional[Dict] = None
+    
+    @property
+    def sanction_cases(self) -> List[SanctionCase]:
+        return self.registry.cases
     
     def process_critical_cases(self, cases: List[FundingHunterCase]) -> List[SanctionCase]:
         """Critical 심각도 즉시 제재 케이스 생성"""
@@ -659,33 +803,32 @@ class SanctionPipeline:
                 evidence_summary=f"확실한 펀딩비 악용 패턴 (점수: {case.score.total:.1f}/100)"
             )
             
-            self.sanction_cases.append(sanction)
+            self.registry.add(sanction)
             self.logger.logger.warning(f"제재 케이스 생성: {sanction.case_id}")
         
         print(f"Critical 제재: {len(critical_cases)}건")
         
-        return [c for c in self.sanction_cases if c.sanction_type == SanctionType.IMMEDIATE_CRITICAL]
+        return self.registry.by_type(SanctionType.IMMEDIATE_CRITICAL)
     
     def process_account_analysis(
         self, 
-        account_summaries: Dict[str, AccountSummary],
+        account_summaries: pd.DataFrame,
         cases: List[FundingHunterCase]
     ) -> List[SanctionCase]:
-        """계정 분석 기반 제재 케이스 생성"""
+        """계정 분석 기반 제재 케이스 생성 (account_summaries: AccountAnalyzer.analyze_accounts 결과)"""
         print("계정 분석 제재 케이스 생성 중...")
         
         account_sanctions = []
         
         # 반복 악용 계정 제재 (Critical 또는 High가 2건 이상)
-        repeat_accounts = {
-            acc_id: summary for acc_id, summary in account_summaries.items()
-            if summary.critical_count >= 1 or summary.high_count >= 2
-        }
+        repeat_accounts = account_summaries[
+            (account_summaries['critical_count'] >= 1) | (account_summaries['high_count'] >= 2)
+        ]
         
-        for account_id, summary in repeat_accounts.items():
+        for summary in (AccountSummary(**record) for record in repeat_accounts.to_dict('records')):
+            account_id = summary.account_id
             # 이미 Critical로 제재된 경우 스킵
-            if any(c.account_id == account_id and c.sanction_type == SanctionType.IMMEDIATE_CRITICAL 
-                   for c in self.sanction_cases):
+            if self.registry.contains(SanctionType.IMMEDIATE_CRITICAL, account_id):
                 continue
             
             sanction = SanctionCase(
@@ -703,7 +846,7 @@ class SanctionPipeline:
             )
             
             account_sanctions.append(sanction)
-            self.sanction_cases.append(sanction)
+            self.registry.add(sanction)
             self.logger.logger.warning(f"제재 케이스 생성: {sanction.case_id}")
         
         print(f"반복 악용 제재: {len(account_sanctions)}건")
@@ -722,10 +865,15 @@ class SanctionPipeline:
             'sanctions': [case.to_dict() for case in self.sanction_cases]
         }
         
+        self.sanctions_document = data
+        
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
         print(f"제재 케이스 저장: {filepath} ({len(self.sanction_cases)}건)")
+        carried = self.registry.carried_over_count()
+        if carried:
+            print(f"  이전 실행에서 이어진 제재 {carried}건, 신규 {len(self.sanction_cases) - carried}건")
         
         return str(filepath)
 
@@ -740,16 +888,19 @@ class ReportGenerator:
     def __init__(self, config: DetectionConfig):
         self.config = config
         self.output_dir = Path(config.output_dir)
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.documents: Dict[str, Dict] = {}
     
     def generate_all_reports(
         self,
         all_cases: List[FundingHunterCase],
-        account_summaries: Dict[str, AccountSummary]
+        account_summaries: pd.DataFrame
     ):
-        """모든 보고서 생성"""
+        """모든 보고서 생성 (account_summaries: AccountAnalyzer.analyze_accounts 결과)"""
         print("보고서 생성 중...")
         
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.frames, self.documents = {}, {}
         
         # 1. 케이스 상세 데이터 (CSV)
         self._export_cases_csv(all_cases)
@@ -796,19 +947,19 @@ class ReportGenerator:
             records.append(record)
         
         df = pd.DataFrame(records)
+        self.frames['cases'] = df
         filepath = self.output_dir / "funding_hunter_cases.csv"
         df.to_csv(filepath, index=False, encoding='utf-8-sig')
         print(f"케이스 CSV 저장: {filepath}")
     
-    def _export_account_summary_csv(self, account_summaries: Dict[str, AccountSummary]):
+    def _export_account_summary_csv(self, account_summaries: pd.DataFrame):
         """계정 요약 CSV"""
-        if not account_summaries:
+        if account_summaries.empty:
             return
         
-        records = [summary.to_dict() for summary in account_summaries.values()]
-        df = pd.DataFrame(records)
-        df = df.sort_values('total_funding_profit', ascending=False)
+        df = account_summaries.sort_values('total_funding_profit', ascending=False)
         
+        self.frames['accounts'] = df
         filepath = self.output_dir / "account_summaries.csv"
         df.to_csv(filepath, index=False, encoding='utf-8-sig')
         print(f"계정 요약 CSV 저장: {filepath}")
@@ -816,7 +967,7 @@ class ReportGenerator:
     def _export_visualization_data(
         self, 
         cases: List[FundingHunterCase],
-        account_summaries: Dict[str, AccountSummary]
+        account_summaries: pd.DataFrame
     ):
         """시각화용 JSON 데이터"""
         from collections import defaultdict
@@ -850,12 +1001,8 @@ class ReportGenerator:
                 'medium': severity_counts.get('MEDIUM', 0),
                 'low': severity_counts.get('LOW', 0),
                 'total_accounts': len(account_summaries),
-                'total_funding_profit': sum(
-                    s.total_funding_profit for s in account_summaries.values()
-                ),
-                'total_account_funding': sum(
-                    s.account_total_funding for s in account_summaries.values()
-                ),
+                'total_funding_profit': float(account_summaries['total_funding_profit'].sum()),
+                'total_account_funding': float(account_summaries['account_total_funding'].sum()),
             },
             'severity_distribution': dict(severity_counts),
             'score_distribution': dict(score_distribution),
@@ -863,6 +1010,7 @@ class ReportGenerator:
             'symbol_distribution': dict(symbol_dist),
         }
         
+        self.documents['visualization'] = vis_data
         filepath = self.output_dir / "visualization_data.json"
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(vis_data, f, indent=2, ensure_ascii=False)
@@ -872,7 +1020,7 @@ class ReportGenerator:
     def _generate_summary_report(
         self,
         cases: List[FundingHunterCase],
-        account_summaries: Dict[str, AccountSummary]
+        account_summaries: pd.DataFrame
     ):
         """요약 보고서 텍스트"""
         from collections import defaultdict
@@ -881,18 +1029,14 @@ class ReportGenerator:
         for case in cases:
             severity_counts[case.severity] += 1
         
-        total_funding = sum(s.total_funding_profit for s in account_summaries.values())
-        total_account_funding = sum(
-            s.account_total_funding for s in account_summaries.values()
-        )
+        total_funding = float(account_summaries['total_funding_profit'].sum())
+        total_account_funding = float(account_summaries['account_total_funding'].sum())
         account_count = max(len(account_summaries), 1)
         
         # 상위 계정
-        top_accounts = sorted(
-            account_summaries.values(), 
-            key=lambda x: x.total_funding_profit, 
-            reverse=True
-        )[:10]
+        top_accounts = account_summaries.sort_values(
+            'total_funding_profit', ascending=False, kind='stable'
+        ).head(10)
         
         report = f"""
 {'='*70}
@@ -915,7 +1059,7 @@ class ReportGenerator:
 🎯 상위 계정 (Top 10)
 """
         
-        for idx, acc in enumerate(top_accounts, 1):
+        for idx, acc in enumerate(top_accounts.itertuples(index=False), 1):
             report += f"""  {idx}. {acc.account_id}
             - 윈도우 수익 합계: ${acc.total_funding_profit:,.2f}
             - 계정 총 펀딩비: ${acc.account_total_funding:,.2f}
@@ -954,36 +1098,51 @@ class FundingHunterDetector:
         self.sanction_pipeline = SanctionPipeline(config, self.logger)
         self.report_generator = ReportGenerator(config)
     
-    def detect(self, data_filepath: str) -> Dict:
-        """전체 탐지 프로세스 실행"""
+    def detect(self, data_filepath: str, con: Optional[dd.DuckDBPyConnection] = None) -> Dict:
+        """전체 탐지 프로세스 실행 (con이 주어지면 공유 커서 사용)"""
         
         # 1. 데이터 로드 (공통 DataManager 사용)
         self.logger.log_phase("데이터 로드")
         # detectors should use the persistent DuckDB file created by main
-        db_path = Path.cwd() / 'data' / 'ingest.duckdb'
-        con = dd.connect(database=str(db_path))
+        if con is None:
+            db_path = Path.cwd() / 'data' / 'ingest.duckdb'
+            con = dd.connect(database=str(db_path))
         
         # 2. 후보 추출
         self.logger.log_phase("후보 케이스 추출")
-        extractor = CandidateExtractor(con)
-        candidates = extractor.extract_candidates()
+        extractor = CandidateExtractor(con, incremental=self.config.incremental_mode)
+        if self.config.filter_pushdown:
+            # 필터를 후보 SQL의 WHERE로 실행: 통과 행(explain 시 전체 + 실패 비트)만 조회
+            filters = self.filter_engine.sql_filters()
+            candidates, total_candidates = extractor.extract_filtered(filters, self.config.explain_filter_failures)
+        else:
+            candidates = extractor.extract_candidates()
+            total_candidates = len(candidates)
         
-        if len(candidates) == 0:
+        if total_candidates == 0:
             print("후보 케이스가 없습니다. 탐지 종료.")
-            return self._empty_result()
+            return self._empty_result(con)
         
         # 3. 필터 적용
         self.logger.log_phase("필터 적용")
-        passed_cases, failed_cases = self.filter_engine.apply_filters(candidates)
-        self.logger.log_filter_result(len(candidates), len(passed_cases), len(failed_cases))
+        if self.config.filter_pushdown:
+            passed_cases, case_table, failed_cases = self.filter_engine.apply_filters_pushdown(
+                candidates, total_candidates, filters
+            )
+        else:
+            passed_cases, case_table, failed_cases = self.filter_engine.apply_filters(candidates)
+        self.logger.log_filter_result(total_candidates, len(passed_cases), total_candidates - len(passed_cases))
+        if self.config.filter_pushdown and self.config.explain_filter_failures:
+            log_filter_failures(self.logger.logger, (row['filter_failures'] for row in failed_cases))
         
         if len(passed_cases) == 0:
             print("필터를 통과한 케이스가 없습니다.")
-            return self._empty_result()
+            return self._empty_result(con)
         
         # 4. 점수 계산
         self.logger.log_phase("점수 계산 및 심각도 분류")
-        scored_cases = self.scoring_engine.score_all_cases(passed_cases)
+        scores = self.scoring_engine.score_frame(case_table)
+        scored_cases = self.scoring_engine.score_all_cases(passed_cases, scores)
         
         # 심각도 분포 로깅
         from collections import defaultdict
@@ -994,10 +1153,11 @@ class FundingHunterDetector:
         
         # 5. 계정별 분석
         self.logger.log_phase("계정별 분석")
-        account_summaries = self.account_analyzer.analyze_accounts(scored_cases)
+        account_summaries = self.account_analyzer.analyze_accounts(case_table, scores)
         
         # 6. Critical 케이스 즉시 제재
         self.logger.log_phase("Critical 케이스 제재")
+        self.sanction_pipeline.registry.remember_published(ResultsStore(con), 'funding')
         critical_sanctions = self.sanction_pipeline.process_critical_cases(scored_cases)
         
         # 7. 계정 분석 기반 제재
@@ -1014,23 +1174,34 @@ class FundingHunterDetector:
         self.logger.log_phase("보고서 생성")
         self.report_generator.generate_all_reports(scored_cases, account_summaries)
         
-        # 10. 결과 반환
+        # 10. API용 결과 테이블 게시 (CSV/JSON과 같은 내용)
+        self.logger.log_phase("결과 테이블 게시")
+        ResultsStore(con).publish_run(
+            'funding',
+            self.config.to_dict(),
+            self.report_generator.frames,
+            self.report_generator.documents.get('visualization'),
+            self.sanction_pipeline.sanctions_document,
+        )
+        
+        # 11. 결과 반환
         all_sanctions = critical_sanctions + account_sanctions
         return {
             'config': self.config.to_dict(),
-            'total_candidates': len(candidates),
+            'total_candidates': total_candidates,
             'passed_filter': len(passed_cases),
             'severity_distribution': {k.value: v for k, v in severity_counts.items()},
             'total_accounts': len(account_summaries),
-            'total_funding_profit': sum(s.total_funding_profit for s in account_summaries.values()),
+            'total_funding_profit': float(account_summaries['total_funding_profit'].sum()),
             'sanction_cases': len(all_sanctions),
             'critical_sanctions': len(critical_sanctions),
             'account_sanctions': len(account_sanctions),
             'output_directory': self.config.output_dir,
         }
     
-    def _empty_result(self) -> Dict:
-        """빈 결과 반환"""
+    def _empty_result(self, con: dd.DuckDBPyConnection) -> Dict:
+        """빈 결과 게시 후 반환 (이전 실행의 결과 테이블이 API에 남지 않도록)"""
+        ResultsStore(con).publish_run('funding', self.config.to_dict())
         return {
             'config': self.config.to_dict(),
             'total_candidates': 0,
@@ -1048,7 +1219,8 @@ class FundingHunterDetector:
 
 def run_detection(
     data_filepath: str,
-    config: Optional[DetectionConfig] = None
+    config: Optional[DetectionConfig] = None,
+    con: Optional[dd.DuckDBPyConnection] = None
 ) -> Dict:
     """
     펀딩 헌터 탐지 실행
@@ -1056,6 +1228,7 @@ def run_detection(
     Args:
         data_filepath: Excel 데이터 파일 경로
         config: 탐지 설정 (None이면 기본값 사용)
+        con: 공유 DuckDB 커넥션/커서 (None이면 탐지기가 직접 연결)
     
     Returns:
         탐지 결과 딕셔너리
@@ -1068,7 +1241,7 @@ def run_detection(
     
     # 탐지 실행
     detector = FundingHunterDetector(config)
-    result = detector.detect(data_filepath)
+    result = detector.detect(data_filepath, con=con)
     
     return result
 
@@ -5,20 +5,151 @@ All-in-One Fraud Detection System
 모든 탐지 모듈을 한번에 실행합니다.
 """
 
+import os
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Optional
 
 # 모듈 경로 추가
 sys.path.append(str(Path(__file__).parent))
 
 
-def run_all_detections(data_filepath: str = "problem_data_final.xlsx"):
+# ============================================================================
+# 탐지기 DAG 정의
+# ============================================================================
+
+# 이름 -> (선행 노드, 표시 아이콘, 표시 이름)
+# 'prepare'는 탐지기들이 공유하는 테이블을 모두 만드는 단계 (탐지기 동시 실행 전에 완료)
+DETECTION_DAG = {
+    'prepare': ((), '🧮', 'Shared tables (positions / watermarks / results)'),
+    'bonus': (('prepare',), '🎁', 'Bonus Laundering (증정금 녹이기)'),
+    'funding': (('prepare',), '💰', 'Funding Hunter (펀딩비 악용)'),
+    'cooperative': (('prepare',), '🤝', 'Cooperative Trading (공모거래)'),
+}
+
+# 탐지기 쓰기 범위
+# 탐지기는 조회만 하지 않고 증분 후보/워터마크/결과를 DB에 기록하므로 읽기 전용
+# 커넥션이 아닌, 공유 커넥션의 커서(= 독립 트랜잭션 + 독립 TEMP 카탈로그)를 씀.
+# DuckDB는 같은 행/같은 카탈로그 항목을 동시에 바꿀 때만 충돌하므로 각 탐지기는
+# 자기 것만 기록함:
+#   - incr_<detector>_candidates 테이블, TEMP 테이블 (커서별)
+#   - detector_watermarks / results_documents / results_generations 의 자기 키 행
+#   - results_<model>_* 테이블
+#   - funding 전용 파생 테이블 (funding_cumulative, spec_index; 없을 때만 생성)
+# 여러 탐지기가 쓰는 테이블(positions, detector_watermarks, results_documents,
+# results_generations)은 'prepare'에서 만들어 두므로, 탐지기 안의 ensure_* 호출은
+# 이미 있는 테이블에 대해 아무것도 하지 않음.
+
+
+def _current_rss_mb() -> float:
+    """현재 프로세스 RSS (MB). /proc가 없으면 ru_maxrss로 대체."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Linux: KB, macOS: bytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+class ResourceMonitor:
+    """실행 중인 노드별 최대 RSS를 샘플링 (스레드는 메모리를 공유하므로 프로세스 RSS 기준)"""
+
+    def __init__(self, interval_sec: float = 0.02):
+        self.interval_sec = interval_sec
+        self._active: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_sec):
+            rss = _current_rss_mb()
+            with self._lock:
+                for name, peak in self._active.items():
+                    if rss > peak:
+                        self._active[name] = rss
+
+    def start(self, name: str):
+        with self._lock:
+            self._active[name] = _current_rss_mb()
+
+    def stop(self, name: str) -> float:
+        rss = _current_rss_mb()
+        with self._lock:
+            return max(self._active.pop(name, rss), rss)
+
+
+def prepare_shared_tables(con) -> Dict:
+    """여러 탐지기가 공유하는 파생/상태/결과 테이블을 모두 생성 (이미 있으면 그대로)"""
+    from common.materialized import ensure_positions
+    from common.incremental import ensure_watermark_table
+    from common.results_store import ensure_results_tables
+    ensure_positions(con)
+    ensure_watermark_table(con)
+    ensure_results_tables(con)
+    count = con.execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+    return {'positions': count}
+
+
+def _run_node(name: str, data_filepath: str, base_con, incremental: bool = False) -> Dict:
+    """DAG 노드 하나 실행 (탐지기마다 공유 커넥션의 독립 커서 사용, 쓰기 범위는 위 주석 참고)"""
+    cursor = base_con.cursor()
+    try:
+        if name == 'prepare':
+            return prepare_shared_tables(cursor)
+        if name == 'bonus':
+            from wash_trading.wash_trading import DetectionConfig, run_detection as run_bonus_detection
+            return run_bonus_detection(data_filepath, DetectionConfig(incremental_mode=incremental), con=cursor)
+        if name == 'funding':
+            from funding_fee.funding_hunter import DetectionConfig, run_detection as run_funding_detection
+            return run_funding_detection(data_filepath, DetectionConfig(incremental_mode=incremental), con=cursor)
+        if name == 'cooperative':
+            from abusing.cooperative_trading import DetectionConfig, run_detection as run_coop_detection
+            return run_coop_detection(data_filepath, DetectionConfig(incremental_mode=incremental), con=cursor)
+        raise ValueError(f"Unknown detection node: {name}")
+    finally:
+        cursor.close()
+
+
+def run_all_detections(
+    data_filepath: str = "problem_data_final.xlsx",
+    workers: int = 3,
+    con=None,
+    cancel_event: Optional[threading.Event] = None,
+    incremental: bool = False,
+):
     """
     모든 탐지 모듈 실행
     
+    탐지기는 DETECTION_DAG 순서를 지키며 스레드 풀에서 동시에 실행되고,
+    각각 공유 DuckDB 커넥션의 독립 커서로 모델 테이블을 조회하고 자기
+    증분 후보/결과만 기록합니다. 공유 테이블은 'prepare' 단계에서 먼저 만듭니다.
+    
     Args:
         data_filepath: 데이터 파일 경로
+        workers: 동시에 실행할 탐지기 수 (1이면 순차 실행)
+        con: 공유 DuckDB 커넥션 (None이면 DataManager 커넥션 사용)
+        cancel_event: 설정되면 아직 시작하지 않은 탐지기는 실행하지 않음
+        incremental: True면 탐지기가 직전 실행 이후 변경된 포지션만 후보를 재계산
     """
     
     print("\n" + "="*80)
@@ -26,45 +157,77 @@ def run_all_detections(data_filepath: str = "problem_data_final.xlsx"):
     print("="*80)
     print(f"시작 시간: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"데이터 파일: {data_filepath}")
+    print(f"동시 실행 수: {workers}")
+    print(f"실행 모드: {'증분' if incremental else '전체'}")
     print("="*80 + "\n")
     
+    if con is None:
+        from common.data_manager import get_data_manager
+        dm = get_data_manager(data_filepath)
+        dm.ensure_loaded(data_filepath)
+        con = dm.get_connection(persistent=True)
+    
     results = {}
-
-    # 1. Bonus Laundering 탐지
-    print("\n" + "🎁 " + "="*76)
-    print("1/3: Bonus Laundering (증정금 녹이기) 탐지 시작...")
-    print("="*80)
-    try:
-        from wash_trading.wash_trading import run_detection as run_bonus_detection
-        results['bonus'] = run_bonus_detection(data_filepath)
-        print("✓ Bonus Laundering 탐지 완료")
-    except Exception as e:
-        print(f"✗ Bonus Laundering 탐지 실패: {e}")
-        results['bonus'] = {'error': str(e)}
-    
-    # 2. Funding Hunter 탐지
-    print("\n" + "💰 " + "="*76)
-    print("2/3: Funding Hunter (펀딩비 악용) 탐지 시작...")
-    print("="*80)
-    try:
-        from funding_fee.funding_hunter import run_detection as run_funding_detection
-        results['funding'] = run_funding_detection(data_filepath)
-        print("✓ Funding Hunter 탐지 완료")
-    except Exception as e:
-        print(f"✗ Funding Hunter 탐지 실패: {e}")
-        results['funding'] = {'error': str(e)}
-    
-    # 3. Cooperative Trading 탐지
-    print("\n" + "🤝 " + "="*76)
-    print("3/3: Cooperative Trading (공모거래) 탐지 시작...")
-    print("="*80)
-    try:
-        from abusing.cooperative_trading import run_detection as run_coop_detection
-        results['cooperative'] = run_coop_detection(data_filepath)
-        print("✓ Cooperative Trading 탐지 완료")
-    except Exception as e:
-        print(f"✗ Cooperative Trading 탐지 실패: {e}")
-        results['cooperative'] = {'error': str(e)}
+    metrics = {}
+    pending = dict(DETECTION_DAG)
+    started_at = time.perf_counter()
+    
+    with ResourceMonitor() as monitor, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        running = {}
+        
+        def _timed_node(name: str):
+            # 대기 시간을 제외하고 실제 실행 구간만 측정
+            deps, icon, label = DETECTION_DAG[name]
+            print(f"\n{icon} {label} 시작...")
+            monitor.start(name)
+            node_started = time.perf_counter()
+            try:
+                return _run_node(name, data_filepath, con, incremental)
+            finally:
+                metrics[name] = {
+                    'wall_sec': time.perf_counter() - node_started,
+                    'peak_rss_mb': monitor.stop(name),
+                }
+        
+        def _submit_ready():
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, (deps, icon, label) in list(pending.items()):
+                    if not all(d in results for d in deps):
+                        continue
+                    del pending[name]
+                    progressed = True
+                    if cancel_event is not None and cancel_event.is_set():
+                        results[name] = {'error': 'cancelled'}
+                        print(f"✗ {label} 취소됨")
+                        continue
+                    failed = [d for d in deps if 'error' in results[d]]
+                    if failed:
+                        # 선행 단계 실패 -> 실행하지 않고 실패로 기록 (후속 노드도 연쇄 처리)
+                        results[name] = {'error': f"선행 단계 실패: {', '.join(failed)}"}
+                        print(f"✗ {label} 건너뜀 (선행 단계 실패)")
+                        continue
+                    running[pool.submit(_timed_node, name)] = (name, label)
+        
+        _submit_ready()
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, label = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    print(f"✓ {label} 완료 ({metrics[name]['wall_sec']:.2f}s)")
+                except Exception as e:
+                    print(f"✗ {label} 실패: {e}")
+                    results[name] = {'error': str(e)}
+            _submit_ready()
+    
+    total_sec = time.perf_counter() - started_at
+    results.pop('prepare', None)
+    results['metrics'] = {
+        'total_wall_sec': total_sec, 'workers': workers, 'incremental': incremental, 'nodes': metrics,
+    }
     
     # 최종 요약
     print("\n" + "="*80)
@@ -111,6 +274,12 @@ def run_all_detections(data_filepath: str = "problem_data_final.xlsx"):
     else:
         print("🤝 Cooperative Trading: 실패")
     
+    # 실행 시간 / 메모리 요약
+    print("\n⏱  실행 시간 / 최대 메모리 (프로세스 RSS)")
+    for name, m in metrics.items():
+        print(f"   - {name}: {m['wall_sec']:.2f}s / {m['peak_rss_mb']:.1f}MB")
+    print(f"   - 전체: {total_sec:.2f}s (workers={workers})")
+    
     print("\n" + "="*80)
     print(f"종료 시간: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80 + "\n")
@@ -130,6 +299,19 @@ if __name__ == "__main__":
         help="데이터 파일 경로 (기본값: problem_data_final.xlsx)"
     )
     
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=3,
+        help="동시에 실행할 탐지기 수 (기본값: 3, 1이면 순차 실행)"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="직전 실행 이후 진행된 구간만 후보를 재계산 (기본값: 전체 재계산)"
+    )
+    
     args = parser.parse_args()
     
-    run_all_detections(args.data_file)
+    run_all_detections(args.data_file, workers=args.workers, incremental=args.incremental)
@@ -0,0 +1,2024 @@
+"""
+탐지 엔진 단위 테스트 스크립트
+벡터화된 엔진이 기존 행 단위 엔진과 동일한 결과를 내는지 확인
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 프로젝트 루트를 path에 추가
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from common.ip_index import IPIndex
+from common.results_store import ResultsStore
+from common.sanction_registry import SanctionRegistry
+from common.scoring import feature_frame
+from common.materialized import (
+    rebuild_funding_cumulative, refresh_funding_cumulative, rebuild_spec_index, spec_coverage_gaps,
+    rebuild_positions, refresh_positions, rebuild_first_trades, refresh_first_trades, ensure_trade_account_index,
+)
+from wash_trading.wash_trading import (
+    DetectionConfig as WashConfig, FilterEngine, ScoringEngine as WashScoringEngine,
+    NetworkAnalyzer as WashNetworkAnalyzer, NetworkNode, PairIndex, TradePair as WashTradePair,
+)
+from funding_fee.funding_hunter import (
+    DetectionConfig as FundingConfig, FundingHunterCase, ScoringEngine as FundingScoringEngine,
+    CandidateExtractor as FundingCandidateExtractor, FilterEngine as FundingFilterEngine,
+)
+from abusing.cooperative_trading import (
+    DetectionConfig as CoopConfig, TradePair as CoopTradePair, ScoringEngine as CoopScoringEngine,
+    NetworkAnalyzer as CoopNetworkAnalyzer, BandJoinEngine,
+)
+
+
+def print_section(title: str):
+    """섹션 헤더 출력"""
+    print("\n" + "=" * 80)
+    print(f"  {title}")
+    print("=" * 80)
+
+
+def _wash_candidates(n: int = 2000, seed: int = 7) -> pd.DataFrame:
+    """경계값/결측값을 섞은 증정금 녹이기 후보 쌍 생성"""
+    rng = np.random.default_rng(seed)
+    base = datetime(2025, 2, 1)
+    open_ts = [base + timedelta(minutes=int(m)) for m in rng.integers(0, 40_000, n)]
+    close_ts = [ts + timedelta(minutes=int(m)) for ts, m in zip(open_ts, rng.integers(1, 600, n))]
+    sides = np.array(['LONG', 'SHORT', 'FLAT', None], dtype=object)
+
+    df = pd.DataFrame({
+        'loser_account': [f"A{i % 97}" for i in range(n)],
+        'winner_account': [f"B{i % 89}" for i in range(n)],
+        'loser_position_id': np.arange(n),
+        'winner_position_id': np.arange(n) + n,
+        'loser_open_ts': open_ts,
+        'loser_close_ts': close_ts,
+        'winner_open_ts': open_ts,
+        'winner_close_ts': close_ts,
+        'symbol': rng.choice(['BTCUSDT', 'ETHUSDT', 'XRPUSDT'], n),
+        'loser_side': sides[rng.choice(4, n, p=[0.45, 0.45, 0.05, 0.05])],
+        'winner_side': sides[rng.choice(4, n, p=[0.45, 0.45, 0.05, 0.05])],
+        'loser_amount': rng.uniform(10, 1000, n),
+        'winner_amount': rng.uniform(10, 1000, n),
+        'loser_leverage': rng.choice([0, 5, 10, 20], n, p=[0.05, 0.4, 0.4, 0.15]).astype(float),
+        'winner_leverage': rng.choice([0, 5, 10, 20], n, p=[0.05, 0.4, 0.4, 0.15]).astype(float),
+        'loser_pnl': -rng.uniform(1, 100, n),
+        'winner_pnl': rng.uniform(1, 100, n),
+        'bonus_ts': [ts - timedelta(hours=int(h)) for ts, h in zip(open_ts, rng.integers(0, 48, n))],
+        'reward_amount': rng.uniform(10, 100, n),
+        'open_time_diff_sec': rng.choice([0.0, 15.0, 30.0, 30.5, 120.0], n),
+        'close_time_diff_sec': rng.choice([0.0, 15.0, 30.0, 30.5, 120.0], n),
+        'amount_diff_ratio': rng.choice([0.0, 0.01, 0.02, 0.021, 0.09], n),
+        'time_since_bonus_hours': rng.choice([-1.0, 0.0, 12.0, 36.0, 36.5], n),
+        'loser_deposit': 0.0,
+        'winner_deposit': 0.0,
+    })
+    # 결측값 (NaN 비교는 실패로 처리되어야 함)
+    for col in ('time_since_bonus_hours', 'open_time_diff_sec', 'amount_diff_ratio', 'loser_leverage'):
+        df.loc[rng.choice(n, 20, replace=False), col] = np.nan
+    return df
+
+
+def test_wash_filter_engine_parity():
+    """증정금 녹이기: 벡터화 필터 == 행 단위 필터 (통과 행, 실패 행 DataFrame 모두)"""
+    print_section("증정금 녹이기 FilterEngine 일치 테스트")
+
+    df = _wash_candidates()
+    engine = FilterEngine(WashConfig())
+
+    row_passed, row_failed = engine.apply_filters(df.to_dict('records'))
+    vec_passed, vec_failed = engine.apply_filters_frame(df)
+
+    assert 0 < len(row_passed) < len(df)
+    assert [p.to_dict() for p in vec_passed] == [p.to_dict() for p in row_passed]
+    assert vec_failed.equals(row_failed)
+    print(f"✓ 통과 {len(vec_passed)}건, 실패 {len(vec_failed)}건 일치")
+
+    # 비트 순서는 sql_filters() 한 곳에서 정의
+    names = engine.sql_filters().names
+    assert (engine.failure_mask(df) != 0).sum() == len(row_failed)
+    for bits, failures in zip(vec_failed['filter_failure_mask'], vec_failed['filter_failures']):
+        assert failures == [name for bit, name in enumerate(names) if bits & (1 << bit)]
+    print("✓ 실패 비트마스크 일치")
+
+    # 모두 통과하면 실패 DataFrame은 비어 있지만 컬럼은 같음
+    clean = df[engine.failure_mask(df) == 0].to_dict('records')
+    clean_passed, clean_failed = engine.apply_filters(clean)
+    assert len(clean_passed) == len(clean) and clean_failed.empty
+    assert list(clean_failed.columns) == list(vec_failed.columns)
+
+
+def test_wash_filter_pushdown():
+    """증정금 녹이기: SQL 필터(pushdown) == 벡터화 필터 == 행 단위 필터"""
+    print_section("증정금 녹이기 SQL 필터 pushdown 테스트")
+    import duckdb
+
+    df = _wash_candidates()
+    engine = FilterEngine(WashConfig())
+    filters = engine.sql_filters()
+
+    con = duckdb.connect()
+    con.register('wash_candidates', df.assign(row_no=np.arange(len(df))))
+    sql = "SELECT * FROM wash_candidates"
+
+    row_passed, row_failed = engine.apply_filters(df.to_dict('records'))
+    assert 0 < len(row_passed) < len(df)
+
+    # explain 모드: 모든 행 + SQL에서 계산한 실패 비트마스크
+    explained, total = filters.fetch(con, sql, 'row_no', explain=True)
+    assert total == len(df) and explained['candidate_idx'].tolist() == list(range(len(df)))
+    assert explained['filter_failure_mask'].tolist() == engine.failure_mask(df).tolist()
+    sql_passed, sql_failed = engine.apply_filters_pushdown(explained, total)
+    assert [p.to_dict() for p in sql_passed] == [p.to_dict() for p in row_passed]
+    for column in ('pair_id', 'filter_failures', 'filter_failure_mask'):
+        assert sql_failed[column].tolist() == row_failed[column].tolist()
+    import logging
+    from collections import Counter
+    from common.filter_pushdown import log_filter_failures
+    counts = log_filter_failures(logging.getLogger(__name__), sql_failed['filter_failures'])
+    assert counts == Counter(name for names in row_failed['filter_failures'] for name in names)
+    print(f"✓ 통과 {len(sql_passed)}건, 실패 {len(sql_failed)}건 및 실패 사유 일치")
+
+    # 기본 모드: 통과 행만 조회, pair_id는 전체 후보 기준 순번 유지
+    pushed, total = filters.fetch(con, sql, 'row_no')
+    assert total == len(df) and len(pushed) == len(row_passed)
+    passed, failed = engine.apply_filters_pushdown(pushed, total)
+    assert [p.to_dict() for p in passed] == [p.to_dict() for p in row_passed]
+    assert failed.empty
+    print(f"✓ {total}건 중 {len(pushed)}건만 조회, 통과 행 일치")
+
+    # 통과 행이 없어도 전체 후보 수는 유지
+    strict = FilterEngine(WashConfig(quantity_tolerance_pct=-1.0)).sql_filters()
+    statements = []
+
+    class CountingConnection:
+        def execute(self, query, params=None):
+            statements.append(query)
+            return con.execute(query, params)
+
+    none_passed, total = strict.fetch(CountingConnection(), sql, 'row_no')
+    assert none_passed.empty and total == len(df) and len(statements) == 1
+    assert list(none_passed.columns) == list(pushed.columns)
+    empty, total = filters.fetch(con, "SELECT * FROM wash_candidates WHERE FALSE", 'row_no', explain=True)
+    assert empty.empty and total == 0
+    print("✓ 통과 0건일 때도 한 번의 쿼리로 전체 후보 수 반환")
+
+
+def _assert_score_table(scores: pd.DataFrame, columns, label: str, expected):
+    """score_frame 결과 == 고정 기대값 표 (행마다 columns 순서의 점수 + 라벨)"""
+    values = [list(row[:-1]) for row in expected]
+    np.testing.assert_allclose(scores[list(columns)].to_numpy(dtype=float), values, rtol=0, atol=1e-9)
+    assert scores[label].tolist() == [row[-1] for row in expected]
+
+
+def _assert_scores_applied(objects, scores: pd.DataFrame, columns, label: str):
+    """score_all_*가 score_frame 결과를 객체의 score / 라벨 속성에 그대로 반영했는지 확인"""
+    for obj, row in zip(objects, scores.to_dict('records')):
+        score = obj.score.to_dict()
+        assert [score[k] for k in columns] == [row[k] for k in columns], (score, row)
+        assert getattr(obj, label).value == row[label]
+
+
+def test_wash_scoring_engine_parity():
+    """증정금 녹이기: score_frame == 구간별 고정 기대값, score_all_pairs == score_frame"""
+    print_section("증정금 녹이기 ScoringEngine 테스트")
+
+    config = WashConfig()
+    engine = WashScoringEngine(config)
+    # loser_pnl, winner_pnl, open/close 시간차, 수량 차이(%), loser 금액/레버리지/입금액, 연결 보너스
+    features = pd.DataFrame([
+        (-100, 100, 0.0, 0.2, 0.1, 1000, 10, 0, 100),
+        (-100, 95, 1.0, 1.0, 0.5, 1000, 10, 25, 100),
+        (-100, 90, 5.0, 5.0, 1.0, 600, 10, 50, 50),
+        (-100, 80, 10.0, 10.0, 1.5, 400, 10, 50, 50),
+        (-100, 50, 20.0, 20.0, 2.0, 390, 10, 50, 50),
+        (0, 0, 30.0, 30.0, 3.0, 1000, 0, 50, 50),     # PnL 0, 레버리지 0
+        (-100, 100, 0.0, 0.0, 0.0, 1000, 10, 0, 0),   # 자본 0
+    ], columns=list(engine.FEATURE_COLUMNS))
+    # pnl_mirroring, high_concurrency, quantity_match, trade_value_ratio, total, tier
+    expected = [
+        (40, 25, 20, 15, 100, 'BOT'),
+        (34, 22.5, 17, 11.25, 84.75, 'MANUAL'),
+        (26, 17.5, 13, 7.5, 64, 'SUSPICIOUS'),
+        (16, 11.25, 8, 3.75, 39, 'NORMAL'),
+        (4, 6.25, 4, 0, 14.25, 'NORMAL'),
+        (0, 2.5, 4, 0, 6.5, 'NORMAL'),
+        (40, 25, 20, 0, 85, 'MANUAL'),
+    ]
+    _assert_score_table(engine.score_frame(features), engine.SCORE_COLUMNS, 'tier', expected)
+    print(f"✓ 구간별 {len(expected)}건 점수/Tier 일치")
+
+    df = _wash_candidates().dropna().reset_index(drop=True)
+    rng = np.random.default_rng(11)
+    # P&L 대칭 구간이 고루 나오도록 winner_pnl 조정
+    df['winner_pnl'] = -df['loser_pnl'] * rng.choice([1.0, 0.97, 0.92, 0.85, 0.5, 0.0], len(df))
+    df['loser_leverage'] = df['loser_leverage'].where(rng.random(len(df)) > 0.1, 0.0)
+    df['reward_amount'] = df['loser_amount'] / rng.choice([5, 10, 20], len(df)) / rng.uniform(0.3, 1.2, len(df))
+
+    filters = FilterEngine(config)
+    pairs = [filters._create_trade_pair(f"PAIR_{i:06d}", row) for i, row in enumerate(df.to_dict('records'))]
+    scores = engine.score_frame(feature_frame(pairs, engine.FEATURE_COLUMNS))
+    engine.score_all_pairs(pairs)
+    _assert_scores_applied(pairs, scores, engine.SCORE_COLUMNS, 'tier')
+    assert len({pair.tier for pair in pairs}) == 4
+    print(f"✓ {len(pairs)}건 점수/Tier 객체 반영")
+
+
+def _wash_network(edges, max_depth: int = 5) -> WashNetworkAnalyzer:
+    """winner -> loser 간선 목록으로 수익 네트워크 구성"""
+    analyzer = WashNetworkAnalyzer(WashConfig(max_network_depth=max_depth))
+    for i, (winner, loser) in enumerate(edges):
+        analyzer.profit_network.setdefault(winner, NetworkNode(account_id=winner))
+        analyzer.profit_network[winner].add_profit_link(loser, 1.0, f"PAIR_{i:06d}")
+    return analyzer
+
+
+def test_wash_bonus_asof(tmp_path):
+    """증정금 녹이기: 손실 거래는 직전 보너스 하나에만 연결, 보너스 경과 시간 창 밖은 후보 제외"""
+    print_section("증정금 녹이기 보너스 ASOF 테스트")
+    import duckdb
+    from wash_trading.wash_trading import BonusLaunderingDetector
+
+    detector = BonusLaunderingDetector(WashConfig(time_since_bonus_hours=72.0, output_dir=str(tmp_path)))
+    con = duckdb.connect()
+    con.execute("""
+        CREATE TABLE wash_positions AS SELECT * FROM (VALUES
+            ('L1', 'P1', TIMESTAMP '2025-02-10 12:00', TIMESTAMP '2025-02-10 12:30', 'AAA', 'LONG', 1000.0, 10, -50.0),
+            ('W1', 'P2', TIMESTAMP '2025-02-10 12:01', TIMESTAMP '2025-02-10 12:31', 'AAA', 'SHORT', 1000.0, 10, 50.0),
+            ('L2', 'P3', TIMESTAMP '2025-02-10 12:00', TIMESTAMP '2025-02-10 12:30', 'AAA', 'LONG', 1000.0, 10, -50.0),
+            ('L3', 'P4', TIMESTAMP '2025-02-10 12:00', TIMESTAMP '2025-02-10 12:30', 'AAA', 'LONG', 1000.0, 10, -50.0)
+        ) t(account_id, position_id, open_ts, close_ts, symbol, side, amount, leverage, pnl)
+    """)
+    con.execute("""
+        CREATE TABLE wash_bonuses AS SELECT * FROM (VALUES
+            ('L1', TIMESTAMP '2025-02-01 00:00', 300.0),  -- 창 밖
+            ('L1', TIMESTAMP '2025-02-09 00:00', 100.0),
+            ('L1', TIMESTAMP '2025-02-10 06:00', 200.0),  -- 직전 보너스
+            ('L1', TIMESTAMP '2025-02-10 13:00', 900.0),  -- 거래 이후
+            ('L2', TIMESTAMP '2025-02-01 00:00', 100.0),  -- 직전 보너스가 창 밖 -> 후보 없음
+            ('L3', TIMESTAMP '2025-02-10 00:00', 50.0),
+            ('L3', TIMESTAMP '2025-02-10 00:00', 70.0)    -- 같은 시각이면 큰 금액
+        ) t(account_id, bonus_ts, reward_amount)
+    """)
+    sql = detector._candidate_pairs_sql('wash_positions', 'wash_bonuses')
+    assert '72' not in sql  # 창 길이는 $time_since_bonus_hours로 바인딩
+    rows = con.execute(sql + " ORDER BY loser_account", detector._candidate_params()).fetchall()
+    columns = [d[0] for d in con.description]
+    linked = [(r['loser_account'], r['winner_account'], r['reward_amount'], r['time_since_bonus_hours'])
+              for r in (dict(zip(columns, row)) for row in rows)]
+    assert linked == [('L1', 'W1', 200.0, 6.0), ('L3', 'W1', 70.0, 12.0)]
+    print("✓ 직전 보너스 연결/창 밖 제외/동시각 보너스 처리 일치")
+
+
+def test_wash_network_chains():
+    """증정금 녹이기: 시작 그룹마다 최장 체인 1개 (DAG는 전수 탐색 최장 경로, 순환 그룹도 실제 간선 경로)"""
+    print_section("증정금 녹이기 NetworkAnalyzer 체인 테스트")
+
+    rng = np.random.default_rng(21)
+    for trial in range(30):
+        # 번호가 작은 계정 -> 큰 계정 간선만 있는 DAG
+        n = int(rng.integers(5, 30))
+        edges = [(f"A{a:02d}", f"A{b:02d}") for a, b in rng.integers(0, n, size=(2 * n, 2)) if a < b]
+        max_depth = int(rng.integers(2, 8))
+        analyzer = _wash_network(edges, max_depth)
+        network = analyzer.profit_network
+        chains = analyzer.find_longest_chains_per_source()
+
+        # 기대값: 전수 탐색 최장 경로 (winner인 계정만 체인에 포함)
+        def longest(acc):
+            tails = [longest(l) for l in network[acc].connected_losers if l in network]
+            return 1 + max(tails, default=0)
+
+        has_incoming = {l for node in network.values() for l in node.connected_losers if l in network}
+        starts = [acc for acc in network if acc not in has_incoming and min(longest(acc), max_depth) >= 2]
+        assert [chain[0] for chain in chains] == starts
+        for chain in chains:
+            assert len(chain) == min(longest(chain[0]), max_depth)
+            assert all(b in network[a].connected_losers for a, b in zip(chain, chain[1:]))
+
+    # 순환 그룹 안에서도 연속한 두 계정은 실제 간선 (정렬 순서 A, B, C는 경로가 아님)
+    analyzer = _wash_network([('S', 'A'), ('A', 'C'), ('C', 'B'), ('B', 'A'), ('B', 'D'), ('D', 'X')])
+    chains = analyzer.find_longest_chains_per_source()
+    assert chains == [['S', 'A', 'C', 'B', 'D']]
+    chains = _wash_network([('S', 'A'), ('A', 'C'), ('C', 'B'), ('B', 'A'), ('B', 'D')], max_depth=3)\
+        .find_longest_chains_per_source()
+    assert chains == [['S', 'A', 'C']]
+
+    # 임의 순환 그래프: 실제 간선 경로, 계정 중복 없음, 깊이 제한, 시작 요소마다 체인 1개
+    for trial in range(30):
+        n = int(rng.integers(4, 9))
+        edges = [(f"A{a}", f"A{b}") for a, b in rng.integers(0, n, size=(2 * n, 2)) if a != b]
+        max_depth = int(rng.integers(2, 7))
+        analyzer = _wash_network(edges, max_depth)
+        network = analyzer.profit_network
+        chains = analyzer.find_longest_chains_per_source()
+
+        def longest_simple(acc, path):
+            tails = [longest_simple(l, path | {l}) for l in network[acc].connected_losers
+                     if l in network and l not in path]
+            return 1 + max(tails, default=0)
+
+        reach = {acc: {acc} for acc in network}
+        for _ in network:
+            for acc in network:
+                for l in network[acc].connected_losers:
+                    if l in network:
+                        reach[acc] |= reach[l]
+        sources = [acc for acc in network if all(acc not in reach[b] or b in reach[acc] for b in network)]
+        starts_seen = set()
+        for chain in chains:
+            assert all(b in network[a].connected_losers for a, b in zip(chain, chain[1:])), chain
+            assert len(set(chain)) == len(chain) and 2 <= len(chain) <= max_depth
+            assert len(chain) <= longest_simple(chain[0], {chain[0]})
+            assert chain[0] in sources
+            group = frozenset(b for b in sources if chain[0] in reach[b] and b in reach[chain[0]])
+            assert group not in starts_seen
+            starts_seen.add(group)
+    print("✓ 최장 체인/깊이 제한/순환 그룹 경로 일치")
+
+
+def test_wash_pair_index():
+    """증정금 녹이기: PairIndex 조회 == 거래 쌍 전체 스캔 (평균 점수, 체인 거래 쌍)"""
+    print_section("증정금 녹이기 PairIndex 테스트")
+
+    rng = np.random.default_rng(37)
+    ts = datetime(2025, 2, 1)
+    pairs = []
+    for i in range(600):
+        winner, loser = (f"A{a:02d}" for a in rng.integers(0, 40, 2))
+        pair = WashTradePair(
+            pair_id=f"PAIR_{i:06d}", loser_account=loser, winner_account=winner, symbol='AAAUSDT.PERP',
+            loser_open_ts=ts, loser_close_ts=ts, winner_open_ts=ts, winner_close_ts=ts, bonus_ts=ts,
+            loser_side='LONG', winner_side='SHORT', loser_amount=1.0, winner_amount=1.0,
+            loser_leverage=1, winner_leverage=1, loser_pnl=-1.0, winner_pnl=1.0, linked_bonus=10.0,
+        )
+        pair.score.total = float(rng.uniform(0, 100))
+        pairs.append(pair)
+    index = PairIndex(pairs)
+
+    for _ in range(50):
+        # 기대값: 기존 방식 (목록 membership / 전체 스캔)
+        pair_ids = [f"PAIR_{i:06d}" for i in rng.integers(0, 700, int(rng.integers(0, 30)))]
+        scores = [p.score.total for p in pairs if p.pair_id in pair_ids]
+        assert index.avg_score(index.rows_for_pairs(pair_ids)) == (sum(scores) / len(scores) if scores else 0.0)
+
+        chain = [f"A{a:02d}" for a in rng.integers(0, 45, int(rng.integers(2, 6)))]
+        expected = [p.pair_id for p in pairs if p.winner_account in set(chain) or p.loser_account in set(chain)]
+        assert [index.pair_ids[i] for i in index.rows_for_accounts(chain).tolist()] == expected
+    assert index.avg_score(index.rows_for_accounts(['NONE'])) == 0.0
+    print("✓ 평균 점수/체인 거래 쌍 일치")
+
+
+def test_funding_scoring_engine_parity():
+    """펀딩비 헌터: score_frame == 구간별 고정 기대값, score_all_cases == score_frame"""
+    print_section("펀딩비 헌터 ScoringEngine 테스트")
+
+    engine = FundingScoringEngine(FundingConfig())
+    # window_funding, holding_minutes, leverage, amount_ratio
+    features = pd.DataFrame([
+        (1000, 5, 20, 0.8),
+        (500, 10, 15, 0.6),
+        (200, 15, 10, 0.5),
+        (100, 20, 5, 0.3),
+        (50, 7.5, 50, 0.59),
+        (49.9, 20, 9, 0.49),
+    ], columns=list(engine.FEATURE_COLUMNS))
+    # funding_profit, short_holding, high_leverage, large_position, total, severity
+    expected = [
+        (40, 25, 20, 15, 100, 'CRITICAL'),
+        (34, 20, 16, 11.25, 81.25, 'HIGH'),
+        (26, 15, 12, 7.5, 60.5, 'MEDIUM'),
+        (18, 8.75, 7, 3.75, 37.5, 'LOW'),
+        (10, 20, 20, 7.5, 57.5, 'MEDIUM'),
+        (4, 8.75, 7, 3.75, 23.5, 'LOW'),
+    ]
+    _assert_score_table(engine.score_frame(features), engine.SCORE_COLUMNS, 'severity', expected)
+    print(f"✓ 구간별 {len(expected)}건 점수/심각도 일치")
+
+    rng = np.random.default_rng(3)
+    base = datetime(2025, 2, 1)
+    cases = [
+        FundingHunterCase(
+            case_id=f"FH_{i:06d}", account_id=f"A{i % 50}", position_id=str(i),
+            symbol='BTCUSDT', side='LONG', leverage=int(rng.choice([5, 10, 15, 20, 50])),
+            amount=float(rng.uniform(100, 10_000)),
+            open_ts=base, closing_ts=base + timedelta(minutes=20),
+            holding_minutes=float(rng.choice([1, 5, 7.5, 10, 15, 20])),
+            fund_period_hr=8, closing_hour=0, account_total_funding=0.0,
+            window_funding=float(rng.choice([10, 50, 99.9, 100, 200, 500, 1000, 5000])),
+            max_order_amount=10_000.0, amount_ratio=float(rng.choice([0.3, 0.5, 0.59, 0.6, 0.8, 1.0])),
+        )
+        for i in range(2000)
+    ]
+
+    engine = FundingScoringEngine(FundingConfig())
+    scores = engine.score_frame(feature_frame(cases, engine.FEATURE_COLUMNS))
+    engine.score_all_cases(cases)
+    _assert_scores_applied(cases, scores, engine.SCORE_COLUMNS, 'severity')
+    print(f"✓ {len(cases)}건 점수/심각도 객체 반영")
+
+
+def test_funding_filter_pushdown():
+    """펀딩비 헌터: SQL 필터(pushdown) == 행 단위 필터"""
+    print_section("펀딩비 헌터 SQL 필터 pushdown 테스트")
+    import duckdb
+
+    rng = np.random.default_rng(11)
+    n = 1000
+    base = datetime(2025, 2, 1)
+    open_ts = [base + timedelta(minutes=int(m)) for m in rng.integers(0, 10_000, n)]
+    df = pd.DataFrame({
+        'account_id': [f"A{i % 37}" for i in range(n)],
+        'position_id': [str(i) for i in range(n)],
+        'symbol': 'BTCUSDT',
+        'side': 'LONG',
+        'open_ts': open_ts,
+        'closing_ts': [ts + timedelta(minutes=int(m)) for ts, m in zip(open_ts, rng.integers(1, 60, n))],
+        'leverage': rng.choice([1, 4, 5, 20], n),
+        'amount': rng.uniform(100, 10_000, n),
+        'account_total_funding': rng.uniform(0, 1000, n),
+        'window_funding': rng.choice([1.0, 5.0, 50.0], n),
+        'holding_minutes': rng.choice([5.0, 19.9, 20.0, 20.1, 45.0], n),
+        'fund_period_hr': 8,
+        'max_order_amount': 10_000.0,
+        'closing_hour': rng.choice([0, 8, 16], n),
+        'opening_hour': rng.choice([0, 7, 8, 15], n),
+        'amount_ratio': rng.choice([0.1, 0.3, 0.29, 0.8], n),
+    })
+    order_by = "window_funding DESC, holding_minutes ASC, position_id"
+    df = df.sort_values(['window_funding', 'holding_minutes', 'position_id'],
+                        ascending=[False, True, True]).reset_index(drop=True)
+    df.loc[rng.choice(n, 20, replace=False), 'amount_ratio'] = None
+
+    con = duckdb.connect()
+    con.register('funding_candidates', df)
+    sql = "SELECT * FROM funding_candidates"
+
+    for config in (FundingConfig(), FundingConfig(require_hour_change=False, min_leverage=1)):
+        engine = FundingFilterEngine(config)
+        filters = engine.sql_filters()
+        row_passed, row_table, row_failed = engine.apply_filters(df.to_dict('records'))
+        assert 0 < len(row_passed) < n
+        assert row_table['case_id'].tolist() == [c.case_id for c in row_passed]
+        assert row_table.columns.tolist() == ['case_id'] + df.columns.tolist()
+
+        explained, total = filters.fetch(con, sql, order_by, explain=True)
+        sql_passed, sql_table, sql_failed = engine.apply_filters_pushdown(explained, total, filters)
+        assert total == n
+        assert [c.to_dict() for c in sql_passed] == [c.to_dict() for c in row_passed]
+        pd.testing.assert_frame_equal(sql_table, row_table, check_dtype=False)
+        assert [(r['case_id'], r['filter_failures']) for r in sql_failed] == \
+            [(r['case_id'], r['filter_failures']) for r in row_failed]
+
+        pushed, total = filters.fetch(con, sql, order_by)
+        passed, table, failed = engine.apply_filters_pushdown(pushed, total, filters)
+        assert len(pushed) == len(row_passed) and not failed
+        assert [c.to_dict() for c in passed] == [c.to_dict() for c in row_passed]
+        pd.testing.assert_frame_equal(table, row_table, check_dtype=False)
+        print(f"✓ require_hour_change={config.require_hour_change}: {total}건 중 {len(pushed)}건 통과 일치")
+
+
+def test_funding_account_rollup():
+    """펀딩비 헌터: analyze_accounts(케이스 테이블 + score_frame groupby 집계) == 케이스 단위 누적 계산"""
+    print_section("펀딩비 헌터 AccountAnalyzer 집계 테스트")
+    from funding_fee.funding_hunter import AccountAnalyzer, AccountSummary
+
+    rng = np.random.default_rng(41)
+    n = 1500
+    case_table = pd.DataFrame({
+        'case_id': [f"FUND_{i:06d}" for i in range(n)],
+        'account_id': [f"A{i}" for i in rng.integers(0, 80, n)],
+        'leverage': rng.choice([5, 10, 20], n),
+        'holding_minutes': rng.choice([5.0, 10.0, 20.0], n),
+        'account_total_funding': rng.choice([-50.0, 0.0, 120.5, 3000.0], n),
+        'window_funding': rng.uniform(-100, 5000, n),
+        'amount_ratio': rng.choice([0.3, 0.5, 0.9], n),
+    })
+    scores = FundingScoringEngine(FundingConfig()).score_frame(case_table)
+
+    # 기대값: 케이스 단위 누적 (기존 방식)
+    expected = {}
+    for case, score, severity in zip(case_table.to_dict('records'), scores['total'], scores['severity']):
+        s = expected.setdefault(case['account_id'], {
+            'total_cases': 0, 'total_funding_profit': 0.0, 'account_total_funding': 0.0,
+            'scores': [], 'critical_count': 0, 'high_count': 0, 'case_ids': [],
+        })
+        s['total_cases'] += 1
+        s['total_funding_profit'] += case['window_funding']
+        s['account_total_funding'] = max(s['account_total_funding'], case['account_total_funding'])
+        s['scores'].append(score)
+        s['critical_count'] += severity == 'CRITICAL'
+        s['high_count'] += severity == 'HIGH'
+        s['case_ids'].append(case['case_id'])
+
+    frame = AccountAnalyzer(FundingConfig()).analyze_accounts(case_table, scores)
+    assert frame.columns.tolist() == AccountAnalyzer.SUMMARY_COLUMNS
+    summaries = {r['account_id']: AccountSummary(**r) for r in frame.to_dict('records')}
+    assert list(summaries) == list(expected)  # 계정 첫 등장 순서
+    for account_id, s in expected.items():
+        summary = summaries[account_id]
+        assert summary.total_cases == s['total_cases'] and summary.case_ids == s['case_ids']
+        assert summary.critical_count == s['critical_count'] and summary.high_count == s['high_count']
+        assert summary.account_total_funding == s['account_total_funding']
+        assert summary.max_score == max(s['scores'])
+        assert np.isclose(summary.total_funding_profit, s['total_funding_profit'], rtol=1e-12)
+        assert np.isclose(summary.avg_score, sum(s['scores']) / len(s['scores']), rtol=1e-12)
+        assert isinstance(summary.total_cases, int) and isinstance(summary.case_ids, list)
+    empty = AccountAnalyzer(FundingConfig()).analyze_accounts(case_table.iloc[:0], scores.iloc[:0])
+    assert empty.empty and empty.columns.tolist() == AccountAnalyzer.SUMMARY_COLUMNS
+    print(f"✓ {len(summaries)}개 계정 요약 일치")
+
+
+def test_coop_scoring_engine_parity():
+    """공모거래: score_frame == 구간별 고정 기대값, score_all_pairs == score_frame"""
+    print_section("공모거래 ScoringEngine 테스트")
+
+    # A{k}/B{k}가 함께 쓴 IP 수: 5, 3, 2, 1, 0
+    shared_ips = pd.DataFrame(
+        [(account, f"10.{k}.0.{j}") for k, n in enumerate([5, 3, 2, 1], start=1) for j in range(n)
+         for account in (f"A{k}", f"B{k}")] + [('A5', '10.9.0.1'), ('B5', '10.9.0.2')],
+        columns=['account_id', 'ip'],
+    )
+    engine = CoopScoringEngine(CoopConfig(), IPIndex(shared_ips))
+    t = lambda sec: pd.Timestamp(2025, 2, 1) + pd.Timedelta(seconds=sec)
+    # 계정 쌍, rpnl1/2, open/close 시간차, 포지션1 [0s, 100s] vs 포지션2
+    features = pd.DataFrame([
+        ('A1', 'B1', 100, 0, 5, 5, t(0), t(0), t(100), t(100)),
+        ('A2', 'B2', 100, -40, 15, 15, t(0), t(30), t(100), t(130)),
+        ('A3', 'B3', 100, -60, 30, 30, t(0), t(50), t(100), t(150)),
+        ('A4', 'B4', 100, -80, 60, 60, t(0), t(60), t(100), t(160)),
+        ('A5', 'B5', 100, -100, 120, 120, t(0), t(100), t(100), t(200)),  # 겹침 없음
+        ('A1', 'B1', 0, 0, 0, 0, t(0), t(50), t(100), t(50)),             # PnL 0, 보유 시간 0
+    ], columns=list(engine.FEATURE_COLUMNS))
+    # pnl_asymmetry, time_proximity, ip_sharing, position_overlap, total, risk_level
+    expected = [
+        (35, 25, 25, 15, 100, 'CRITICAL'),
+        (26.25, 20, 20, 11.25, 77.5, 'HIGH'),
+        (17.5, 15, 15, 7.5, 55, 'MEDIUM'),
+        (8.75, 10, 10, 3.75, 32.5, 'LOW'),
+        (0, 5, 0, 0, 5, 'LOW'),
+        (0, 25, 25, 0, 50, 'MEDIUM'),
+    ]
+    _assert_score_table(engine.score_frame(features), engine.SCORE_COLUMNS, 'risk_level', expected)
+    print(f"✓ 구간별 {len(expected)}건 점수/위험도 일치")
+
+    rng = np.random.default_rng(5)
+    accounts = [f"A{i}" for i in range(40)]
+    ip_data = pd.DataFrame({
+        'account_id': rng.choice(accounts, 400),
+        'ip': [f"10.0.0.{i}" for i in rng.integers(0, 12, 400)],
+    })
+    base = pd.Timestamp(2025, 2, 1)
+    pairs = []
+    for i in range(2000):
+        open1 = base + pd.Timedelta(seconds=int(rng.integers(0, 86_400)))
+        open2 = open1 + pd.Timedelta(seconds=int(rng.integers(0, 120)))
+        close1 = open1 + pd.Timedelta(seconds=int(rng.choice([0, 60, 600, 3600])))
+        close2 = open2 + pd.Timedelta(seconds=int(rng.choice([0, 60, 600, 3600])))
+        rpnl1 = float(rng.uniform(-100, 100))
+        rpnl2 = float(rng.choice([-rpnl1, -0.5 * rpnl1, rpnl1, 0.0]))
+        pairs.append(CoopTradePair(
+            pair_id=f"COOP_{i:06d}", account_id1=str(rng.choice(accounts)), account_id2=str(rng.choice(accounts + ['NO_IP'])),
+            symbol='BTCUSDT', side1='LONG', side2='LONG',
+            open_ts1=open1, open_ts2=open2, closing_ts1=close1, closing_ts2=close2,
+            open_time_diff_sec=float((open2 - open1).total_seconds()),
+            close_time_diff_sec=float(abs((close2 - close1).total_seconds())),
+            amount1=100.0, amount2=100.0, leverage=10, position_id1=str(i), position_id2=str(i + 2000),
+            rpnl1=rpnl1, rpnl2=rpnl2, total_pnl=rpnl1 + rpnl2, pnl_winner='', pnl_loser='',
+        ))
+
+    engine = CoopScoringEngine(CoopConfig(), IPIndex(ip_data))
+    scores = engine.score_frame(feature_frame(pairs, engine.FEATURE_COLUMNS))
+    engine.score_all_pairs(pairs)
+    _assert_scores_applied(pairs, scores, engine.SCORE_COLUMNS, 'risk_level')
+    print(f"✓ {len(pairs)}건 점수/위험도 객체 반영")
+
+
+def test_coop_find_groups_components():
+    """공모거래: find_groups 그룹 == 계정 그래프 연결 요소"""
+    print_section("공모거래 NetworkAnalyzer 그룹 테스트")
+
+    rng = np.random.default_rng(9)
+    ts = pd.Timestamp(2025, 2, 1)
+    pairs = [
+        CoopTradePair(
+            pair_id=f"COOP_{i:06d}", account_id1=f"A{a}", account_id2=f"A{b}",
+            symbol='BTCUSDT', side1='LONG', side2='LONG',
+            open_ts1=ts, open_ts2=ts, closing_ts1=ts, closing_ts2=ts,
+            open_time_diff_sec=0.0, close_time_diff_sec=0.0,
+            amount1=100.0, amount2=100.0, leverage=10, position_id1=f"P{i}", position_id2=f"Q{i}",
+            rpnl1=float(rng.uniform(-10, 10)), rpnl2=float(rng.uniform(-10, 10)),
+            total_pnl=0.0, pnl_winner='', pnl_loser='',
+        )
+        for i, (a, b) in enumerate(rng.integers(0, 300, size=(400, 2)))
+        if a != b
+    ]
+    ip_data = pd.DataFrame({'account_id': [f"A{i % 300}" for i in range(600)], 'ip': [f"ip{i % 97}" for i in range(600)]})
+
+    # 기대값: 인접 리스트 BFS로 계산한 연결 요소
+    adjacency = {}
+    for pair in pairs:
+        adjacency.setdefault(pair.account_id1, set()).add(pair.account_id2)
+        adjacency.setdefault(pair.account_id2, set()).add(pair.account_id1)
+    expected, seen = {}, set()
+    for start in adjacency:
+        if start in seen:
+            continue
+        component, queue = set(), [start]
+        while queue:
+            node = queue.pop()
+            if node not in component:
+                component.add(node)
+                queue.extend(adjacency[node] - component)
+        seen |= component
+        expected[frozenset(component)] = [p.pair_id for p in pairs if p.account_id1 in component]
+
+    config = CoopConfig()
+    groups = CoopNetworkAnalyzer(config, IPIndex(ip_data)).find_groups(pairs)
+    expected = {k: v for k, v in expected.items() if len(k) >= config.min_group_size}
+
+    assert {frozenset(g.members): g.trade_pair_ids for g in groups} == expected
+    assert all(g.members == sorted(g.members) for g in groups)
+    print(f"✓ {len(groups)}개 그룹 일치")
+
+
+def test_coop_band_join_parity():
+    """공모거래: band join == 기존 SQL 자기 조인 (SELECT DISTINCT)"""
+    print_section("공모거래 BandJoinEngine 일치 테스트")
+    import duckdb
+
+    rng = np.random.default_rng(17)
+    n = 3000
+    open_ts = pd.Timestamp(2025, 2, 1) + pd.to_timedelta(rng.integers(0, 6 * 3600, n) // 30 * 30, unit='s')
+    positions = pd.DataFrame({
+        'account_id': [f"A{i}" for i in rng.integers(0, 40, n)],
+        'position_id': [f"P{i}" for i in range(n)],
+        'leverage': rng.choice([5.0, 10.0, 20.0], n),
+        'open_ts': open_ts,
+        'closing_ts': open_ts + pd.to_timedelta(rng.integers(0, 900, n), unit='s'),
+        'symbol': rng.choice(['AAAUSDT.PERP', 'BBBUSDT.PERP', 'CCCUSDT.PERP'], n),
+        'side': rng.choice(['LONG', 'SHORT'], n),
+        'amount': rng.uniform(10, 1000, n),
+        'rpnl': rng.normal(0, 50, n),
+    })
+    config = CoopConfig()
+    x, y = config.max_open_time_diff_min * 60, config.max_close_time_diff_min * 60
+    watermark = pd.Timestamp(2025, 2, 1, 4)
+
+    con = duckdb.connect()
+    con.register('position', positions)
+    reference_sql = f"""
+        SELECT DISTINCT
+            t1.account_id AS account_id1, t2.account_id AS account_id2, t1.symbol,
+            t1.open_ts AS open_ts1, t2.open_ts AS open_ts2, t1.closing_ts AS closing_ts1, t2.closing_ts AS closing_ts2,
+            t1.leverage, t1.amount AS amount1, t2.amount AS amount2,
+            t1.position_id AS position_id1, t2.position_id AS position_id2,
+            t1.side AS side1, t2.side AS side2, t1.rpnl AS rpnl1, t2.rpnl AS rpnl2,
+            ABS(epoch(t1.open_ts) - epoch(t2.open_ts)) AS open_time_diff_sec,
+            ABS(epoch(t1.closing_ts) - epoch(t2.closing_ts)) AS close_time_diff_sec
+        FROM position t1
+        INNER JOIN position t2 ON
+            t1.symbol = t2.symbol
+            AND ABS(epoch(t1.open_ts) - epoch(t2.open_ts)) <= {x}
+            AND ABS(epoch(t1.closing_ts) - epoch(t2.closing_ts)) <= {y}
+            AND t1.open_ts < t2.open_ts
+            AND GREATEST(t1.open_ts, t2.open_ts) < LEAST(t1.closing_ts, t2.closing_ts)
+            AND t1.account_id != t2.account_id
+            AND t1.side = t2.side
+            {{pair_filter}}
+        ORDER BY symbol, open_ts1, open_ts2, position_id1, position_id2
+    """
+    engine = BandJoinEngine(config)
+    engine.CHUNK_PAIRS = 500  # 구간 분할 경로도 검증
+    for changed_after, pair_filter in (
+        (None, ""),
+        (watermark, f"AND (t1.closing_ts > TIMESTAMP '{watermark}' OR t2.closing_ts > TIMESTAMP '{watermark}')"),
+    ):
+        expected = con.execute(reference_sql.format(pair_filter=pair_filter)).fetchdf()
+        actual = engine.join(positions.sample(frac=1, random_state=1), changed_after=changed_after)
+        actual = actual.sort_values(['symbol', 'open_ts1', 'open_ts2', 'position_id1', 'position_id2']).reset_index(drop=True)
+        assert len(expected) > 0
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        assert actual[['position_id1', 'position_id2']].duplicated().sum() == 0
+        print(f"✓ 후보 쌍 {len(actual)}건 일치 (changed_after={changed_after})")
+
+
+def test_funding_cumulative_window():
+    """펀딩비: 누적합 ASOF 구간 합 == 포지션별 Funding 스캔 (LATERAL), 증분 갱신 == 재생성"""
+    print_section("펀딩비 누적합 구간 테스트")
+    import duckdb
+
+    rng = np.random.default_rng(23)
+    start = pd.Timestamp(2025, 2, 1)
+    n_funding, n_positions = 4000, 1500
+    # 정각 단위 ts -> 같은 ts 중복, 포지션 경계와 일치하는 펀딩 기록 포함
+    funding = pd.DataFrame({
+        'ts': start + pd.to_timedelta(rng.integers(0, 24 * 20, n_funding), unit='h'),
+        'account_id': [f"A{i}" for i in rng.integers(0, 50, n_funding)],
+        'symbol': 'AAAUSDT.PERP',
+        'funding_fee': np.round(rng.normal(-1, 3, n_funding), 2),
+    })
+    open_ts = start + pd.to_timedelta(rng.integers(0, 24 * 20, n_positions), unit='h')
+    close_ts = open_ts + pd.to_timedelta(rng.integers(0, 48, n_positions), unit='h')
+    positions = pd.DataFrame({
+        'account_id': [f"A{i}" for i in rng.integers(0, 60, n_positions)],
+        'position_id': [f"P{i}" for i in range(n_positions)],
+        'open_ts': open_ts,
+        'close_ts': close_ts,
+        'amount': rng.uniform(10, 1000, n_positions),
+        'leverage': 10.0,
+        'side': 'LONG',
+        'symbol': 'AAAUSDT.PERP',
+        'closing_day': close_ts.normalize().date,
+    })
+    days = pd.date_range(start, periods=25, freq='D').date
+    spec = pd.DataFrame({'symbol': 'AAAUSDT.PERP', 'funding_interval': 1, 'max_order_amount': 1000.0, 'day': days})
+
+    con = duckdb.connect()
+    for name, df in (('positions', positions), ('Spec', spec)):
+        con.register(f"{name}_df", df)
+        con.execute(f'CREATE TABLE "{name}" AS SELECT * FROM "{name}_df"')
+    cutoff = start + pd.Timedelta(days=9, hours=5)
+    con.register('funding_df', funding)
+    con.execute("CREATE TABLE Funding AS SELECT * FROM funding_df WHERE ts <= ?", [cutoff.to_pydatetime()])
+
+    # 시뮬레이션 진행처럼 뒤쪽 Funding 행을 추가하고 누적합을 이어붙임
+    rebuild_funding_cumulative(con)
+    con.execute("INSERT INTO Funding SELECT * FROM funding_df WHERE ts > ?", [cutoff.to_pydatetime()])
+    appended = refresh_funding_cumulative(con, cutoff.to_pydatetime(), None)
+    refreshed = con.execute("SELECT * FROM funding_cumulative ORDER BY account_id, ts").fetchdf()
+    assert appended > 0
+    assert rebuild_funding_cumulative(con) == len(refreshed)
+    rebuilt = con.execute("SELECT * FROM funding_cumulative ORDER BY account_id, ts").fetchdf()
+    pd.testing.assert_frame_equal(refreshed, rebuilt)
+    print(f"✓ 증분 갱신 {appended}행 == 전체 재생성")
+
+    expected = con.execute("""
+        SELECT p.account_id, p.position_id, fw.window_funding, fa.account_total_funding
+        FROM positions p
+        LEFT JOIN (
+            SELECT account_id, -SUM(funding_fee) AS account_total_funding FROM Funding GROUP BY account_id
+        ) fa ON p.account_id = fa.account_id
+        LEFT JOIN LATERAL (
+            SELECT SUM(-funding_fee) AS window_funding
+            FROM Funding f
+            WHERE f.account_id = p.account_id AND f.ts >= p.open_ts AND f.ts <= p.close_ts
+        ) fw ON TRUE
+        WHERE fw.window_funding > 0
+        ORDER BY p.position_id
+    """).fetchdf()
+    actual = pd.DataFrame(FundingCandidateExtractor(con).extract_candidates())
+    actual = actual.sort_values('position_id').reset_index(drop=True)[list(expected.columns)]
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    print(f"✓ 후보 {len(actual)}건 구간 펀딩비 일치")
+
+
+def test_materialized_refresh():
+    """positions/첫 거래/펀딩 누적합: 여러 번 진행하며 증분 갱신 == 재생성 (순서 역전 시 재생성 폴백 포함)"""
+    print_section("머티리얼라이즈드 테이블 증분 갱신 테스트")
+    import duckdb
+
+    rng = np.random.default_rng(37)
+    start = pd.Timestamp(2025, 2, 1)
+    n_positions = 400
+    # 포지션마다 2~4개 거래 (OPEN 후 CLOSE), 진행 경계를 넘나드는 포지션 다수
+    rows = []
+    for i in range(n_positions):
+        opened = start + pd.Timedelta(minutes=int(rng.integers(0, 24 * 60 * 28)))
+        account, symbol = f"A{rng.integers(0, 30)}", f"S{rng.integers(0, 5)}USDT.PERP"
+        side = ['LONG', 'SHORT'][int(rng.integers(0, 2))]
+        for k in range(int(rng.integers(2, 5))):
+            rows.append({
+                'ts': opened + pd.Timedelta(hours=int(rng.integers(0, 72)) * k),
+                'account_id': account, 'position_id': f"P{i}", 'symbol': symbol, 'side': side,
+                'openclose': 'OPEN' if k == 0 else 'CLOSE',
+                'amount': float(rng.integers(10, 1000)), 'leverage': float(rng.integers(1, 20)),
+            })
+    trades = pd.DataFrame(rows).sort_values('ts', kind='stable').reset_index(drop=True)
+    funding = pd.DataFrame({
+        'ts': start + pd.to_timedelta(rng.integers(0, 24 * 32, 3000), unit='h'),
+        'account_id': [f"A{i}" for i in rng.integers(0, 30, 3000)],
+        'symbol': 'S0USDT.PERP',
+        'funding_fee': np.round(rng.normal(-1, 3, 3000), 2),
+    })
+
+    con = duckdb.connect()
+    con.register('trades_df', trades)
+    con.register('funding_df', funding)
+    cutoffs = [start + pd.Timedelta(days=d) for d in (7, 12, 20, 40)]
+    con.execute("CREATE TABLE Trade AS SELECT * FROM trades_df WHERE ts <= ?", [cutoffs[0]])
+    con.execute("CREATE TABLE Funding AS SELECT * FROM funding_df WHERE ts <= ?", [cutoffs[0]])
+    rebuild_positions(con)
+    rebuild_first_trades(con)
+    rebuild_funding_cumulative(con)
+
+    tables = {
+        'positions': (refresh_positions, rebuild_positions, 'account_id, position_id'),
+        'account_symbol_first_trade': (refresh_first_trades, rebuild_first_trades, 'account_id, symbol'),
+        'funding_cumulative': (refresh_funding_cumulative, rebuild_funding_cumulative, 'account_id, ts'),
+    }
+
+    def snapshot(table, order):
+        return con.execute(f'SELECT * FROM "{table}" ORDER BY {order}').fetchdf()
+
+    # 시뮬레이션 진행: 구간 (since, until]의 거래/펀딩 추가 후 증분 갱신
+    for since, until in zip(cutoffs, cutoffs[1:]):
+        window = [since.to_pydatetime(), until.to_pydatetime()]
+        con.execute("INSERT INTO Trade SELECT * FROM trades_df WHERE ts > ? AND ts <= ?", window)
+        con.execute("INSERT INTO Funding SELECT * FROM funding_df WHERE ts > ? AND ts <= ?", window)
+        for table, (refresh, rebuild, order) in tables.items():
+            changed = refresh(con, *window)
+            refreshed = snapshot(table, order)
+            rebuilt_rows = rebuild(con)
+            pd.testing.assert_frame_equal(refreshed, snapshot(table, order))
+            assert rebuilt_rows == len(refreshed)
+            assert changed >= 0
+        print(f"✓ {since:%m-%d} -> {until:%m-%d} 진행: positions/첫 거래/펀딩 누적합 증분 갱신 == 재생성")
+
+    # 경계를 넘은 포지션이 실제로 다시 집계되었는지 확인
+    spanning = trades.groupby('position_id')['ts'].agg(['min', 'max'])
+    spanning = spanning[(spanning['min'] <= cutoffs[0]) & (spanning['max'] > cutoffs[0])]
+    assert len(spanning) > 0
+    print(f"✓ 진행 경계를 넘은 포지션 {len(spanning)}개 포함")
+
+    # 펀딩 누적합: 이미 기록된 ts 이하의 행이 들어오면 이어붙이지 않고 전체 재생성
+    last_ts = con.execute("SELECT MAX(ts) FROM Funding WHERE account_id = 'A3'").fetchone()[0]
+    late = last_ts - timedelta(minutes=30)
+    con.execute("INSERT INTO Funding VALUES (?, 'A3', 'S0USDT.PERP', -7.5)", [late])
+    count = refresh_funding_cumulative(con, late - timedelta(minutes=1), None)
+    refreshed = snapshot('funding_cumulative', 'account_id, ts')
+    assert count == len(refreshed)  # 폴백은 재생성 행 수를 반환
+    assert rebuild_funding_cumulative(con) == len(refreshed)
+    pd.testing.assert_frame_equal(refreshed, snapshot('funding_cumulative', 'account_id, ts'))
+    late_row = refreshed[(refreshed['account_id'] == 'A3') & (refreshed['ts'] == late)]
+    assert len(late_row) == 1
+    print("✓ 순서 역전 행 -> 전체 재생성 폴백 == 재생성")
+
+
+def test_spec_index_asof():
+    """Spec 인덱스: 마감일 이하 가장 최근 스펙으로 결정, 누락 구간 보고"""
+    print_section("Spec 인덱스 ASOF 테스트")
+    import duckdb
+    from datetime import date
+
+    con = duckdb.connect()
+    con.execute("CREATE TABLE Spec (day DATE, symbol VARCHAR, funding_interval INTEGER, max_order_amount DOUBLE)")
+    con.execute("""
+        INSERT INTO Spec VALUES
+            ('2025-02-01', 'AAA', 8, 1000), ('2025-02-03', 'AAA', 4, 2000), ('2025-02-03', 'AAA', 4, 3000),
+            ('2025-02-02', 'BBB', 8, 500)
+    """)
+    con.execute("""
+        CREATE TABLE positions AS SELECT * FROM (VALUES
+            ('A1', 'P1', 'AAA', DATE '2025-02-01'), ('A1', 'P2', 'AAA', DATE '2025-02-02'),
+            ('A1', 'P3', 'AAA', DATE '2025-02-05'), ('A2', 'P4', 'BBB', DATE '2025-02-01'),
+            ('A2', 'P5', 'BBB', DATE '2025-02-02'), ('A2', 'P6', 'CCC', DATE '2025-02-02')
+        ) t(account_id, position_id, symbol, closing_day)
+    """)
+    assert rebuild_spec_index(con) == 3
+    resolved = con.execute("""
+        SELECT p.position_id, s.spec_day, s.fund_period_hr, s.max_order_amount
+        FROM positions p ASOF LEFT JOIN spec_index s ON p.symbol = s.symbol AND p.closing_day >= s.spec_day
+        ORDER BY p.position_id
+    """).fetchall()
+    assert resolved == [
+        ('P1', date(2025, 2, 1), 8, 1000.0), ('P2', date(2025, 2, 1), 8, 1000.0),
+        ('P3', date(2025, 2, 3), 4, 3000.0), ('P4', None, None, None),
+        ('P5', date(2025, 2, 2), 8, 500.0), ('P6', None, None, None),
+    ]
+    print("✓ ASOF 스펙 결정 일치 (중복 일자는 마지막 행)")
+
+    gaps = spec_coverage_gaps(con).set_index('symbol')
+    assert gaps['carried_forward'].to_dict() == {'AAA': 2, 'BBB': 0, 'CCC': 0}
+    assert gaps['unresolved'].to_dict() == {'AAA': 0, 'BBB': 1, 'CCC': 1}
+    assert gaps.loc['AAA', 'max_lag_days'] == 2
+    print("✓ 누락 구간 보고 일치")
+
+
+def test_first_trade_times():
+    """첫 거래 시각: 증분 갱신 == 재생성, 일괄 조인 == (계정, 심볼)/포지션별 MIN(ts) 조회"""
+    print_section("첫 거래 시각 일괄 조회 테스트")
+    import duckdb
+    from api.data_aggregator import DataAggregator
+
+    rng = np.random.default_rng(29)
+    start = pd.Timestamp(2025, 2, 1)
+    n_trades = 3000
+    trades = pd.DataFrame({
+        'ts': start + pd.to_timedelta(np.sort(rng.integers(0, 24 * 60 * 30, n_trades)), unit='min'),
+        'account_id': [f"A{i}" for i in rng.integers(0, 40, n_trades)],
+        'symbol': [f"S{i}USDT.PERP" for i in rng.integers(0, 6, n_trades)],
+        'position_id': [f"P{i}" for i in rng.integers(0, 400, n_trades)],
+        'openclose': 'OPEN', 'side': 'LONG', 'amount': 1.0, 'leverage': 1,
+    })
+    con = duckdb.connect()
+    cutoff = trades['ts'].iloc[n_trades // 2]
+    con.register('trades_df', trades)
+    con.execute("CREATE TABLE Trade AS SELECT * FROM trades_df WHERE ts <= ?", [cutoff])
+    rebuild_first_trades(con)
+    con.execute("INSERT INTO Trade SELECT * FROM trades_df WHERE ts > ?", [cutoff])
+    added = refresh_first_trades(con, cutoff.to_pydatetime(), trades['ts'].max().to_pydatetime())
+    incremental = con.execute("SELECT * FROM account_symbol_first_trade ORDER BY ALL").fetchall()
+    assert rebuild_first_trades(con) == len(incremental)
+    assert incremental == con.execute("SELECT * FROM account_symbol_first_trade ORDER BY ALL").fetchall()
+    print(f"✓ 증분 갱신 == 재생성 ({added}개 추가)")
+
+    rebuild_positions(con)
+    aggregator = DataAggregator()
+    keys = [(f"A{i}", f"S{j}USDT.PERP") for i in range(45) for j in range(6)] * 2
+    batched = aggregator._first_trade_times(con, keys)
+    expected = {}
+    for account, symbol in set(keys):
+        row = con.execute("SELECT MIN(ts) FROM Trade WHERE account_id = ? AND symbol = ?", [account, symbol]).fetchone()
+        if row[0] is not None:
+            expected[(account, symbol)] = row[0]
+    assert batched == expected and ('A44', 'S0USDT.PERP') not in batched
+    print(f"✓ (계정, 심볼) 일괄 조인 일치 ({len(batched)}개)")
+
+    position_ids = [f"P{i}" for i in range(410)]
+    opened = aggregator._position_open_times(con, position_ids)
+    expected = dict(con.execute("SELECT position_id, MIN(ts) FROM Trade GROUP BY position_id").fetchall())
+    assert opened == expected and 'P405' not in opened
+    print(f"✓ 포지션 일괄 조인 일치 ({len(opened)}개)")
+
+
+def test_sanction_registry():
+    """제재 레지스트리: (유형, 대상) 중복 확인, 유형별 목록, 이전 실행 제재 구분"""
+    print_section("SanctionRegistry 테스트")
+    from funding_fee.funding_hunter import SanctionCase, SanctionType, SeverityLevel
+    from abusing.cooperative_trading import (
+        SanctionCase as CoopSanctionCase, SanctionType as CoopSanctionType, RiskLevel,
+    )
+
+    def funding_case(account_id, sanction_type):
+        return SanctionCase(
+            case_id=f"{sanction_type.value}_{account_id}", sanction_type=sanction_type, account_id=account_id,
+            detection_timestamp=datetime(2025, 2, 1), hunter_case_ids=[], total_score=80.0,
+            severity=SeverityLevel.CRITICAL,
+        )
+
+    registry = SanctionRegistry('account_id')
+    registry.remember([
+        funding_case('A1', SanctionType.IMMEDIATE_CRITICAL).to_dict(),
+        funding_case('A2', SanctionType.REPEATED_ABUSE).to_dict(),
+    ])
+    cases = [
+        funding_case('A1', SanctionType.IMMEDIATE_CRITICAL), funding_case('A1', SanctionType.IMMEDIATE_CRITICAL),
+        funding_case('A2', SanctionType.IMMEDIATE_CRITICAL), funding_case('A3', SanctionType.REPEATED_ABUSE),
+    ]
+    for case in cases:
+        registry.add(case)
+    assert registry.cases == cases and len(registry) == 4
+    assert registry.by_type(SanctionType.IMMEDIATE_CRITICAL) == cases[:3]
+    assert registry.contains(SanctionType.IMMEDIATE_CRITICAL, 'A2')
+    assert not registry.contains(SanctionType.IMMEDIATE_CRITICAL, 'A3')
+    assert not registry.contains(SanctionType.REPEATED_ABUSE, 'A1')
+    # 같은 계정이라도 유형이 다르면 이어진 제재가 아님
+    assert [registry.is_carried_over(c) for c in cases] == [True, True, False, False]
+    print("✓ 중복 확인/유형별 목록/이전 실행 구분 (계정)")
+
+    # 공모: 실행 안에서는 group_id, 이전 실행과는 구성원(순서 무관)으로 비교
+    def coop_case(group_id, members):
+        return CoopSanctionCase(
+            case_id=f"SANCTION_IP_{group_id}", sanction_type=CoopSanctionType.IP_SHARED_NETWORK,
+            group_id=group_id, account_ids=members, detection_timestamp=datetime(2025, 2, 1),
+            trade_pair_ids=[], total_score=70.0, risk_level=RiskLevel.HIGH,
+        )
+
+    registry = SanctionRegistry('group_id', carry_field='account_ids')
+    registry.remember([coop_case('GROUP_0003', ['A2', 'A1']).to_dict()])
+    registry.add(coop_case('GROUP_0000', ['A1', 'A2']))
+    registry.add(coop_case('GROUP_0003', ['A1', 'A9']))
+    assert registry.contains(CoopSanctionType.IP_SHARED_NETWORK, 'GROUP_0003')
+    assert [registry.is_carried_over(c) for c in registry] == [True, False]
+    assert registry.carried_over_count() == 1
+    print("✓ 그룹 구성원 기준 이전 실행 구분")
+
+
+def test_results_store():
+    """결과 스토어: 게시/조회(프로젝션, 조건), 재게시 시 이전 실행 결과 제거"""
+    print_section("ResultsStore 테스트")
+    import duckdb
+
+    con = duckdb.connect()
+    store = ResultsStore(con)
+    assert not store.has_results('coop')
+    assert store.read_frame('coop', 'pairs') is None
+
+    pairs = pd.DataFrame({
+        'pair_id': ['P1', 'P2', 'P3'],
+        'total_score': [91.0, 55.5, 72.0],
+        'risk_level': ['CRITICAL', 'MEDIUM', 'HIGH'],
+    })
+    groups = pd.DataFrame({'group_id': ['G1'], 'members': ['A1, A2'], 'case_ids': [['P1', 'P3']]})
+    sanctions = {'total_sanction_groups': 1, 'generated_at': datetime(2025, 2, 1), 'sanctions': [{'case_id': 'S1'}]}
+    store.publish('coop', {'pairs': pairs, 'groups': groups}, {'sanctions': sanctions, 'visualization': None})
+
+    assert store.has_results('coop') and not store.has_results('wash')
+    assert store.read_document('coop', 'sanctions') == {**sanctions, 'generated_at': '2025-02-01 00:00:00'}
+    assert store.read_document('coop', 'visualization') is None
+    rows = store.read_records(
+        'coop', 'pairs', columns=['pair_id', 'total_score'], where='total_score > ?', params=[60],
+        order_by='total_score DESC',
+    )
+    assert rows == [{'pair_id': 'P1', 'total_score': 91.0}, {'pair_id': 'P3', 'total_score': 72.0}]
+    assert store.read_records('coop', 'groups') == [{'group_id': 'G1', 'members': 'A1, A2', 'case_ids': ['P1', 'P3']}]
+    pd.testing.assert_frame_equal(store.read_frame('coop', 'pairs'), pairs, check_dtype=False)
+    print("✓ 게시/조회 일치")
+
+    # 다음 실행에서 그룹이 없으면 이전 그룹 테이블/문서는 남지 않음
+    store.publish('coop', {'pairs': pairs.head(1)}, {'config': {'min_group_size': 2}})
+    assert store.read_frame('coop', 'groups') is None
+    assert store.read_document('coop', 'sanctions') is None
+    assert len(store.read_frame('coop', 'pairs')) == 1
+    print("✓ 재게시 시 이전 결과 제거")
+
+
+def test_empty_run_clears_results(tmp_path):
+    """탐지 결과가 있던 모델을 빈 결과로 다시 실행하면 결과 테이블이 비고 세대가 올라감"""
+    print_section("빈 탐지 결과 게시 테스트")
+    import duckdb
+    from abusing.cooperative_trading import CooperativeTradingDetector
+
+    con = duckdb.connect()
+    con.execute("""
+        CREATE TABLE positions AS SELECT * FROM (VALUES
+            ('A1', 'P1', 10, TIMESTAMP '2025-02-01 00:00:00', TIMESTAMP '2025-02-01 00:10:00', 'AAAUSDT.PERP', 'LONG', 100.0, 50.0),
+            ('A2', 'P2', 10, TIMESTAMP '2025-02-01 00:00:30', TIMESTAMP '2025-02-01 00:10:20', 'AAAUSDT.PERP', 'LONG', 100.0, -40.0)
+        ) t(account_id, position_id, leverage, open_ts, close_ts, symbol, side, amount, rpnl)
+    """)
+    con.execute("CREATE TABLE IP AS SELECT * FROM (VALUES ('A1', '10.0.0.1'), ('A2', '10.0.0.1')) t(account_id, ip)")
+
+    config = CoopConfig(output_dir=str(tmp_path / 'cooperative'))
+    result = CooperativeTradingDetector(config).detect('unused.xlsx', con)
+    store = ResultsStore(con)
+    assert result['passed_filter'] == 1
+    assert len(store.read_frame('coop', 'pairs')) == 1
+    generation = store.generations()['coop']
+    print("✓ 첫 실행 결과 게시")
+
+    # 포지션이 사라져(리셋/진행 후) 후보가 없는 실행
+    con.execute("DELETE FROM positions")
+    result = CooperativeTradingDetector(config).detect('unused.xlsx', con)
+    assert result['total_candidates'] == 0
+    assert store.generations()['coop'] == generation + 1
+    assert store.read_frame('coop', 'pairs') is None and store.read_frame('coop', 'groups') is None
+    assert store.read_document('coop', 'sanctions') is None
+    assert store.read_document('coop', 'config')['output_dir'] == config.output_dir
+    print("✓ 빈 실행이 이전 결과 테이블을 비우고 세대 증가")
+
+
+def test_aggregator_generation_cache(tmp_path):
+    """DataAggregator: 게시 세대가 바뀐 모델만 리로드, 동시 요청은 한 번만 로드"""
+    print_section("DataAggregator 세대 캐시 테스트")
+    import threading
+    import time
+    import duckdb
+    from api.data_aggregator import DataAggregator
+
+    con = duckdb.connect()
+    store = ResultsStore(con)
+    frame = pd.DataFrame({'pair_id': ['P1'], 'total_score': [80.0]})
+    store.publish('wash', {'pairs': frame}, {'config': {}})
+    store.publish('funding', {'cases': frame.rename(columns={'pair_id': 'case_id'})}, {'config': {}})
+
+    aggregator = DataAggregator(str(tmp_path))
+    aggregator._open_results_store = lambda: ResultsStore(con.cursor())
+    loads = {key: 0 for key in aggregator.MODELS}
+    for key in loads:
+        original = getattr(aggregator, f"_load_{key}_data")
+
+        def counted(store=None, _key=key, _original=original):
+            loads[_key] += 1
+            time.sleep(0.05)  # 동시 요청이 로드 도중에 겹치도록
+            return _original(store)
+        setattr(aggregator, f"_load_{key}_data", counted)
+
+    data = aggregator.get_all_data()
+    assert data['bonus']['trade_pairs'] == [{'pair_id': 'P1', 'total_score': 80.0}]
+    assert data['cooperative']['trade_pairs'] is None  # 게시 전 + 파일 없음
+    aggregator.get_all_data()
+    assert loads == {'bonus': 1, 'funding': 1, 'cooperative': 1}
+    print("✓ 세대가 같으면 캐시 사용")
+
+    store.publish('funding', {}, {'config': {'run': 2}})
+    threads = [threading.Thread(target=aggregator.get_all_data) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == {'bonus': 1, 'funding': 2, 'cooperative': 1}
+    assert aggregator.get_all_data()['funding']['config'] == {'run': 2}
+    print("✓ 바뀐 모델만 한 번 리로드 (동시 요청 8개)")
+
+    # 게시 전 모델은 결과 파일이 바뀌면 리로드
+    (tmp_path / 'cooperative').mkdir()
+    (tmp_path / 'cooperative' / 'cooperative_groups.csv').write_text("group_id,members\nG1,\"A1, A2\"\n")
+    assert aggregator.get_all_data()['cooperative']['groups'] == [{'group_id': 'G1', 'members': 'A1, A2'}]
+    aggregator.get_all_data(force_reload=True)
+    assert loads == {'bonus': 2, 'funding': 3, 'cooperative': 3}
+    print("✓ 결과 파일 변경/강제 리로드 반영")
+
+
+def test_detection_index_pages():
+    """탐지 인덱스: cursor 페이지 이어붙이기 == 점수순 필터 결과, 필드 프로젝션"""
+    print_section("탐지 인덱스 페이지 테스트")
+    from api.detection_index import RecordIndex
+
+    rng = np.random.default_rng(31)
+    start_ms = 1_738_368_000_000
+    records = [
+        {
+            'id': f"D{i}",
+            'model': ['wash', 'funding', 'cooperative'][i % 3],
+            'type': ['HIGH', 'MEDIUM'][int(rng.integers(0, 2))],
+            'score': float(rng.integers(50, 60)),  # 동점 다수
+            'is_sanctioned': bool(rng.integers(0, 2)),
+            'accounts': [f"A{a}" for a in rng.integers(0, 30, 2)],
+            'timestamp': start_ms + int(rng.integers(0, 10_000)),
+            'raw': {'i': i},
+        }
+        for i in range(500)
+    ]
+    index = RecordIndex(records)
+    ordered = sorted(records, key=lambda r: (-r['score'], r['model'], r['id']))
+
+    cases = [
+        ({}, lambda r: True),
+        ({'model': 'wash', 'sanctioned': True}, lambda r: r['model'] == 'wash' and r['is_sanctioned']),
+        ({'account': 'A7'}, lambda r: 'A7' in r['accounts']),
+        ({'type': 'HIGH', 'start_ms': start_ms + 2000, 'end_ms': start_ms + 6000},
+         lambda r: r['type'] == 'HIGH' and start_ms + 2000 <= r['timestamp'] <= start_ms + 6000),
+    ]
+    for query, predicate in cases:
+        pages, cursor = [], None
+        while True:
+            rows, cursor = index.page(limit=13, cursor=cursor, fields=['id', 'score'], **query)
+            pages.extend(rows)
+            if cursor is None:
+                break
+        expected = [{'id': r['id'], 'score': r['score']} for r in ordered if predicate(r)]
+        assert pages == expected, query
+        assert index.page(**query)[0] == [r for r in ordered if predicate(r)]
+    print(f"✓ 페이지 이어붙이기 == 정렬 후 필터 ({len(cases)}개 조건)")
+
+    # 재구성된 인덱스에서도 이전 cursor 위치부터 이어짐
+    _, cursor = index.page(limit=100)
+    rebuilt = RecordIndex(records + [dict(records[0], id='D9999', score=99.0)])
+    assert rebuilt.page(limit=1, cursor=cursor)[0] == [ordered[100]]
+    print("✓ 재구성 후 cursor 유지")
+
+
+def test_account_trade_pages():
+    """계정 거래 이력: 인덱스 + keyset 페이지 이어붙이기 == 계정 전체 최신순 (동일 ts 포함)"""
+    print_section("계정 거래 이력 페이지 테스트")
+    import duckdb
+    from api.data_aggregator import DataAggregator
+
+    con = duckdb.connect()
+    con.execute("""
+        CREATE TABLE Trade AS
+        SELECT 'A' || (i % 7) AS account_id, 'P' || i AS position_id,
+               TIMESTAMP '2025-02-01' + to_seconds(i // 5) AS ts,  -- 같은 ts 다수
+               'AAAUSDT.PERP' AS symbol, 'LONG' AS side, 1 AS leverage,
+               1.0 * i AS price, 1.0 AS qty, 1.0 AS amount
+        FROM range(2000) t(i)
+    """)
+    ensure_trade_account_index(con)
+    ensure_trade_account_index(con)  # 이미 있으면 그대로
+    assert con.execute("SELECT COUNT(*) FROM duckdb_indexes() WHERE table_name = 'Trade'").fetchone()[0] == 1
+
+    expected = con.execute(
+        "SELECT position_id FROM Trade WHERE account_id = 'A3' ORDER BY ts DESC, rowid DESC"
+    ).fetchall()
+    pages, cursor = [], (None, None)
+    while True:
+        rows = con.execute(DataAggregator.ACCOUNT_TRADES_SQL, {
+            'account_id': 'A3', 'cursor_ts': cursor[0], 'cursor_row': cursor[1], 'limit': 11,
+        }).fetchall()
+        pages.extend((r[1],) for r in rows)
+        if len(rows) < 11:
+            break
+        cursor = (rows[-1][3], rows[-1][0])
+    assert pages == expected
+    print(f"✓ 페이지 이어붙이기 == 최신순 전체 ({len(pages)}건)")
+
+    # DB 조회 실패: 첫 페이지만 탐지 거래로 대체, 다음 페이지는 오류 전파
+    class FailingAggregator(DataAggregator):
+        def get_account_trade_page(self, account_id, limit=1000, cursor=None):
+            raise RuntimeError("db unavailable")
+
+        def _detected_account_trades(self, account_id):
+            return [{'trade_id': 'PAIR_000000', 'account_id': account_id}]
+
+    failing = FailingAggregator()
+    trades, next_cursor = failing.get_account_trade_history('A3')
+    assert [t['trade_id'] for t in trades] == ['PAIR_000000'] and next_cursor is None
+    try:
+        failing.get_account_trade_history('A3', cursor='2025-02-01T00:00:00|5')
+        raise AssertionError("cursor 페이지 조회 실패가 전파되지 않음")
+    except RuntimeError:
+        pass
+    print("✓ cursor 페이지 조회 실패는 탐지 거래로 대체하지 않음")
+
+
+def test_ip_index():
+    """IPIndex: 공유 IP 수 == 집합 교집합, 그룹 공유 IP == IP 시트 필터링 결과"""
+    print_section("IPIndex 테스트")
+
+    rng = np.random.default_rng(13)
+    ip_data = pd.DataFrame({
+        'account_id': rng.choice([f"A{i}" for i in range(60)], 500),
+        'ip': rng.choice([f"10.0.{i}" for i in range(40)], 500),
+    })
+    index = IPIndex(ip_data)
+
+    account_ips = {}
+    for account_id, ip in zip(ip_data['account_id'], ip_data['ip']):
+        account_ips.setdefault(account_id, set()).add(ip)
+    accounts = [f"A{i}" for i in range(70)]
+    a1, a2 = rng.choice(accounts, 3000), rng.choice(accounts, 3000)
+    expected = [len(account_ips.get(x, set()) & account_ips.get(y, set())) for x, y in zip(a1, a2)]
+    assert index.shared_ip_count(a1, a2).tolist() == expected
+    print("✓ 공유 IP 수 일치")
+
+    groups = [list(rng.choice(accounts, int(rng.integers(1, 12)), replace=False)) for _ in range(200)]
+    for members, shared in zip(groups, index.shared_ips_many(groups)):
+        group_ips = ip_data[ip_data['account_id'].isin(members)]
+        counts = group_ips['ip'].value_counts()
+        expected = {
+            ip: group_ips[group_ips['ip'] == ip]['account_id'].tolist()
+            for ip in group_ips['ip'].drop_duplicates() if counts[ip] > 1
+        }
+        assert shared == expected
+        assert list(shared) == list(expected)
+    assert IPIndex(pd.DataFrame()).shared_ip_count(['A1'], ['A2']).tolist() == [0]
+    print("✓ 그룹 공유 IP 일치")
+
+
+def test_detection_dag():
+    """탐지 DAG: prepare 완료 후 탐지기 동시 실행, 선행 실패/취소 전파, 노드별 시간/메모리 지표"""
+    print_section("탐지 DAG 실행 테스트")
+    import threading
+    import time
+    import run_all_detections as rad
+
+    detectors = [name for name, (deps, _, _) in rad.DETECTION_DAG.items() if deps]
+    assert detectors == ['bonus', 'funding', 'cooperative']
+    assert all(rad.DETECTION_DAG[name][0] == ('prepare',) for name in detectors)
+
+    def run(node, workers=3, cancel_event=None):
+        spans, calls = {}, []
+
+        def fake_node(name, data_filepath, base_con, incremental=False):
+            calls.append(name)
+            started = time.perf_counter()
+            result = node(name)
+            spans[name] = (started, time.perf_counter())
+            return result
+
+        original = rad._run_node
+        rad._run_node = fake_node
+        try:
+            results = rad.run_all_detections('unused.xlsx', workers=workers, con=object(), cancel_event=cancel_event)
+        finally:
+            rad._run_node = original
+        return results, spans, calls
+
+    # 1) 동시 실행: 세 탐지기가 모두 시작해야 barrier 통과 (순차 실행이면 타임아웃)
+    barrier = threading.Barrier(len(detectors), timeout=10)
+    baseline = rad._current_rss_mb()
+
+    def concurrent(name):
+        if name == 'prepare':
+            time.sleep(0.05)
+            return {'positions': 0}
+        barrier.wait()
+        if name == 'bonus':
+            block = bytearray(64 * 1024 * 1024)  # RSS 샘플링 확인용
+            block[::4096] = b'x' * len(block[::4096])
+            time.sleep(0.2)
+            del block
+        return {'total_candidates': 0}
+
+    results, spans, calls = run(concurrent)
+    assert calls[0] == 'prepare' and sorted(calls[1:]) == sorted(detectors)
+    assert all(spans['prepare'][1] <= spans[name][0] for name in detectors)
+    assert 'prepare' not in results and all(results[name] == {'total_candidates': 0} for name in detectors)
+    print("✓ prepare 완료 후 세 탐지기 동시 실행")
+
+    metrics = results['metrics']
+    assert metrics['workers'] == 3 and set(metrics['nodes']) == set(rad.DETECTION_DAG)
+    assert metrics['nodes']['prepare']['wall_sec'] >= 0.05
+    assert metrics['nodes']['bonus']['wall_sec'] >= 0.2
+    assert metrics['nodes']['bonus']['peak_rss_mb'] >= baseline + 48
+    assert metrics['total_wall_sec'] >= max(end for _, end in spans.values()) - min(start for start, _ in spans.values())
+    print(f"✓ 노드별 시간/최대 RSS 기록 (bonus 최대 {metrics['nodes']['bonus']['peak_rss_mb']:.0f}MB, 시작 {baseline:.0f}MB)")
+
+    # 2) workers=1: 순차 실행 (구간이 겹치지 않음)
+    results, spans, calls = run(lambda name: time.sleep(0.01) or {}, workers=1)
+    ordered = sorted(spans.values())
+    assert calls == list(rad.DETECTION_DAG)
+    assert all(prev[1] <= nxt[0] for prev, nxt in zip(ordered, ordered[1:]))
+    print("✓ workers=1이면 순차 실행")
+
+    # 3) 선행 단계 실패 -> 탐지기는 실행하지 않고 실패로 기록
+    def failing(name):
+        if name == 'prepare':
+            raise RuntimeError('positions missing')
+        return {}
+
+    results, spans, calls = run(failing)
+    assert calls == ['prepare']
+    assert all(results[name] == {'error': '선행 단계 실패: prepare'} for name in detectors)
+    assert set(results['metrics']['nodes']) == {'prepare'}
+    print("✓ 선행 단계 실패 전파")
+
+    # 4) 취소: 아직 시작하지 않은 노드는 실행하지 않음
+    cancel = threading.Event()
+    cancel.set()
+    results, spans, calls = run(lambda name: {}, cancel_event=cancel)
+    assert calls == [] and all(results[name] == {'error': 'cancelled'} for name in detectors)
+    print("✓ 취소 시 미시작 노드 건너뜀")
+
+
+def test_detector_write_scopes():
+    """prepare 후 탐지기 커서들이 동시에 증분 후보/워터마크/결과를 기록해도 충돌 없음"""
+    print_section("탐지기 동시 쓰기 범위 테스트")
+    import threading
+    import duckdb
+    from common.incremental import IncrementalState
+    import run_all_detections as rad
+
+    con = duckdb.connect()
+    con.execute("""
+        CREATE TABLE Trade AS
+        SELECT 'A' || (i % 5) AS account_id, 'P' || i AS position_id,
+               TIMESTAMP '2025-02-01' + to_minutes(i) AS ts, 'OPEN' AS openclose, 'LONG' AS side,
+               'AAAUSDT.PERP' AS symbol, 10.0 AS amount, 5 AS leverage
+        FROM range(50) t(i)
+    """)
+    assert rad._run_node('prepare', 'unused.xlsx', con) == {'positions': 50}
+    tables = {r[0] for r in con.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+    assert {'positions', 'detector_watermarks', 'results_documents', 'results_generations'} <= tables
+    print("✓ prepare가 공유 테이블 생성")
+
+    models = {'wash': 'pairs', 'funding': 'cases', 'coop': 'pairs'}
+    barrier = threading.Barrier(len(models), timeout=10)
+    errors = []
+
+    def detector(model, frame_name, round_no):
+        cursor = con.cursor()
+        try:
+            state = IncrementalState(cursor, model, signature='v1')
+            assert state.is_incremental == (round_no == 2)
+            barrier.wait()
+            if state.is_incremental:
+                state.merge_candidates('SELECT * FROM positions WHERE close_ts > ?', [state.previous_watermark],
+                                       [('account_id', 'position_id')])
+            else:
+                state.replace_candidates('SELECT * FROM positions')
+            cursor.execute(f'CREATE TEMP TABLE scratch AS SELECT {round_no} AS round_no')
+            barrier.wait()
+            state.commit()
+            frame = pd.DataFrame({'id': [f"{model}-{round_no}"], 'score': [float(round_no)]})
+            ResultsStore(cursor).publish_run(model, {'round': round_no}, {frame_name: frame})
+        except Exception as e:
+            errors.append((model, repr(e)))
+        finally:
+            cursor.close()
+
+    for round_no in (1, 2):
+        if round_no == 2:
+            # 시뮬레이션 진행: 새 포지션 추가 -> 두 번째 실행은 증분 병합
+            con.execute(
+                "INSERT INTO Trade SELECT account_id, position_id || 'b', ts + INTERVAL 1 DAY, "
+                "openclose, side, symbol, amount, leverage FROM Trade"
+            )
+            refresh_positions(con, datetime(2025, 2, 1, 1), None)
+        threads = [threading.Thread(target=detector, args=(m, f, round_no)) for m, f in models.items()]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == [], errors
+
+    store = ResultsStore(con)
+    assert store.generations() == {'wash': 2, 'funding': 2, 'coop': 2}
+    for model, frame_name in models.items():
+        assert store.read_frame(model, frame_name)['id'].tolist() == [f"{model}-2"]
+        assert store.read_document(model, 'config') == {'round': 2}
+        assert con.execute(f'SELECT COUNT(*) FROM "incr_{model}_candidates"').fetchone()[0] == 100
+    assert con.execute("SELECT COUNT(*) FROM detector_watermarks").fetchone()[0] == 3
+    print("✓ 두 번의 동시 실행 모두 충돌 없이 모델별 결과/증분 후보/워터마크 기록")
+
+
+def _wait_until(predicate, timeout: float = 10.0):
+    """predicate()가 참이 될 때까지 대기 (백그라운드 작업 상태 확인용)"""
+    import time
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_job_runner():
+    """JobRunner: 상태 전이, 대기 중 취소, 실행 중 협조적 취소, 실패 기록, 이력 정리"""
+    print_section("JobRunner 테스트")
+    import threading
+    from api.jobs import JobCancelled, JobRunner, JobStatus
+
+    runner = JobRunner(max_history=3)
+    gate, started = threading.Event(), threading.Event()
+
+    def blocking(job, value):
+        job.set_stage("work")
+        started.set()
+        gate.wait(10)
+        return {'value': value}
+
+    first = runner.submit('demo', blocking, value=1)
+    started.wait(10)
+    second = runner.submit('demo', blocking, value=2)  # 단일 워커 -> 대기
+    assert first.status == JobStatus.RUNNING and first.stage == "work" and first.started_at is not None
+    assert second.status == JobStatus.PENDING and second.stage == "queued"
+
+    # 대기 중 작업 취소는 즉시 반영되고 실행되지 않음
+    assert runner.cancel(second.job_id) is second
+    assert second.status == JobStatus.CANCELLED and second.finished_at is not None
+    assert second.to_dict()['cancel_requested'] is True
+    gate.set()
+    assert runner.future(first.job_id).result(10) == {'value': 1}
+    assert first.status == JobStatus.SUCCEEDED and first.stage == "done" and first.result == {'value': 1}
+    assert first.to_dict()['status'] == 'succeeded' and first.finished_at >= first.started_at
+    assert runner.future(second.job_id).cancelled() and second.started_at is None
+    print("✓ pending -> running -> succeeded / 대기 중 취소")
+
+    # 실행 중 취소: 다음 단계 경계(set_stage/check_cancelled)에서 JobCancelled
+    in_stage = threading.Event()
+
+    def cooperative(job):
+        job.set_stage("step1")
+        in_stage.set()
+        job.cancel_event.wait(10)
+        job.set_stage("step2")
+        return {'unreachable': True}
+
+    job = runner.submit('demo', cooperative)
+    in_stage.wait(10)
+    runner.cancel(job.job_id)
+    try:
+        runner.future(job.job_id).result(10)
+        raise AssertionError("JobCancelled expected")
+    except JobCancelled:
+        pass
+    assert job.status == JobStatus.CANCELLED and job.stage == "step1" and "step1" in job.error
+    assert job.result is None
+    print("✓ 실행 중 협조적 취소 (단계 경계에서 중단)")
+
+    def failing(job):
+        raise ValueError("boom")
+
+    job = runner.submit('demo', failing)
+    try:
+        runner.future(job.job_id).result(10)
+        raise AssertionError("ValueError expected")
+    except ValueError:
+        pass
+    assert job.status == JobStatus.FAILED and job.error == "boom"
+    print("✓ 실패 기록")
+
+    # 이력 정리: 완료된 오래된 작업부터 제거
+    assert runner.get(first.job_id) is None and runner.future(first.job_id) is None
+    assert runner.get(job.job_id) is job
+    assert runner.cancel('missing') is None
+    print("✓ 완료 작업 이력 정리")
+
+
+def test_simulation_job_endpoints():
+    """시뮬레이션 API: advance/reset 작업, ?wait=false, /jobs/{id}, /jobs/{id}/cancel"""
+    print_section("시뮬레이션 작업 API 테스트")
+    import threading
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import api.jobs as jobs
+    import api.routers.simulation as simulation
+    import run_all_detections as rad
+
+    calls = []
+    detection_gate = threading.Event()
+    detection_gate.set()
+    detection_started = threading.Event()
+    detection_errors = {}
+
+    class FakeDataManager:
+        def advance_model_by_days(self, days, hours):
+            calls.append(('advance', days, hours))
+
+        def seed_full_and_model(self, year, month):
+            calls.append(('seed', year, month))
+
+        def get_connection(self, persistent=False):
+            return 'con'
+
+    class FakeAggregator:
+        def get_simulation_status(self):
+            return {'current_time': '2025-02-08T00:00:00'}
+
+        def get_all_data(self):
+            calls.append(('reload',))
+
+    def fake_run_all_detections(con=None, cancel_event=None, incremental=False, **kwargs):
+        calls.append(('detect', incremental))
+        detection_started.set()
+        while not detection_gate.wait(0.01):
+            if cancel_event.is_set():
+                break
+        return {'bonus': dict(detection_errors), 'metrics': {'incremental': incremental}}
+
+    patches = [
+        (simulation, 'get_data_manager', lambda: FakeDataManager()),
+        (simulation, 'get_aggregator', lambda: FakeAggregator()),
+        (rad, 'run_all_detections', fake_run_all_detections),
+        (jobs, '_runner_instance', jobs.JobRunner()),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    app = FastAPI()
+    app.include_router(simulation.router, prefix="/api/simulation")
+    client = TestClient(app)
+
+    def job_state(job_id):
+        response = client.get(f"/api/simulation/jobs/{job_id}")
+        assert response.status_code == 200
+        return response.json()
+
+    try:
+        # wait=true: 결과를 바로 반환 (진행 -> 증분 탐지 -> 캐시 리로드)
+        response = client.post("/api/simulation/advance", json={'days': 3, 'hours': 2})
+        assert response.status_code == 200
+        body = response.json()
+        assert body['days_advanced'] == 3 and body['hours_advanced'] == 2
+        assert body['detection_metrics'] == {'incremental': True}
+        assert calls == [('advance', 3, 2), ('detect', True), ('reload',)]
+        assert job_state(body['job_id'])['status'] == 'succeeded'
+        print("✓ advance (wait=true) 결과 반환")
+
+        # wait=false: 작업 정보를 즉시 반환, /jobs/{id}로 완료 확인
+        calls.clear()
+        detection_gate.clear()
+        response = client.post("/api/simulation/reset?wait=false")
+        assert response.status_code == 200
+        job = response.json()
+        assert job['kind'] == 'reset' and job['status'] in ('pending', 'running') and job['result'] is None
+        detection_started.wait(10)
+        running = job_state(job['job_id'])
+        assert running['status'] == 'running' and running['stage'] == 'detection'
+        detection_gate.set()
+        _wait_until(lambda: job_state(job['job_id'])['status'] == 'succeeded')
+        done = job_state(job['job_id'])
+        assert done['stage'] == 'done' and done['result']['detection_metrics'] == {'incremental': False}
+        assert calls == [('seed', 2025, 2), ('detect', False), ('reload',)]
+        print("✓ reset (wait=false) -> /jobs/{id} 상태 조회")
+
+        # 실행 중 취소: 탐지 단계에서 중단, 캐시 리로드 없음
+        calls.clear()
+        detection_gate.clear()
+        detection_started.clear()
+        job = client.post("/api/simulation/advance?wait=false", json={'days': 1}).json()
+        detection_started.wait(10)
+        cancelled = client.post(f"/api/simulation/jobs/{job['job_id']}/cancel")
+        assert cancelled.status_code == 200 and cancelled.json()['cancel_requested'] is True
+        _wait_until(lambda: job_state(job['job_id'])['status'] == 'cancelled')
+        state = job_state(job['job_id'])
+        assert state['stage'] == 'detection' and 'detection' in state['error']
+        assert calls == [('advance', 1, 0), ('detect', True)]
+        print("✓ /jobs/{id}/cancel: 실행 중 작업이 단계 경계에서 취소")
+
+        # wait=true 요청이 기다리는 중에 취소되면 409
+        detection_started.clear()
+
+        def cancel_running():
+            detection_started.wait(10)
+            running = [j for j in jobs.get_job_runner()._jobs.values() if j.status == jobs.JobStatus.RUNNING]
+            assert len(running) == 1
+            client.post(f"/api/simulation/jobs/{running[0].job_id}/cancel")
+
+        canceller = threading.Thread(target=cancel_running)
+        canceller.start()
+        response = client.post("/api/simulation/advance", json={'days': 1})
+        canceller.join()
+        assert response.status_code == 409
+        print("✓ 대기 중인 요청의 작업이 취소되면 409")
+
+        # 탐지 실패 -> 500, 작업은 failed
+        detection_gate.set()
+        detection_errors['error'] = 'boom'
+        response = client.post("/api/simulation/advance", json={'days': 1})
+        assert response.status_code == 500 and 'boom' in response.json()['detail']
+        failed = [j for j in jobs.get_job_runner()._jobs.values() if j.status == jobs.JobStatus.FAILED]
+        assert len(failed) == 1 and 'boom' in failed[0].error
+        print("✓ 탐지 실패 -> 500 / failed")
+
+        assert client.get("/api/simulation/jobs/missing").status_code == 404
+        assert client.post("/api/simulation/jobs/missing/cancel").status_code == 404
+        print("✓ 없는 작업 -> 404")
+    finally:
+        client.close()
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+
+@contextmanager
+def _isolated_data_manager(workdir: Path):
+    """DataManager 싱글톤과 작업 디렉터리(data/ingest.duckdb, data/cache)를 테스트용으로 분리
+
+    반환된 make(filepath, **kwargs)는 매번 새 인스턴스를 생성 (프로세스 재시작과 동일)
+    """
+    from common.data_manager import DataManager
+
+    previous, cwd = DataManager._instance, os.getcwd()
+    os.chdir(workdir)
+
+    def make(filepath, **kwargs):
+        DataManager._instance = None
+        return DataManager(str(filepath), **kwargs)
+
+    try:
+        yield make
+    finally:
+        os.chdir(cwd)
+        DataManager._instance = previous
+
+
+def _write_workbook(path: Path, sheets: dict):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for name, frame in sheets.items():
+            frame.to_excel(writer, sheet_name=name, index=False)
+
+
+def _detection_workbook(seed: int = 41) -> dict:
+    """세 탐지기 후보가 모두 나오는 2~3월 합성 데이터 (진행 경계를 넘는 포지션 포함)"""
+    rng = np.random.default_rng(seed)
+    symbols = ['AAAUSDT.PERP', 'BBBUSDT.PERP', 'BTCUSDT.PERP']
+    accounts = [f"U{i:02d}" for i in range(24)]
+    start, span_min = pd.Timestamp(2025, 2, 20), 24 * 60 * 20
+    trades, funding, rewards = [], [], []
+
+    def position(account, position_id, symbol, side, opened, closed, amount, close_ratio, leverage):
+        for ts, openclose, value in ((opened, 'OPEN', amount), (closed, 'CLOSE', amount * close_ratio)):
+            trades.append({
+                'ts': ts, 'account_id': account, 'position_id': position_id, 'symbol': symbol,
+                'side': side, 'openclose': openclose, 'amount': round(value, 4),
+                'leverage': leverage, 'price': 1.0, 'qty': round(value, 4),
+            })
+
+    for i in range(240):
+        opened = start + pd.Timedelta(minutes=int(rng.integers(0, span_min)))
+        symbol = symbols[int(rng.integers(0, len(symbols)))]
+        holding = pd.Timedelta(minutes=int(rng.choice([10, 90, 60 * 30, 60 * 24 * 3])))
+        closed = opened + holding
+        if i % 3 == 0:
+            # 보너스 후 반대 방향 동시 거래 (증정금 녹이기 후보)
+            loser, winner = rng.choice(accounts, 2, replace=False)
+            rewards.append({'ts': opened - pd.Timedelta(hours=float(rng.uniform(1, 40))),
+                            'account_id': loser, 'reward_amount': float(rng.integers(10, 100))})
+            amount = float(rng.integers(100, 900))
+            position(loser, f"W{i}L", symbol, 'LONG', opened, closed, amount, 0.9, 10)
+            position(winner, f"W{i}W", symbol, 'SHORT',
+                     opened + pd.Timedelta(seconds=int(rng.integers(0, 40))),
+                     closed + pd.Timedelta(seconds=int(rng.integers(0, 90))),
+                     amount * float(rng.uniform(0.97, 1.03)), 0.9, 10)
+        elif i % 3 == 1:
+            # 같은 방향 동시 거래, 한쪽만 큰 이익 (공모거래 후보)
+            first, second = rng.choice(accounts, 2, replace=False)
+            side = ['LONG', 'SHORT'][int(rng.integers(0, 2))]
+            for account, suffix, ratio, lag in ((first, 'A', 1.3, 0), (second, 'B', 0.98, int(rng.integers(0, 100)))):
+                position(account, f"C{i}{suffix}", symbol, side,
+                         opened + pd.Timedelta(seconds=lag), closed + pd.Timedelta(seconds=lag),
+                         float(rng.integers(100, 900)), ratio, 10)
+        else:
+            # 정각 펀딩비를 걸친 짧은 보유 (펀딩비 악용 후보)
+            account = accounts[int(rng.integers(0, len(accounts)))]
+            hour = opened.ceil('h')
+            position(account, f"F{i}", symbol, 'LONG',
+                     hour - pd.Timedelta(minutes=int(rng.integers(1, 12))),
+                     hour + pd.Timedelta(minutes=int(rng.integers(1, 12))),
+                     float(rng.integers(200, 1000)), 1.0, int(rng.choice([3, 10, 20])))
+            funding.append({'ts': hour, 'account_id': account, 'symbol': symbol,
+                            'funding_fee': -float(rng.uniform(0.5, 5))})
+    for _ in range(300):
+        funding.append({'ts': start + pd.Timedelta(hours=int(rng.integers(0, span_min // 60))),
+                        'account_id': accounts[int(rng.integers(0, len(accounts)))],
+                        'symbol': symbols[0], 'funding_fee': float(np.round(rng.normal(-1, 2), 2))})
+
+    days = pd.date_range('2025-02-01', '2025-03-31', freq='D')
+    return {
+        'Trade': pd.DataFrame(trades).sort_values('ts', kind='stable').reset_index(drop=True),
+        'Funding': pd.DataFrame(funding).sort_values('ts', kind='stable').reset_index(drop=True),
+        'Reward': pd.DataFrame(rewards).sort_values('ts', kind='stable').reset_index(drop=True),
+        'Spec': pd.DataFrame([{'day': d, 'symbol': s, 'funding_interval': 1, 'max_order_amount': 1000.0}
+                              for d in days for s in symbols]),
+        'IP': pd.DataFrame({'account_id': accounts, 'ip': [f"10.0.0.{i % 8}" for i in range(len(accounts))]}),
+    }
+
+
+def test_incremental_detection_parity(tmp_path):
+    """증분 탐지(진행 후 변경분만 병합) == 전체 탐지: 증정금 녹이기/펀딩비/공모거래"""
+    print_section("증분 탐지 == 전체 탐지 테스트")
+    from common.incremental import reset_incremental_state
+    from wash_trading.wash_trading import BonusLaunderingDetector
+    from funding_fee.funding_hunter import FundingHunterDetector
+    from abusing.cooperative_trading import CooperativeTradingDetector
+    from common.results_store import RESULT_FRAMES
+
+    workbook = tmp_path / 'data.xlsx'
+    _write_workbook(workbook, _detection_workbook())
+    detectors = {
+        'wash': (BonusLaunderingDetector, WashConfig),
+        'funding': (FundingHunterDetector, FundingConfig),
+        'coop': (CooperativeTradingDetector, CoopConfig),
+    }
+    candidate_order = {
+        'wash': 'loser_account, loser_position_id, winner_account, winner_position_id',
+        'funding': 'account_id, position_id',
+        'coop': 'account_id1, position_id1, account_id2, position_id2',
+    }
+
+    def run(con, model, incremental):
+        detector_cls, config_cls = detectors[model]
+        config = config_cls(incremental_mode=incremental, output_dir=str(tmp_path / 'out' / model))
+        return detector_cls(config).detect(str(workbook), con)
+
+    def published(con):
+        store = ResultsStore(con)
+        return {
+            (model, name): store.read_frame(model, name)
+            for model in detectors for name in RESULT_FRAMES[model]
+        }
+
+    def candidates(con, model):
+        return con.execute(f'SELECT * FROM "incr_{model}_candidates" ORDER BY {candidate_order[model]}').fetchdf()
+
+    with _isolated_data_manager(tmp_path) as make:
+        dm = make(workbook)
+        dm.seed_full_and_model(year=2025, month=2)
+        con = dm.get_connection(persistent=True)
+        try:
+            for model in detectors:
+                run(con, model, incremental=True)  # 워터마크 없음 -> 전체 후보 저장
+
+            for step in range(3):
+                dm.advance_model_by_days(days=4, hours=5)
+                totals = {}
+                for model in detectors:
+                    totals[model] = run(con, model, incremental=True)['total_candidates']
+                incremental = published(con)
+                for model in detectors:
+                    assert run(con, model, incremental=False)['total_candidates'] == totals[model]
+                full = published(con)
+                for key, frame in incremental.items():
+                    if frame is None:
+                        assert full[key] is None, key
+                    else:
+                        pd.testing.assert_frame_equal(frame, full[key], obj=str(key))
+                print(f"✓ 진행 {step + 1}: 후보 {totals} - 증분 결과 == 전체 결과")
+            assert all(totals.values()) and all(frame is not None for frame in incremental.values())
+
+            # 누적 병합된 후보 테이블 == 처음부터 다시 계산한 후보 테이블
+            merged = {model: candidates(con, model) for model in detectors}
+            reset_incremental_state(con)
+            for model in detectors:
+                run(con, model, incremental=True)
+                pd.testing.assert_frame_equal(merged[model], candidates(con, model), obj=model)
+            print(f"✓ 누적 병합 후보 == 재계산 후보 ({ {m: len(f) for m, f in merged.items()} })")
+        finally:
+            dm.close_connection()
+
+
+def test_parquet_cache(tmp_path):
+    """Parquet 적재 캐시: 재시작 시 적중, 원본 변경(sha256/mtime/size) 시 무효화 후 재기록"""
+    print_section("Parquet 적재 캐시 테스트")
+    import json
+
+    workbook = tmp_path / 'data.xlsx'
+    trades = pd.DataFrame({
+        'ts': pd.date_range('2025-02-01', periods=6, freq='h'),
+        'account_id': [f"A{i % 3}" for i in range(6)],
+        'amount': np.arange(6, dtype=float),
+    })
+    rewards = pd.DataFrame({'ts': pd.date_range('2025-02-01', periods=2, freq='D'),
+                            'account_id': ['A0', 'A1'], 'reward_amount': [10.0, 20.0]})
+    _write_workbook(workbook, {'Trade': trades, 'Reward': rewards})
+
+    with _isolated_data_manager(tmp_path) as make:
+        cache_dir = tmp_path / 'data' / 'cache'
+        manifest_path = cache_dir / 'manifest.json'
+
+        def manifest():
+            return json.loads(manifest_path.read_text(encoding='utf-8'))
+
+        def sources(dm):
+            return {name: (m['source'], m['rows']) for name, m in dm.get_load_metrics().items()}
+
+        # 1) 첫 로드: Excel 파싱 후 시트별 Parquet + manifest 기록
+        dm = make(workbook)
+        assert sources(dm) == {'Trade': ('excel', 6), 'Reward': ('excel', 2)}
+        first = manifest()
+        assert first['size'] == workbook.stat().st_size and first['mtime'] == workbook.stat().st_mtime
+        assert sorted(first['sheets']) == ['Reward', 'Trade'] and first['sheets']['Trade']['rows'] == 6
+        files = {p.name for p in cache_dir.glob('*.parquet')}
+        assert files == {entry['file'] for entry in first['sheets'].values()}
+        import duckdb
+        cached = duckdb.connect().execute(
+            'SELECT * FROM read_parquet(?)', [str(cache_dir / first['sheets']['Trade']['file'])]
+        ).fetchdf()
+        assert cached['amount'].tolist() == trades['amount'].tolist()
+        assert cached['account_id'].tolist() == trades['account_id'].tolist()
+        print("✓ 첫 로드: excel -> Parquet 캐시 기록")
+
+        # 2) 재시작: Parquet 캐시 적중 (Excel 파싱 없음)
+        dm = make(workbook)
+        assert sources(dm) == {'Trade': ('parquet', 6), 'Reward': ('parquet', 2)}
+        assert dm._parquet_sources['Trade'].name == first['sheets']['Trade']['file']
+        assert {p.name for p in cache_dir.glob('*.parquet')} == files
+        print("✓ 재시작: Parquet 캐시 적중")
+
+        # 3) mtime만 변경 (내용 동일): 해시 재계산 결과가 같으므로 캐시 유지, manifest mtime 갱신
+        stat = workbook.stat()
+        os.utime(workbook, (stat.st_atime, stat.st_mtime + 60))
+        dm = make(workbook)
+        assert sources(dm) == {'Trade': ('parquet', 6), 'Reward': ('parquet', 2)}
+        assert manifest()['mtime'] == stat.st_mtime + 60 and manifest()['sha256'] == first['sha256']
+        print("✓ mtime 변경 + 동일 내용: 해시 재계산 후 캐시 유지")
+
+        # 4) mtime 변경 시 해시를 다시 계산하므로 manifest의 sha256과 다르면 무효화
+        stale = dict(manifest(), sha256='0' * 64)
+        manifest_path.write_text(json.dumps(stale), encoding='utf-8')
+        dm = make(workbook)
+        assert sources(dm) == {'Trade': ('parquet', 6), 'Reward': ('parquet', 2)}  # mtime/size 같으면 해시 생략
+        manifest_path.write_text(json.dumps(stale), encoding='utf-8')
+        os.utime(workbook, (stat.st_atime, stat.st_mtime + 120))
+        dm = make(workbook)
+        assert sources(dm) == {'Trade': ('excel', 6), 'Reward': ('excel', 2)}
+        assert manifest()['sha256'] == first['sha256']
+        assert {p.name for p in cache_dir.glob('*.parquet')} == files
+        print("✓ sha256 불일치: 캐시 무효화 후 재기록")
+
+        # 5) 내용/크기 변경: 새 해시의 Parquet 파일로 교체, 이전 파일 삭제
+        _write_workbook(workbook, {'Trade': pd.concat([trades, trades], ignore_index=True), 'Reward': rewards})
+        assert workbook.stat().st_size != first['size']
+        dm = make(workbook)
+        assert sources(dm) == {'Trade': ('excel', 12), 'Reward': ('excel', 2)}
+        second = manifest()
+        assert second['sha256'] != first['sha256'] and second['size'] == workbook.stat().st_size
+        new_files = {p.name for p in cache_dir.glob('*.parquet')}
+        assert new_files == {entry['file'] for entry in second['sheets'].values()}
+        assert not new_files & files
+        dm = make(workbook)
+        assert sources(dm) == {'Trade': ('parquet', 12), 'Reward': ('parquet', 2)}
+        print("✓ 원본 내용/크기 변경: 새 Parquet 기록 + 이전 파일 정리, 다음 로드는 적중")
+
+
+def test_streaming_ingest(tmp_path):
+    """스트리밍 적재: 배치 여러 개(중간에 타입 확장) == 한 번에 읽은 시트"""
+    print_section("스트리밍 적재 테스트")
+    import duckdb
+
+    workbook = tmp_path / 'data.xlsx'
+    n = 10
+    trades = pd.DataFrame({
+        'ts': pd.date_range('2025-02-01', periods=n, freq='min'),
+        'account_id': [f"A{i % 3}" for i in range(n)],
+        'side': ['LONG', 'SHORT'] * (n // 2),
+        # 첫 배치는 정수 -> 이후 배치에서 소수/결측 등장 (BIGINT -> DOUBLE)
+        'amount': [10, 20, 30, 40, 50, 12.5, 70, 80, 90, 100],
+        'leverage': [5, 5, 10, 10, 20, None, 20, 5, 5, 10],
+        # 스키마에 없는 컬럼: 정수 -> 문자열 (BIGINT -> VARCHAR)
+        'memo': [1, 2, 3, 4, 'x', 6, 'y', 8, 9, 10],
+    })
+    _write_workbook(workbook, {'Trade': trades})
+
+    with _isolated_data_manager(tmp_path) as make:
+        dm = make(workbook, ingest_mode='streaming', chunk_rows=4)
+        assert dm._stream_sources == {'Trade': workbook}
+        batches = list(dm._iter_sheet_batches('Trade'))
+        assert [len(b) for b in batches] == [4, 4, 2]
+        assert str(batches[0]['amount'].dtype) == 'int64' and str(batches[1]['amount'].dtype) == 'float64'
+
+        con = duckdb.connect()
+        assert dm._stream_into_table(con, 'Trade', 'streamed') == n
+        types = {r[0]: r[1] for r in con.execute('DESCRIBE streamed').fetchall()}
+        assert types['amount'] == 'DOUBLE' and types['leverage'] == 'DOUBLE' and types['memo'] == 'VARCHAR'
+        print(f"✓ 배치 {[len(b) for b in batches]} 적재, 타입 확장: {types}")
+
+        # 한 번에 읽은 시트와 행 수/값 비교 (타입 지정 후)
+        dm.chunk_rows = n
+        assert dm._stream_into_table(con, 'Trade', 'single') == n
+        dm._create_typed_full_table(con, 'Trade', 'streamed_typed', 'streamed')
+        dm._create_typed_full_table(con, 'Trade', 'single_typed', 'single')
+        streamed = con.execute('SELECT * FROM streamed_typed').fetchdf()
+        single = con.execute('SELECT * FROM single_typed').fetchdf()
+        pd.testing.assert_frame_equal(streamed, single)
+
+        expected = pd.read_excel(workbook, sheet_name='Trade', engine='openpyxl')
+        assert streamed['amount'].tolist() == expected['amount'].astype(float).tolist()
+        assert streamed['leverage'].isna().tolist() == expected['leverage'].isna().tolist()
+        assert streamed['leverage'].dropna().tolist() == expected['leverage'].dropna().tolist()
+        assert streamed['memo'].tolist() == expected['memo'].astype(str).tolist()
+        assert streamed['ts'].tolist() == expected['ts'].tolist()
+        print("✓ 스트리밍 적재 == 한 번에 읽은 결과")
+
+
+def test_typed_full_table_retype(tmp_path):
+    """기존(타입 없는) full_data_ 테이블 재타입: 스키마 타입 + 시간 정렬, 변환 실패 값은 집계"""
+    print_section("full_data_ 테이블 재타입 테스트")
+    import duckdb
+
+    con = duckdb.connect()
+    con.execute("""
+        CREATE TABLE full_data_trade AS SELECT * FROM (VALUES
+            ('2025-02-01 00:02:00', 'A2', 'SHORT', '30.5', '10', 'memo-1'),
+            ('2025-02-01 00:00:00', 'A1', 'LONG', '10', 'x', 'memo-2'),
+            ('not-a-date', 'A3', 'LONG', '5', '5', NULL),
+            ('2025-02-01 00:01:00', 'A1', NULL, 'n/a', '20', 'memo-3')
+        ) t(ts, account_id, side, amount, leverage, memo)
+    """)
+
+    with _isolated_data_manager(tmp_path) as make:
+        dm = make(tmp_path / 'missing.xlsx')
+        dm._ensure_typed_full_table(con, 'Trade', 'full_data_trade')
+        types = {r[0]: r[1] for r in con.execute('DESCRIBE full_data_trade').fetchall()}
+        assert types['ts'] == 'TIMESTAMP' and types['account_id'] == 'VARCHAR'
+        assert types['side'] == "ENUM('LONG', 'SHORT')"
+        assert types['amount'] == 'DOUBLE' and types['leverage'] == 'DOUBLE' and types['memo'] == 'VARCHAR'
+        print(f"✓ 컬럼 타입 정규화: {types}")
+
+        rows = con.execute('SELECT account_id, amount, leverage, memo FROM full_data_trade').fetchall()
+        assert rows == [('A1', 10.0, None, 'memo-2'), ('A1', None, 20.0, 'memo-3'),
+                        ('A2', 30.5, 10.0, 'memo-1'), ('A3', 5.0, 5.0, None)]  # ts 순, NULL ts는 마지막
+        assert dm.cast_nulls['Trade'] == {'ts': 1, 'amount': 1, 'leverage': 1}
+        print(f"✓ 시간 정렬 + 변환 실패 집계: {dm.cast_nulls['Trade']}")
+
+        # 이미 타입이 맞으면 다시 쓰지 않음
+        dm.cast_nulls.clear()
+        dm._ensure_typed_full_table(con, 'Trade', 'full_data_trade')
+        assert dm.cast_nulls == {}
+        print("✓ 타입이 맞는 테이블은 그대로 유지")
+
+
+def main():
+    """메인 테스트 실행"""
+    test_wash_filter_engine_parity()
+    test_wash_filter_pushdown()
+    test_wash_scoring_engine_parity()
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_wash_bonus_asof(Path(tmp))
+    test_wash_network_chains()
+    test_wash_pair_index()
+    test_funding_scoring_engine_parity()
+    test_funding_filter_pushdown()
+    test_funding_account_rollup()
+    test_coop_scoring_engine_parity()
+    test_coop_find_groups_components()
+    test_coop_band_join_parity()
+    test_funding_cumulative_window()
+    test_materialized_refresh()
+    test_spec_index_asof()
+    test_first_trade_times()
+    test_sanction_registry()
+    test_results_store()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_empty_run_clears_results(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_aggregator_generation_cache(Path(tmp))
+    test_detection_index_pages()
+    test_account_trade_pages()
+    test_ip_index()
+    test_detection_dag()
+    test_detector_write_scopes()
+    test_job_runner()
+    test_simulation_job_endpoints()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_parquet_cache(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_streaming_ingest(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_typed_full_table_retype(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_incremental_detection_parity(Path(tmp))
+    print("\n✓ 모든 테스트 통과")
+
+
+if __name__ == "__main__":
+    main()
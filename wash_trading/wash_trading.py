@@ -8,11 +8,12 @@ Author: Singapore Fintech Hackathon Team
 - Tier 2 (Manual): 느슨한 패턴 → 네트워킹 분석 → 반복 시 제재
 """
 
+import numpy as np
 import pandas as pd
 import duckdb as dd
 import json
 from dataclasses import dataclass, field, asdict
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
 from enum import Enum
@@ -20,11 +21,21 @@ import logging
 # detectors read model tables directly from persistent DuckDB file created by main
 from collections import defaultdict
 from common.data_manager import get_data_manager
+from common.materialized import ensure_positions
+from common.incremental import IncrementalState
+from common.filter_pushdown import FilterSet, SqlFilter, log_filter_failures
+from common.results_store import ResultsStore
+from common.scoring import apply_scores, feature_frame
 
 # ============================================================================
 # 1. CONFIGURATION & TYPES
 # ============================================================================
 
+# 후보 쌍 SQL 조건 (증분 모드 lookback 마진에도 사용)
+CANDIDATE_OPEN_WINDOW_MIN = 5             # 두 거래의 오픈 시간 차이 (분)
+CANDIDATE_AMOUNT_DIFF_RATIO = 0.1         # 두 거래의 금액 차이 비율
+CANDIDATE_ORDER_BY = "time_since_bonus_hours ASC, open_time_diff_sec ASC"
+
 class TierType(Enum):
     """탐지 Tier 분류"""
     BOT = "BOT"                    # 봇 기반 악의적 거래
@@ -64,6 +75,12 @@ class DetectionConfig:
     min_profit_occurrences: int = 3       # 제재 대상 최소 수익 횟수
     max_network_depth: int = 5            # 네트워크 탐색 최대 깊이
     
+    # ===== Execution Settings =====
+    incremental_mode: bool = False        # 이전 실행 이후 변경된 포지션만 후보 재계산
+    vectorized_filters: bool = True       # 후보 DataFrame에 컬럼 단위(마스크)로 필터 적용
+    filter_pushdown: bool = True          # 필터를 후보 SQL의 WHERE로 실행 (DuckDB가 통과 행만 반환)
+    explain_filter_failures: bool = False # pushdown 시 실패 행과 실패 사유도 반환 (감사용)
+    
     # ===== Output Settings =====
     output_dir: str = "output/bonus"
     enable_detailed_logging: bool = True
@@ -272,23 +289,20 @@ class PositionBuilder:
         """포지션별 집계 데이터 생성"""
         print("포지션 데이터 구성 중...")
         
+        ensure_positions(self.con)
         query = """
         SELECT 
             account_id,
             position_id,
-            MAX(leverage) AS leverage,
-            CAST(MIN(ts) AS TIMESTAMP) as open_ts,
-            CAST(MAX(ts) AS TIMESTAMP) as close_ts,
-            MAX(symbol) as symbol, 
-            MAX(side) as side,
-            SUM(CASE WHEN openclose='OPEN' THEN amount ELSE 0 END) as amount,
-            SUM(
-                CASE WHEN openclose='OPEN' THEN -amount ELSE amount END * 
-                CASE WHEN side='LONG' THEN 1 ELSE -1 END
-            ) as pnl
-        FROM Trade
-        GROUP BY account_id, position_id
-        HAVING pnl != 0
+            leverage,
+            open_ts,
+            close_ts,
+            symbol, 
+            side,
+            amount,
+            rpnl AS pnl
+        FROM positions
+        WHERE rpnl != 0
         ORDER BY open_ts
         """
         
@@ -304,7 +318,7 @@ class PositionBuilder:
         query = """
         SELECT 
             account_id, 
-            CAST(ts AS TIMESTAMP) as bonus_ts, 
+            ts as bonus_ts, 
             reward_amount
         FROM Reward
         ORDER BY bonus_ts
@@ -326,12 +340,152 @@ class FilterEngine:
     def __init__(self, config: DetectionConfig):
         self.config = config
     
-    def apply_filters(self, candidate_pairs: List[Dict]) -> Tuple[List[TradePair], List[Dict]]:
+    def sql_filters(self) -> FilterSet:
+        """
+        5개 필수 조건의 SQL 필터 (apply_filters와 동일한 판정을 DuckDB에서 실행)
+        
+        목록 순서 = 실패 비트마스크의 비트 위치 (failure_mask / filter_failure_mask 공통)
+        """
+        config = self.config
+        return FilterSet([
+            SqlFilter(
+                "time_since_bonus",
+                "time_since_bonus_hours >= 0 AND time_since_bonus_hours <= $time_since_bonus_hours",
+                {'time_since_bonus_hours': float(config.time_since_bonus_hours)},
+            ),
+            SqlFilter(
+                "reverse_position",
+                "loser_side != winner_side AND loser_side IN ('LONG', 'SHORT') AND winner_side IN ('LONG', 'SHORT')",
+            ),
+            SqlFilter("equal_leverage", "loser_leverage = winner_leverage AND loser_leverage > 0"),
+            SqlFilter(
+                "concurrency",
+                "open_time_diff_sec <= $concurrency_threshold_sec AND close_time_diff_sec <= $concurrency_threshold_sec",
+                {'concurrency_threshold_sec': float(config.concurrency_threshold_sec)},
+            ),
+            SqlFilter(
+                "quantity_match",
+                "amount_diff_ratio <= $quantity_tolerance_pct",
+                {'quantity_tolerance_pct': float(config.quantity_tolerance_pct)},
+            ),
+        ])
+    
+    def failure_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        후보 DataFrame 전체에 5개 필터를 마스크로 평가
+        
+        Returns:
+            행별 실패 비트마스크 (bit i = sql_filters().names[i] 실패, 0이면 모두 통과)
+        """
+        n = len(df)
+        
+        def column(name: str, default) -> np.ndarray:
+            if name in df.columns:
+                return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            return np.full(n, default, dtype=float)
+        
+        def side(name: str) -> np.ndarray:
+            if name in df.columns:
+                return df[name].astype(object).to_numpy()
+            return np.full(n, '', dtype=object)
+        
+        # NaN 비교는 False -> 행 단위 엔진과 동일하게 실패 처리
+        hours = column('time_since_bonus_hours', 0)
+        loser_side, winner_side = side('loser_side'), side('winner_side')
+        loser_lev, winner_lev = column('loser_leverage', 0), column('winner_leverage', 0)
+        open_diff, close_diff = column('open_time_diff_sec', np.inf), column('close_time_diff_sec', np.inf)
+        diff_ratio = column('amount_diff_ratio', np.inf)
+        threshold = self.config.concurrency_threshold_sec
+        valid_sides = ['LONG', 'SHORT']
+        
+        passed = {
+            "time_since_bonus": (hours >= 0) & (hours <= self.config.time_since_bonus_hours),
+            "reverse_position": (loser_side != winner_side) & pd.Series(loser_side).isin(valid_sides).to_numpy()
+                & pd.Series(winner_side).isin(valid_sides).to_numpy(),
+            "equal_leverage": (loser_lev == winner_lev) & (loser_lev > 0),
+            "concurrency": (open_diff <= threshold) & (close_diff <= threshold),
+            "quantity_match": diff_ratio <= self.config.quantity_tolerance_pct,
+        }
+        
+        mask = np.zeros(n, dtype=np.uint8)
+        for bit, name in enumerate(self.sql_filters().names):
+            mask |= (~passed[name]).astype(np.uint8) << bit
+        return mask
+    
+    def apply_filters_frame(self, candidates: pd.DataFrame) -> Tuple[List[TradePair], pd.DataFrame]:
+        """
+        컬럼 단위 필터 적용 (apply_filters와 동일한 판정)
+        
+        Returns:
+            (통과한 TradePair 리스트,
+             실패 행 DataFrame - 원본 컬럼 + pair_id, filter_failures, filter_failure_mask)
+        """
+        print("필터 엔진 시작 (벡터화)...")
+        
+        candidates = candidates.reset_index(drop=True)
+        mask = self.failure_mask(candidates)
+        passed_pairs, failed_data = self._split_by_mask(candidates, mask, np.arange(len(candidates)))
+        print(f"필터 완료: {len(passed_pairs)}/{len(candidates)} 통과")
+        
+        return passed_pairs, failed_data
+    
+    def apply_filters_pushdown(self, candidates: pd.DataFrame, total: int) -> Tuple[List[TradePair], pd.DataFrame]:
+        """
+        SQL 필터 결과(FilterSet.fetch)로 TradePair 생성
+        
+        Args:
+            candidates: candidate_idx (+ explain 시 filter_failure_mask) 컬럼이 붙은 후보
+            total: 필터 전 전체 후보 수
+        
+        Returns:
+            apply_filters_frame과 같은 형식 (explain이 아니면 실패 행 DataFrame은 비어 있음)
+        """
+        print("필터 엔진 시작 (SQL)...")
+        
+        candidates = candidates.reset_index(drop=True)
+        if 'filter_failure_mask' in candidates.columns:
+            mask = candidates.pop('filter_failure_mask').to_numpy(dtype=np.uint8)
+        else:
+            mask = np.zeros(len(candidates), dtype=np.uint8)
+        candidate_idx = candidates.pop('candidate_idx').to_numpy(dtype=np.int64)
+        
+        passed_pairs, failed_data = self._split_by_mask(candidates, mask, candidate_idx)
+        print(f"필터 완료: {len(passed_pairs)}/{total} 통과")
+        
+        return passed_pairs, failed_data
+    
+    def _split_by_mask(
+        self, candidates: pd.DataFrame, mask: np.ndarray, candidate_idx: np.ndarray
+    ) -> Tuple[List[TradePair], pd.DataFrame]:
+        """실패 비트마스크로 통과 행(TradePair)과 실패 행(DataFrame) 분리 (pair_id = PAIR_{candidate_idx})"""
+        passed = mask == 0
+        
+        # 통과한 행만 TradePair 생성
+        passed_pairs = []
+        for idx, row in zip(candidate_idx[passed].tolist(), candidates[passed].to_dict('records')):
+            trade_pair = self._create_trade_pair(f"PAIR_{idx:06d}", row)
+            trade_pair.passed_filter = True
+            passed_pairs.append(trade_pair)
+        
+        # 실패 행은 DataFrame으로 유지, 실패 이름은 서로 다른 마스크마다 한 번만 계산
+        failed_mask = mask[~passed]
+        codes, uniques = pd.factorize(failed_mask)
+        filters = self.sql_filters()
+        names = np.empty(len(uniques), dtype=object)
+        names[:] = [filters.failure_names(int(m)) for m in uniques]
+        failed_data = candidates[~passed].reset_index(drop=True)
+        failed_data['pair_id'] = 'PAIR_' + pd.Series(candidate_idx[~passed]).astype(str).str.zfill(6)
+        failed_data['filter_failures'] = names[codes]
+        failed_data['filter_failure_mask'] = failed_mask
+        
+        return passed_pairs, failed_data
+    
+    def apply_filters(self, candidate_pairs: List[Dict]) -> Tuple[List[TradePair], pd.DataFrame]:
         """
         필터 적용 및 TradePair 객체 생성
         
         Returns:
-            (통과한 TradePair 리스트, 실패한 원본 데이터 리스트)
+            (통과한 TradePair 리스트, 실패 행 DataFrame - apply_filters_frame과 같은 형식)
         """
         print("필터 엔진 시작...")
         
@@ -379,7 +533,14 @@ class FilterEngine:
         
         print(f"필터 완료: {len(passed_pairs)}/{len(candidate_pairs)} 통과")
         
-        return passed_pairs, failed_data
+        columns = None if failed_data else [*(candidate_pairs[0] if candidate_pairs else {}), 'pair_id', 'filter_failures']
+        failed_frame = pd.DataFrame(failed_data, columns=columns)
+        bits = {name: 1 << bit for bit, name in enumerate(self.sql_filters().names)}
+        failed_frame['filter_failure_mask'] = np.array(
+            [sum(bits[name] for name in names) for names in failed_frame['filter_failures']], dtype=np.uint8
+        )
+        
+        return passed_pairs, failed_frame
     
     def _check_time_since_bonus(self, row: Dict) -> bool:
         """보너스 후 72시간 이내 확인"""
@@ -450,146 +611,99 @@ class ScoringEngine:
     def __init__(self, config: DetectionConfig):
         self.config = config
     
+    # score_frame 입력 컬럼 (TradePair 필드명과 동일)
+    FEATURE_COLUMNS = (
+        'loser_pnl', 'winner_pnl', 'open_time_diff_sec', 'close_time_diff_sec', 'amount_diff_pct',
+        'loser_amount', 'loser_leverage', 'loser_deposit', 'linked_bonus',
+    )
+    SCORE_COLUMNS = ('pnl_mirroring', 'high_concurrency', 'quantity_match', 'trade_value_ratio', 'total')
+    
     def score_all_pairs(self, pairs: List[TradePair]) -> List[TradePair]:
-        """모든 거래 쌍 점수 계산"""
+        """모든 거래 쌍 점수 계산 (score_frame 배치 계산 결과를 객체에 반영)"""
         print("점수 엔진 시작...")
         
-        for pair in pairs:
-            # 각 지표별 점수 계산
-            pnl_score = self._score_pnl_mirroring(pair)
-            conc_score = self._score_high_concurrency(pair)
-            qty_score = self._score_quantity_match(pair)
-            ratio_score = self._score_trade_value_ratio(pair)
-            
-            # 점수 저장
-            pair.score = ScoreBreakdown(
-                pnl_mirroring=pnl_score,
-                high_concurrency=conc_score,
-                quantity_match=qty_score,
-                trade_value_ratio=ratio_score,
-                total=pnl_score + conc_score + qty_score + ratio_score
-            )
-            
-            # Tier 분류
-            pair.tier = self._classify_tier(pair.score.total)
-            
-            # if self.config.enable_detailed_logging:
-            #     print(
-            #         f"{pair.pair_id}: 점수={pair.score.total:.1f} "
-            #         f"(PnL:{pnl_score:.1f}, Conc:{conc_score:.1f}, "
-            #         f"Qty:{qty_score:.1f}, Ratio:{ratio_score:.1f}) "
-            #         f"→ {pair.tier.value}"
-            #     )
+        scores = self.score_frame(feature_frame(pairs, self.FEATURE_COLUMNS))
+        apply_scores(pairs, scores, ScoreBreakdown, self.SCORE_COLUMNS, 'tier', TierType)
         
         print(f"점수 계산 완료: {len(pairs)}개")
         
         return pairs
     
-    def _score_pnl_mirroring(self, pair: TradePair) -> float:
-        """
-        P&L 대칭성 점수 (40점)
-        완벽한 헤징: PnL_A + PnL_B ≈ 0
+    def score_frame(self, features: pd.DataFrame) -> pd.DataFrame:
         """
-        max_weight = self.config.weight_pnl_mirroring
+        배치 점수 계산 (항목별 구간 점수와 Tier 임계값을 np.select로 배열 단위 적용)
         
-        total_pnl = pair.loser_pnl + pair.winner_pnl
-        max_pnl = max(abs(pair.loser_pnl), abs(pair.winner_pnl))
+        점수 규칙은 여기에만 정의 (score_all_pairs도 이 결과를 TradePair에 반영)
         
-        if max_pnl == 0:
-            return 0.0
+        Args:
+            features: FEATURE_COLUMNS 컬럼을 가진 DataFrame
         
-        # 대칭 비율: 0에 가까울수록 완벽
-        asymmetry_ratio = abs(total_pnl) / max_pnl
-        
-        if asymmetry_ratio <= 0.01:  # 1% 이내: 거의 완벽
-            return max_weight
-        elif asymmetry_ratio <= 0.05:  # 5% 이내: 매우 좋음
-            return max_weight * 0.85
-        elif asymmetry_ratio <= 0.10:  # 10% 이내: 좋음
-            return max_weight * 0.65
-        elif asymmetry_ratio <= 0.20:  # 20% 이내: 보통
-            return max_weight * 0.40
-        else:
-            return max_weight * 0.10
-    
-    def _score_high_concurrency(self, pair: TradePair) -> float:
-        """
-        시간 근접도 점수 (25점)
-        오픈/클로즈 평균 시간차
-        """
-        max_weight = self.config.weight_high_concurrency
-        
-        avg_time_diff = (pair.open_time_diff_sec + pair.close_time_diff_sec) / 2
-        
-        if avg_time_diff <= 0.1:  # 0.1초 이내: 봇
-            return max_weight
-        elif avg_time_diff <= 1.0:  # 1초 이내: 매우 의심
-            return max_weight * 0.90
-        elif avg_time_diff <= 5.0:  # 5초 이내: 의심
-            return max_weight * 0.70
-        elif avg_time_diff <= 10.0:  # 10초 이내
-            return max_weight * 0.45
-        elif avg_time_diff <= 20.0:  # 20초 이내
-            return max_weight * 0.25
-        else:  # 30초 이내 (필터 통과 범위)
-            return max_weight * 0.10
-    
-    def _score_quantity_match(self, pair: TradePair) -> float:
-        """
-        수량 일치도 점수 (20점)
-        """
-        max_weight = self.config.weight_quantity_match
-        
-        diff_pct = pair.amount_diff_pct
-        
-        if diff_pct <= 0.1:  # 0.1% 이내: 거의 완벽
-            return max_weight
-        elif diff_pct <= 0.5:  # 0.5% 이내: 매우 좋음
-            return max_weight * 0.85
-        elif diff_pct <= 1.0:  # 1% 이내: 좋음
-            return max_weight * 0.65
-        elif diff_pct <= 1.5:  # 1.5% 이내: 보통
-            return max_weight * 0.40
-        else:  # 2% 이내 (필터 통과 범위)
-            return max_weight * 0.20
-    
-    def _score_trade_value_ratio(self, pair: TradePair) -> float:
-        """
-        보너스 대비 거래액 점수 (15점)
-        거래 증거금 / (입금액 + 보너스) 비율
+        Returns:
+            SCORE_COLUMNS + tier(TierType 값) 컬럼 DataFrame (features와 같은 index)
         """
-        max_weight = self.config.weight_trade_value_ratio
-        
-        # 거래 증거금 = amount / leverage
-        loser_margin = pair.loser_amount / pair.loser_leverage if pair.loser_leverage > 0 else 0
-        loser_capital = pair.loser_deposit + pair.linked_bonus
-        
-        if loser_capital == 0:
-            return 0.0
+        c = self.config
+        col = lambda name: features[name].to_numpy(dtype=float)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # P&L 대칭성 (40점): 완벽한 헤징이면 PnL_A + PnL_B ≈ 0
+            # |합| / max|PnL| 1% 이내 거의 완벽, 5% 매우 좋음, 10% 좋음, 20% 보통
+            loser_pnl, winner_pnl = col('loser_pnl'), col('winner_pnl')
+            max_pnl = np.maximum(np.abs(loser_pnl), np.abs(winner_pnl))
+            asymmetry = np.abs(loser_pnl + winner_pnl) / max_pnl
+            w = c.weight_pnl_mirroring
+            pnl = np.select(
+                [max_pnl == 0, asymmetry <= 0.01, asymmetry <= 0.05, asymmetry <= 0.10, asymmetry <= 0.20],
+                [0.0, w, w * 0.85, w * 0.65, w * 0.40],
+                w * 0.10,
+            )
+            
+            # 시간 근접도 (25점): 오픈/클로즈 평균 시간차
+            # 0.1초 이내 봇, 1초 매우 의심, 5초 의심, 10초, 20초, 그 외 필터 통과 범위(30초)
+            avg_diff = (col('open_time_diff_sec') + col('close_time_diff_sec')) / 2
+            w = c.weight_high_concurrency
+            conc = np.select(
+                [avg_diff <= 0.1, avg_diff <= 1.0, avg_diff <= 5.0, avg_diff <= 10.0, avg_diff <= 20.0],
+                [w, w * 0.90, w * 0.70, w * 0.45, w * 0.25],
+                w * 0.10,
+            )
+            
+            # 수량 일치도 (20점): 0.1% 이내 거의 완벽, 0.5% 매우 좋음, 1% 좋음, 1.5% 보통, 그 외 2% 이내
+            diff_pct = col('amount_diff_pct')
+            w = c.weight_quantity_match
+            qty = np.select(
+                [diff_pct <= 0.1, diff_pct <= 0.5, diff_pct <= 1.0, diff_pct <= 1.5],
+                [w, w * 0.85, w * 0.65, w * 0.40],
+                w * 0.20,
+            )
+            
+            # 보너스 대비 거래액 (15점): 증거금(amount / leverage) / (입금액 + 보너스)
+            # 95% 이상 올인, 80%, 60%, 40% 이상
+            leverage = col('loser_leverage')
+            margin = np.where(leverage > 0, col('loser_amount') / leverage, 0.0)
+            capital = col('loser_deposit') + col('linked_bonus')
+            value_ratio = margin / capital
+            w = c.weight_trade_value_ratio
+            ratio = np.select(
+                [capital == 0, value_ratio >= 0.95, value_ratio >= 0.80, value_ratio >= 0.60, value_ratio >= 0.40],
+                [0.0, w, w * 0.75, w * 0.50, w * 0.25],
+                0.0,
+            )
         
-        ratio = loser_margin / loser_capital
+        total = pnl + conc + qty + ratio
+        tier = np.select(
+            [total >= c.bot_tier_threshold, total >= c.manual_tier_threshold, total >= c.suspicious_threshold],
+            [TierType.BOT.value, TierType.MANUAL.value, TierType.SUSPICIOUS.value],
+            TierType.NORMAL.value,
+        )
         
-        if ratio >= 0.95:  # 95% 이상: 올인
-            return max_weight
-        elif ratio >= 0.80:  # 80% 이상
-            return max_weight * 0.75
-        elif ratio >= 0.60:  # 60% 이상
-            return max_weight * 0.50
-        elif ratio >= 0.40:  # 40% 이상
-            return max_weight * 0.25
-        else:
-            return 0.0
-    
-    def _classify_tier(self, total_score: float) -> TierType:
-        """점수 기반 Tier 분류"""
-        if total_score >= self.config.bot_tier_threshold:
-            return TierType.BOT
-        elif total_score >= self.config.manual_tier_threshold:
-            return TierType.MANUAL
-        elif total_score >= self.config.suspicious_threshold:
-            return TierType.SUSPICIOUS
-        else:
-            return TierType.NORMAL
+        return pd.DataFrame({
+            'pnl_mirroring': pnl,
+            'high_concurrency': conc,
+            'quantity_match': qty,
+            'trade_value_ratio': ratio,
+            'total': total,
+            'tier': tier,
+        }, index=features.index)
 
 
 # ============================================================================
@@ -642,56 +756,147 @@ class NetworkAnalyzer:
         
         return self.profit_network
     
-    def find_network_chains(self) -> List[List[str]]:
+    def find_longest_chains_per_source(self) -> List[List[str]]:
         """
-        연결된 계정 체인 탐지 (A → B → C)
+        시작 그룹마다 최장 계정 체인 1개 탐지 (A → B → C)
+        
+        수익 계정 그래프(winner → 다른 거래에서도 winner인 loser)를 강연결요소(SCC)로 축약하고,
+        후속 요소부터 계정별 최장 체인을 메모이제이션으로 계산. 들어오는 연결이 없는 시작 요소마다
+        가장 긴 체인 1개만 반환 (모든 극대 체인을 나열하지 않음).
+        
+        체인의 연속한 두 계정은 항상 실제 간선이고 길이는 max_network_depth 계정으로 제한됨.
+        순환 그룹(SCC) 안에서는 방문하지 않은 계정을 따라 단순 경로로 진행하므로, 최장 보장은
+        요소 사이(DAG) 구간까지이고 순환 그룹 내부 경로는 탐욕적으로 선택됨.
         
         Returns:
             계정 체인 리스트 (예: [['A', 'B', 'C'], ['D', 'E']])
         """
         print("계정 체인 탐색 중...")
         
+        # 수익 계정 -> 번호 (네트워크 구성 순서), 간선: winner -> (winner이기도 한) loser
+        accounts = list(self.profit_network.keys())
+        order = {acc: i for i, acc in enumerate(accounts)}
+        graph = [
+            sorted(order[loser] for loser in self.profit_network[acc].connected_losers if loser in order)
+            for acc in accounts
+        ]
+        
+        # SCC 축약 (Tarjan은 후속 요소를 먼저 반환 -> 그 순서대로 최장 경로 계산 가능)
+        components = self._strongly_connected_components(graph)
+        component_of = [0] * len(accounts)
+        for cid, members in enumerate(components):
+            for v in members:
+                component_of[v] = cid
+        
+        # 계정별 체인 = prefix(자기 요소 안의 단순 경로) + exit_to(다음 요소 계정, 없으면 -1)에서 시작하는 체인
+        max_depth = self.config.max_network_depth
+        best = [0] * len(accounts)             # 계정에서 시작하는 최장 체인 길이 (max_depth 상한)
+        prefix: List[List[int]] = [[] for _ in accounts]
+        exit_to = [-1] * len(accounts)
+        has_incoming = [False] * len(components)
+        
+        for cid, members in enumerate(components):
+            # 계정별로 요소 밖으로 나가는 가장 긴 연결 (후속 요소는 이미 계산됨)
+            out_len, out_to = {}, {}
+            for v in members:
+                out_len[v], out_to[v] = 0, -1
+                for w in graph[v]:
+                    if component_of[w] == cid:
+                        continue
+                    has_incoming[component_of[w]] = True
+                    if best[w] > out_len[v]:
+                        out_len[v], out_to[v] = best[w], w
+            
+            for v in members:
+                # 요소 안에서 방문하지 않은 계정을 따라 단순 경로 (단일 계정 요소면 [v])
+                walk, seen = [v], {v}
+                while len(walk) < max_depth:
+                    nxt = next((w for w in graph[walk[-1]] if component_of[w] == cid and w not in seen), -1)
+                    if nxt == -1:
+                        break
+                    walk.append(nxt)
+                    seen.add(nxt)
+                # 경로 위 어느 계정에서 요소를 벗어날 때 체인이 가장 긴지
+                lengths = [min(max_depth, i + 1 + out_len[u]) for i, u in enumerate(walk)]
+                cut = lengths.index(max(lengths))
+                prefix[v], exit_to[v], best[v] = walk[:cut + 1], out_to[walk[cut]], lengths[cut]
+        
+        # 시작 요소(들어오는 연결 없음)마다 가장 긴 체인을 가진 계정에서 복원
         chains = []
-        visited = set()
-        
-        for winner_account in self.profit_network.keys():
-            if winner_account in visited:
+        starts = sorted(
+            (cid for cid in range(len(components)) if not has_incoming[cid]),
+            key=lambda cid: components[cid][0],
+        )
+        for cid in starts:
+            v = max(components[cid], key=lambda u: best[u])
+            if best[v] < 2:  # 최소 2개 이상 연결
                 continue
-            
-            # DFS로 체인 탐색
-            chain = self._dfs_chain(winner_account, visited, set())
-            
-            if len(chain) >= 2:  # 최소 2개 이상 연결
-                chains.append(chain)
-                print(f"체인 발견: {' → '.join(chain)}")
+            chain = []
+            while v != -1 and len(chain) < max_depth:
+                chain.extend(accounts[u] for u in prefix[v][:max_depth - len(chain)])
+                v = exit_to[v]
+            chains.append(chain)
+            print(f"체인 발견: {' → '.join(chain)}")
         
         print(f"총 {len(chains)}개 체인 발견")
         
         return chains
     
-    def _dfs_chain(self, account: str, visited: Set[str], current_path: Set[str]) -> List[str]:
-        """DFS로 체인 탐색 (순환 방지)"""
-        if account in current_path:  # 순환 감지
-            return []
-        
-        if account not in self.profit_network:  # 더 이상 연결 없음
-            return [account]
-        
-        visited.add(account)
-        current_path.add(account)
-        
-        node = self.profit_network[account]
-        
-        # 가장 긴 체인 찾기
-        longest_chain = [account]
-        
-        for loser in node.connected_losers:
-            if loser in self.profit_network:  # loser도 다른 거래에서 winner인 경우
-                sub_chain = self._dfs_chain(loser, visited, current_path.copy())
-                if len(sub_chain) + 1 > len(longest_chain):
-                    longest_chain = [account] + sub_chain
+    @staticmethod
+    def _strongly_connected_components(graph: List[List[int]]) -> List[List[int]]:
+        """
+        Tarjan SCC (재귀 없는 반복 구현)
         
-        return longest_chain
+        Returns:
+            요소별 정점 번호 리스트 (정렬됨). 어떤 요소에서 도달 가능한 요소는 항상 그보다 먼저 나옴
+        """
+        n = len(graph)
+        index = [-1] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+        
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, 0)]
+            
+            while work:
+                v, i = work[-1]
+                if i < len(graph[v]):
+                    work[-1] = (v, i + 1)
+                    w = graph[v][i]
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, 0))
+                    elif on_stack[w]:
+                        low[v] = min(low[v], index[w])
+                    continue
+                
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        members.append(w)
+                        if w == v:
+                            break
+                    components.append(sorted(members))
+        
+        return components
     
     def get_network_statistics(self) -> Dict:
         """네트워크 통계"""
@@ -714,6 +919,63 @@ class NetworkAnalyzer:
 # 7. SANCTION PIPELINE
 # ============================================================================
 
+def _csr(codes: np.ndarray, n: int, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """코드별로 values를 모은 CSR 배열 (indptr, data), 코드 내 원래 순서 유지"""
+    order = np.argsort(codes, kind='stable')
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=n))]).astype(np.int64)
+    return indptr, values[order]
+
+
+class PairIndex:
+    """pair_id / 계정 -> 거래 쌍 위치 역색인 (제재 케이스 조립용)
+    
+    pair_id와 계정을 한 번 정수 코드로 바꾸고 CSR 배열로 위치를 저장해,
+    케이스마다 전체 거래 쌍을 다시 훑지 않고 케이스 크기만큼만 조회
+    """
+    
+    def __init__(self, pairs: List[TradePair]):
+        n = len(pairs)
+        rows = np.arange(n, dtype=np.int64)
+        self.pair_ids = [p.pair_id for p in pairs]
+        self.scores = [p.score.total for p in pairs]
+        
+        # pair_id -> 위치
+        id_codes, ids = pd.factorize(np.array(self.pair_ids, dtype=object), use_na_sentinel=False)
+        self.ids = pd.Index(ids, dtype=object)
+        self.id_indptr, self.id_rows = _csr(id_codes, len(ids), rows)
+        
+        # 계정 -> winner 또는 loser로 참여한 거래 쌍 위치
+        accounts = np.array(
+            [p.winner_account for p in pairs] + [p.loser_account for p in pairs], dtype=object
+        )
+        account_codes, account_values = pd.factorize(accounts, use_na_sentinel=False)
+        self.accounts = pd.Index(account_values, dtype=object)
+        self.account_indptr, self.account_rows = _csr(
+            account_codes, len(account_values), np.concatenate([rows, rows])
+        )
+    
+    @staticmethod
+    def _gather(indptr: np.ndarray, data: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """코드들의 CSR 구간을 합쳐 중복 없이 원래 순서로 정렬한 위치"""
+        codes = codes[codes >= 0]
+        if len(codes) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([data[indptr[c]:indptr[c + 1]] for c in codes.tolist()]))
+    
+    def rows_for_pairs(self, pair_ids: List[str]) -> np.ndarray:
+        return self._gather(self.id_indptr, self.id_rows, self.ids.get_indexer(np.array(pair_ids, dtype=object)))
+    
+    def rows_for_accounts(self, accounts: List[str]) -> np.ndarray:
+        return self._gather(
+            self.account_indptr, self.account_rows, self.accounts.get_indexer(np.array(accounts, dtype=object))
+        )
+    
+    def avg_score(self, rows: np.ndarray) -> float:
+        """위치들의 평균 점수 (거래 쌍 순서대로 합산)"""
+        scores = [self.scores[i] for i in rows.tolist()]
+        return sum(scores) / len(scores) if scores else 0.0
+
+
 class SanctionPipeline:
     """제재 케이스 생성 및 출력"""
     
@@ -721,6 +983,7 @@ class SanctionPipeline:
         self.config = config
         self.logger = logger
         self.sanction_cases: List[SanctionCase] = []
+        self.sanctions_document: Optional[Dict] = None
     
     def process_bot_tier(self, pairs: List[TradePair]) -> List[SanctionCase]:
         """Bot Tier 즉시 제재 케이스 생성"""
@@ -762,6 +1025,7 @@ class SanctionPipeline:
         print("네트워크 제재 케이스 생성 중...")
         
         network_cases = []
+        pair_index = PairIndex(pairs)  # 케이스마다 전체 거래 쌍을 훑지 않도록 한 번만 구성
         
         # 1. 반복 수익 계정 제재
         repeat_accounts = {
@@ -776,7 +1040,7 @@ class SanctionPipeline:
                 account_ids=[account_id],
                 detection_timestamp=datetime.now(),
                 trade_pair_ids=node.trade_pair_ids,
-                total_score=self._calculate_avg_score(node.trade_pair_ids, pairs),
+                total_score=pair_index.avg_score(pair_index.rows_for_pairs(node.trade_pair_ids)),
                 tier=TierType.MANUAL,
                 profit_occurrence_count=node.profit_count,
                 total_laundered_amount=node.total_profit,
@@ -790,13 +1054,9 @@ class SanctionPipeline:
         # 2. 연결된 체인 제재
         for chain in chains:
             if len(chain) >= 2:
-                # 체인 관련 거래 쌍 찾기
-                chain_pair_ids = []
-                chain_accounts = set(chain)
-                
-                for pair in pairs:
-                    if pair.winner_account in chain_accounts or pair.loser_account in chain_accounts:
-                        chain_pair_ids.append(pair.pair_id)
+                # 체인 계정이 참여한 거래 쌍 (거래 쌍 순서)
+                chain_rows = pair_index.rows_for_accounts(chain)
+                chain_pair_ids = [pair_index.pair_ids[i] for i in chain_rows.tolist()]
                 
                 case = SanctionCase(
                     case_id=f"SANCTION_CHAIN_{'_'.join(chain[:3])}",
@@ -804,7 +1064,7 @@ class SanctionPipeline:
                     account_ids=chain,
                     detection_timestamp=datetime.now(),
                     trade_pair_ids=chain_pair_ids,
-                    total_score=self._calculate_avg_score(chain_pair_ids, pairs),
+                    total_score=pair_index.avg_score(chain_rows),
                     tier=TierType.MANUAL,
                     network_path=chain,
                     total_laundered_amount=sum(
@@ -821,11 +1081,6 @@ class SanctionPipeline:
         
         return network_cases
     
-    def _calculate_avg_score(self, pair_ids: List[str], pairs: List[TradePair]) -> float:
-        """평균 점수 계산"""
-        scores = [p.score.total for p in pairs if p.pair_id in pair_ids]
-        return sum(scores) / len(scores) if scores else 0.0
-    
     def export_sanctions(self, output_dir: Path) -> str:
         """제재 케이스를 JSON 파일로 출력"""
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -837,6 +1092,8 @@ class SanctionPipeline:
             'cases': [case.to_dict() for case in self.sanction_cases]
         }
         
+        self.sanctions_document = data
+        
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
@@ -855,6 +1112,8 @@ class ReportGenerator:
     def __init__(self, config: DetectionConfig):
         self.config = config
         self.output_dir = Path(config.output_dir)
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self.documents: Dict[str, Dict] = {}
     
     def generate_all_reports(
         self,
@@ -866,6 +1125,7 @@ class ReportGenerator:
         print("보고서 생성 중...")
         
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.frames, self.documents = {}, {}
         
         # 1. 거래 쌍 상세 데이터 (CSV)
         self._export_trade_pairs_csv(all_pairs)
@@ -910,6 +1170,7 @@ class ReportGenerator:
             records.append(record)
         
         df = pd.DataFrame(records)
+        self.frames['pairs'] = df
         filepath = self.output_dir / "trade_pairs_detailed.csv"
         df.to_csv(filepath, index=False, encoding='utf-8-sig')
         print(f"거래 쌍 CSV 저장: {filepath}")
@@ -955,6 +1216,7 @@ class ReportGenerator:
             'network_statistics': network_stats,
         }
         
+        self.documents['visualization'] = vis_data
         filepath = self.output_dir / "visualization_data.json"
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(vis_data, f, indent=2, ensure_ascii=False)
@@ -1072,41 +1334,60 @@ class BonusLaunderingDetector:
         self.sanction_pipeline = SanctionPipeline(config, self.logger)
         self.report_generator = ReportGenerator(config)
     
-    def detect(self, data_filepath: str) -> Dict:
+    def detect(self, data_filepath: str, con: Optional[dd.DuckDBPyConnection] = None) -> Dict:
         """
         전체 탐지 프로세스 실행
         
+        Args:
+            data_filepath: Excel 데이터 파일 경로
+            con: 공유 DuckDB 커서 (None이면 DataManager 커넥션 사용)
+        
         Returns:
             탐지 결과 딕셔너리
         """
         print("데이터 로드")
         
         # 1. 데이터 로드 — use DataManager to get persistent connection with model tables
-        dm = get_data_manager(data_filepath)
-        dm.ensure_loaded(data_filepath)
-        con = dm.get_connection()
-        
-        # 2. 포지션 구성
-        print("포지션 구성")
-        builder = PositionBuilder(con)
-        positions = builder.build_positions()
-        bonuses = builder.build_bonuses()
+        if con is None:
+            dm = get_data_manager(data_filepath)
+            dm.ensure_loaded(data_filepath)
+            con = dm.get_connection()
+        
+        if self.config.incremental_mode:
+            # 2~3. 증분 모드: 워터마크 이후 변경된 포지션이 포함된 쌍만 재계산 후 병합
+            print("후보 쌍 추출 (증분)")
+            candidates_sql, params = self._candidate_pairs_source_incremental(con)
+        else:
+            # 2. 포지션 구성
+            print("포지션 구성")
+            builder = PositionBuilder(con)
+            positions = builder.build_positions()
+            bonuses = builder.build_bonuses()
+            
+            # 3. 후보 쌍 추출
+            print("후보 쌍 추출")
+            candidates_sql, params = self._candidate_pairs_source(con, positions, bonuses)
         
-        # 3. 후보 쌍 추출
-        print("후보 쌍 추출")
-        candidate_pairs = self._extract_candidate_pairs(con, positions, bonuses)
+        candidate_pairs, total_candidates = self._fetch_candidates(con, candidates_sql, params)
         
-        if len(candidate_pairs) == 0:
+        if total_candidates == 0:
             print("후보 쌍이 없습니다. 탐지 종료.")
-            return self._empty_result()
+            return self._empty_result(con)
         
         # 4. 필터 적용
         print("필터 적용")
-        passed_pairs, failed_pairs = self.filter_engine.apply_filters(candidate_pairs)
+        if self.config.filter_pushdown:
+            passed_pairs, failed_pairs = self.filter_engine.apply_filters_pushdown(candidate_pairs, total_candidates)
+        elif self.config.vectorized_filters:
+            passed_pairs, failed_pairs = self.filter_engine.apply_filters_frame(candidate_pairs)
+        else:
+            passed_pairs, failed_pairs = self.filter_engine.apply_filters(candidate_pairs.to_dict('records'))
+        if self.config.filter_pushdown and self.config.explain_filter_failures:
+            log_filter_failures(self.logger.logger, failed_pairs['filter_failures'])
         
         if len(passed_pairs) == 0:
             print("필터를 통과한 거래 쌍이 없습니다.")
-            return self._empty_result()
+            return self._empty_result(con)
         
         # 5. 점수 계산
         print("점수 계산 및 Tier 분류")
@@ -1125,7 +1406,7 @@ class BonusLaunderingDetector:
         # 7. Manual Tier 네트워크 분석
         print("네트워크 분석")
         network = self.network_analyzer.analyze_manual_tier_pairs(scored_pairs)
-        chains = self.network_analyzer.find_network_chains()
+        chains = self.network_analyzer.find_longest_chains_per_source()
         network_stats = self.network_analyzer.get_network_statistics()
         
         # 8. 네트워크 기반 제재
@@ -1143,10 +1424,20 @@ class BonusLaunderingDetector:
         all_sanctions = bot_sanctions + network_sanctions
         self.report_generator.generate_all_reports(scored_pairs, all_sanctions, network_stats)
         
-        # 11. 결과 반환
+        # 11. API용 결과 테이블 게시 (CSV/JSON과 같은 내용)
+        print("결과 테이블 게시")
+        ResultsStore(con).publish_run(
+            'wash',
+            self.config.to_dict(),
+            self.report_generator.frames,
+            self.report_generator.documents.get('visualization'),
+            self.sanction_pipeline.sanctions_document,
+        )
+        
+        # 12. 결과 반환
         return {
             'config': self.config.to_dict(),
-            'total_candidates': len(candidate_pairs),
+            'total_candidates': total_candidates,
             'passed_filter': len(passed_pairs),
             'tier_distribution': {tier.value: count for tier, count in tier_counts.items()},
             'sanction_cases': len(all_sanctions),
@@ -1156,23 +1447,32 @@ class BonusLaunderingDetector:
             'output_directory': self.config.output_dir,
         }
     
-    def _extract_candidate_pairs(
-        self, 
-        con: dd.DuckDBPyConnection,
-        positions: pd.DataFrame,
-        bonuses: pd.DataFrame
-    ) -> List[Dict]:
-        """SQL을 통해 후보 거래 쌍 추출"""
+    def _candidate_params(self) -> Dict[str, Any]:
+        """_candidate_pairs_sql의 $name 파라미터"""
+        return {'time_since_bonus_hours': float(self.config.time_since_bonus_hours)}
+    
+    def _candidate_pairs_sql(self, positions_rel: str, bonuses_rel: str, pair_filter: str = "") -> str:
+        """
+        후보 쌍 SQL (positions_rel/bonuses_rel: 포지션/보너스 relation, pair_filter: 추가 조인 조건)
         
-        # DuckDB에 등록
-        con.register('positions', positions)
-        con.register('bonuses', bonuses)
+        손실 거래는 직전 보너스 하나에만 연결되고 time_since_bonus_hours 창 밖이면 후보에서 제외
+        (보너스 여러 건에 중복 연결되던 후보 쌍과 필터에서 떨어질 후보를 SQL 단계에서 제거)
+        $time_since_bonus_hours는 _candidate_params()로 바인딩
+        """
+        return f"""
+        -- 같은 시각 보너스가 여러 건이면 금액이 큰 것 하나만 (ASOF 결과를 결정적으로)
+        WITH bonuses AS (
+            SELECT account_id, bonus_ts, reward_amount
+            FROM {bonuses_rel}
+            QUALIFY row_number() OVER (PARTITION BY account_id, bonus_ts ORDER BY reward_amount DESC) = 1
+        ),
         
-        query = f"""
-        -- 1. 보너스를 받은 기록이 있는 '손실 거래'만 미리 필터링합니다.
-        WITH losers_with_bonus AS (
+        -- 1. '손실 거래'마다 오픈 직전의 가장 최근 보너스 하나만 연결 (ASOF),
+        --    보너스 후 경과 시간 필터를 여기서 적용해 뒤 self-join 입력을 줄입니다.
+        losers_with_bonus AS (
             SELECT
                 p.account_id,
+                p.position_id,
                 p.open_ts,
                 p.close_ts,
                 p.symbol,
@@ -1182,10 +1482,11 @@ class BonusLaunderingDetector:
                 p.pnl,
                 b.bonus_ts,
                 b.reward_amount
-            FROM positions p
-            JOIN bonuses b ON p.account_id = b.account_id
-            WHERE p.pnl < 0 -- 손실 거래
-              AND b.bonus_ts <= p.open_ts -- 거래 전에 보너스를 받음
+            FROM (SELECT * FROM {positions_rel} WHERE pnl < 0) p -- 손실 거래
+            ASOF JOIN bonuses b
+                ON p.account_id = b.account_id
+                AND p.open_ts >= b.bonus_ts -- 거래 전에 받은 보너스 중 가장 최근
+            WHERE epoch(p.open_ts - b.bonus_ts) / 3600.0 <= $time_since_bonus_hours
         ),
 
         -- 2. 필터링된 '손실 거래'와 '이익 거래'를 강력한 조건으로 조인합니다.
@@ -1193,6 +1494,8 @@ class BonusLaunderingDetector:
             SELECT
                 t1.account_id AS loser_account,
                 t2.account_id AS winner_account,
+                t1.position_id AS loser_position_id,
+                t2.position_id AS winner_position_id,
                 t1.open_ts AS loser_open_ts,
                 t1.close_ts AS loser_close_ts,
                 t2.open_ts AS winner_open_ts,
@@ -1215,17 +1518,18 @@ class BonusLaunderingDetector:
                 epoch(t1.open_ts - t1.bonus_ts) / 3600.0 AS time_since_bonus_hours
                 
             FROM losers_with_bonus t1 -- (매우 작아진 t1 세트)
-            JOIN positions t2 ON -- (전체 t2 세트)
+            JOIN {positions_rel} t2 ON -- (전체 t2 세트)
                 t1.account_id != t2.account_id
                 AND t1.side != t2.side
                 AND t1.symbol = t2.symbol
                 AND t2.pnl > 0 -- t2는 이익 거래
                 
                 -- [핵심 필터 1] 시간 제한: 두 거래의 오픈 시간이 5분 이내
-                AND t2.open_ts BETWEEN (t1.open_ts - INTERVAL '5 minutes') AND (t1.open_ts + INTERVAL '5 minutes')
+                AND t2.open_ts BETWEEN (t1.open_ts - INTERVAL '{CANDIDATE_OPEN_WINDOW_MIN} minutes') AND (t1.open_ts + INTERVAL '{CANDIDATE_OPEN_WINDOW_MIN} minutes')
                 
                 -- [핵심 필터 2] 금액 제한: 두 거래의 금액 차이가 10% 이내
-                AND ABS(t1.amount - t2.amount) / LEAST(t1.amount, t2.amount) < 0.1 
+                AND ABS(t1.amount - t2.amount) / LEAST(t1.amount, t2.amount) < {CANDIDATE_AMOUNT_DIFF_RATIO}
+                {pair_filter}
         )
 
         -- 3. 최종 결과 선택 (이제 'bonuses' 테이블을 다시 조인할 필요가 없습니다.)
@@ -1234,16 +1538,100 @@ class BonusLaunderingDetector:
             0.0 AS loser_deposit,  -- 이 컬럼들은 로직을 추가해야 합니다.
             0.0 AS winner_deposit
         FROM candidate_pairs cp
-        ORDER BY time_since_bonus_hours ASC, open_time_diff_sec ASC;
         """
+    
+    def _fetch_candidates(
+        self,
+        con: dd.DuckDBPyConnection,
+        candidates_sql: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[pd.DataFrame, int]:
+        """
+        후보 쌍 조회 (CANDIDATE_ORDER_BY 순, params: candidates_sql의 $name 파라미터)
+        
+        filter_pushdown이면 필터를 후보 SQL의 WHERE로 실행해 통과 행만 가져옴
+        (explain_filter_failures면 모든 행 + filter_failure_mask)
+        
+        Returns:
+            (후보 DataFrame, 필터 전 전체 후보 수)
+        """
+        if self.config.filter_pushdown:
+            df, total = self.filter_engine.sql_filters().fetch(
+                con, candidates_sql, CANDIDATE_ORDER_BY, params=params,
+                explain=self.config.explain_filter_failures
+            )
+            print(f"후보 쌍 {total}개 추출 (SQL 필터 후 {len(df)}개 조회)")
+            return df, total
         
-        df = con.execute(query).fetchdf()
+        df = con.execute(f"{candidates_sql} ORDER BY {CANDIDATE_ORDER_BY}", params or None).fetchdf()
         print(f"후보 쌍 {len(df)}개 추출")
+        return df, len(df)
+    
+    def _candidate_pairs_source(
+        self, 
+        con: dd.DuckDBPyConnection,
+        positions: pd.DataFrame,
+        bonuses: pd.DataFrame
+    ) -> Tuple[str, Dict[str, Any]]:
+        """후보 거래 쌍 (SQL, 파라미터) - 포지션/보너스 DataFrame을 DuckDB에 등록"""
+        
+        # DuckDB에 등록
+        con.register('wash_positions', positions)
+        con.register('wash_bonuses', bonuses)
+        
+        return self._candidate_pairs_sql('wash_positions', 'wash_bonuses'), self._candidate_params()
+    
+    def _candidate_pairs_source_incremental(self, con: dd.DuckDBPyConnection) -> Tuple[str, Dict[str, Any]]:
+        """
+        증분 후보 쌍 (SQL, 파라미터) - 저장된 후보 테이블
+        
+        - 첫 실행(또는 설정 변경/재시드 후)에는 전체 후보를 계산해 저장
+        - 이후에는 워터마크 이후 변경된 포지션이 포함된 쌍만 다시 계산해 병합
+          (변경 포지션의 open_ts - 5분을 lookback으로 사용)
+        """
+        ensure_positions(con)
+        signature = (
+            f"wash:v2:{CANDIDATE_OPEN_WINDOW_MIN}:{CANDIDATE_AMOUNT_DIFF_RATIO}:"
+            f"{self.config.time_since_bonus_hours}"
+        )
+        state = IncrementalState(con, 'wash', signature)
+        
+        positions_rel = """(
+            SELECT account_id, position_id, leverage, open_ts, close_ts, symbol, side, amount, rpnl AS pnl
+            FROM positions
+            WHERE rpnl != 0 {where}
+        )"""
+        bonuses_rel = "(SELECT account_id, ts AS bonus_ts, reward_amount FROM Reward)"
+        
+        if not state.is_incremental:
+            state.replace_candidates(
+                self._candidate_pairs_sql(positions_rel.format(where=""), bonuses_rel), self._candidate_params()
+            )
+            print(f"전체 후보 계산 (워터마크: {state.new_watermark})")
+        else:
+            lookback = state.changed_lookback('open_ts', CANDIDATE_OPEN_WINDOW_MIN * 60)
+            if lookback is not None:
+                sql = self._candidate_pairs_sql(
+                    positions_rel.format(where="AND open_ts >= $lookback"),
+                    bonuses_rel,
+                    pair_filter="AND (t1.close_ts > $watermark OR t2.close_ts > $watermark)",
+                )
+                deleted, inserted = state.merge_candidates(
+                    sql,
+                    {'lookback': lookback, 'watermark': state.previous_watermark, **self._candidate_params()},
+                    [('loser_account', 'loser_position_id'), ('winner_account', 'winner_position_id')],
+                )
+                print(f"증분 후보 병합: {state.previous_watermark} 이후 (lookback {lookback}) - 삭제 {deleted}, 추가 {inserted}")
+            else:
+                print(f"변경된 포지션 없음 (워터마크: {state.previous_watermark})")
+        state.commit()
         
-        return df.to_dict('records')
+        # 저장 후보는 필터 설정과 무관 (필터는 조회 시 적용)
+        return f'SELECT * FROM "{state.table}"', {}
     
-    def _empty_result(self) -> Dict:
-        """빈 결과 반환"""
+    def _empty_result(self, con: dd.DuckDBPyConnection) -> Dict:
+        """빈 결과 게시 후 반환 (이전 실행의 결과 테이블이 API에 남지 않도록)"""
+        ResultsStore(con).publish_run('wash', self.config.to_dict())
         return {
             'config': self.config.to_dict(),
             'total_candidates': 0,
@@ -1263,7 +1651,8 @@ class BonusLaunderingDetector:
 
 def run_detection(
     data_filepath: str,
-    config: Optional[DetectionConfig] = None
+    config: Optional[DetectionConfig] = None,
+    con: Optional[dd.DuckDBPyConnection] = None
 ) -> Dict:
     """
     증정금 녹이기 탐지 실행
@@ -1271,6 +1660,7 @@ def run_detection(
     Args:
         data_filepath: Excel 데이터 파일 경로
         config: 탐지 설정 (None이면 기본값 사용)
+        con: 공유 DuckDB 커넥션/커서 (None이면 탐지기가 직접 연결)
     
     Returns:
         탐지 결과 딕셔너리
@@ -1283,7 +1673,7 @@ def run_detection(
     
     # 탐지 실행
     detector = BonusLaunderingDetector(config)
-    result = detector.detect(data_filepath)
+    result = detector.detect(data_filepath, con=con)
     
     return result
 